@@ -0,0 +1,448 @@
+# -*- coding: utf-8 -*-
+"""
+Scaling benchmarks for the data generation, spatial statistics and OSM cache
+paths, with regression gates.
+
+Every benchmark sweeps input sizes with fixed seeds and records the best
+wall time over several runs and the peak traced memory of one extra run
+(tracemalloc, which sees NumPy buffers but not worker processes; the
+benchmarks therefore run single-process). Results are written as JSON.
+Given a baseline results file, tracked benchmarks that got slower or use
+more memory than the threshold allows fail the run with exit code 1.
+
+OSM benchmarks never touch the network: the osmnx fetch functions are
+replaced by readers of local fixture files generated up front, and the OSM
+cache lives in a temporary directory, so the suite runs offline and only
+measures the cache load paths.
+
+Usage:
+    python -m scripts.benchmark_pipeline --profile quick --output bench.json
+    python -m scripts.benchmark_pipeline --profile quick --baseline bench.json
+    python -m scripts.benchmark_pipeline --profile full --only generate_data --only analyze_k_function
+"""
+
+import argparse
+import contextlib
+import gc
+import io
+import json
+import os
+import platform
+import statistics
+import sys
+import tempfile
+import time
+import tracemalloc
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import Any, Callable, Dict, Iterator, List, Optional
+from unittest import mock
+
+import geopandas as gpd
+import numpy as np
+import osmnx as ox
+from shapely.geometry import box
+
+import src.common.osm_handler as osm_handler
+from scripts.benchmark_road_graph_cache import _synthetic_network
+from src.common.road_graph_io import load_road_graph, save_road_graph
+from src.common.schemas import DataGeneratorConfig, HomogeneousPoissonConfig, VoronoiConfig
+from src.data_processing.synthetic_generator import (
+    _assign_units_to_points,
+    _generate_points_from_distribution,
+    _generate_voronoi_units,
+    generate_data,
+)
+from src.spatial_stats.point_pattern_analysis import analyze_k_function
+
+SEED = 12345
+BOUNDING_BOX = (0.0, 0.0, 100.0, 100.0)
+
+DEFAULT_TIME_THRESHOLD = 0.25
+DEFAULT_MEMORY_THRESHOLD = 0.25
+# Differences below these are noise, whatever the relative change
+_MIN_TIME_DELTA = 0.005
+_MIN_MEMORY_DELTA = 1024 ** 2
+
+
+@dataclass
+class Benchmark:
+    """
+    One benchmarked function and the input sizes it is swept over.
+
+    Attributes:
+        name: The benchmark name.
+        setup: Builds the inputs for one parameter set, outside the timing,
+               and returns the function to time.
+        cases: The parameter sets of every profile.
+        tracked: Whether regressions of this benchmark fail the run.
+        time_threshold: A benchmark-specific relative time threshold.
+        memory_threshold: A benchmark-specific relative memory threshold.
+    """
+    name: str
+    setup: Callable[..., Callable[[], Any]]
+    cases: Dict[str, List[Dict[str, Any]]]
+    tracked: bool = True
+    time_threshold: Optional[float] = None
+    memory_threshold: Optional[float] = None
+
+
+@dataclass
+class _OfflineOSM:
+    """The fixture files served in place of OSM API responses."""
+    workdir: Path
+    boundaries: Dict[str, Path] = field(default_factory=dict)
+    networks: Dict[str, Path] = field(default_factory=dict)
+
+    def geocode_to_gdf(self, query: str, *args: Any, **kwargs: Any) -> gpd.GeoDataFrame:
+        if query not in self.boundaries:
+            raise RuntimeError(f"Offline benchmark: no boundary fixture for {query!r}")
+        return gpd.read_parquet(self.boundaries[query])
+
+    def graph_from_polygon(self, polygon: Any, *args: Any, **kwargs: Any) -> Any:
+        if polygon.wkt not in self.networks:
+            raise RuntimeError("Offline benchmark: no road network fixture for this polygon")
+        return load_road_graph(self.networks[polygon.wkt])
+
+
+@contextlib.contextmanager
+def offline_osm(workdir: Path) -> Iterator[_OfflineOSM]:
+    """Serves OSM requests from fixture files and keeps the OSM cache in workdir."""
+    fixtures = _OfflineOSM(workdir)
+    (workdir / "fixtures").mkdir(parents=True, exist_ok=True)
+    with mock.patch.object(osm_handler, "DEFAULT_CACHE_DIR", workdir / "osm_cache"), \
+            mock.patch.object(ox, "geocode_to_gdf", fixtures.geocode_to_gdf), \
+            mock.patch.object(ox, "graph_from_polygon", fixtures.graph_from_polygon):
+        yield fixtures
+
+
+# --- Benchmark setups ---
+
+def _units(num_units: int) -> gpd.GeoDataFrame:
+    return _generate_voronoi_units(VoronoiConfig(num_units, BOUNDING_BOX), np.random.default_rng(SEED))
+
+
+def _customers(num_customers: int) -> gpd.GeoDataFrame:
+    area = (BOUNDING_BOX[2] - BOUNDING_BOX[0]) * (BOUNDING_BOX[3] - BOUNDING_BOX[1])
+    config = HomogeneousPoissonConfig(intensity=num_customers / area)
+    return _generate_points_from_distribution(config, BOUNDING_BOX, np.random.default_rng(SEED + 1))
+
+
+def _setup_voronoi_units(osm: _OfflineOSM, num_units: int) -> Callable[[], Any]:
+    config = VoronoiConfig(num_units, BOUNDING_BOX)
+    return lambda: _generate_voronoi_units(config, np.random.default_rng(SEED))
+
+
+def _setup_assign_units(osm: _OfflineOSM, num_units: int, num_customers: int, method: str) -> Callable[[], Any]:
+    units, customers = _units(num_units), _customers(num_customers)
+    return lambda: _assign_units_to_points(customers, units, method=method)
+
+
+def _setup_generate_data(osm: _OfflineOSM, num_units: int, num_customers: int) -> Callable[[], Any]:
+    area = (BOUNDING_BOX[2] - BOUNDING_BOX[0]) * (BOUNDING_BOX[3] - BOUNDING_BOX[1])
+    config = DataGeneratorConfig(
+        voronoi_config=VoronoiConfig(num_units, BOUNDING_BOX),
+        distribution_config=HomogeneousPoissonConfig(intensity=num_customers / area),
+        random_seed=SEED,
+    )
+    return lambda: generate_data(config)
+
+
+def _setup_k_function(osm: _OfflineOSM, num_points: int, permutations: int) -> Callable[[], Any]:
+    points = _customers(num_points)
+    area = box(*BOUNDING_BOX).area
+    return lambda: analyze_k_function(
+        points, area, steps=50, permutations=permutations, n_jobs=1, random_seed=SEED
+    )
+
+
+def _setup_boundary_cache(osm: _OfflineOSM, num_polygons: int) -> Callable[[], Any]:
+    query = f"benchmark boundary {num_polygons}"
+    path = osm.workdir / "fixtures" / f"boundary_{num_polygons}.parquet"
+    _units(num_polygons).to_parquet(path)
+    osm.boundaries[query] = path
+    osm_handler.get_boundary_from_api(query, {"admin_level": "8"})  # Fill the cache
+    return lambda: osm_handler.get_boundary_from_api(query, {"admin_level": "8"})
+
+
+def _setup_road_network_cache(osm: _OfflineOSM, grid_size: int, as_csr: bool) -> Callable[[], Any]:
+    network = _synthetic_network(grid_size, seed=SEED)
+    path = osm.workdir / "fixtures" / f"road_network_{grid_size}.npz"
+    save_road_graph(network, path)
+    # The grid spans grid_size * 0.001 degrees; pad it so no edge is truncated
+    polygon = box(-0.01, -0.01, grid_size * 0.001 + 0.01, grid_size * 0.001 + 0.01)
+    osm.networks[polygon.wkt] = path
+    osm_handler.get_road_network_from_api(polygon, tile_size=None)  # Fill the cache
+    return lambda: osm_handler.get_road_network_from_api(polygon, tile_size=None, as_csr=as_csr)
+
+
+def _setup_read_layer(osm: _OfflineOSM, num_features: int, bbox_fraction: float) -> Callable[[], Any]:
+    path = osm.workdir / "fixtures" / f"layer_{num_features}.parquet"
+    if not path.exists():
+        osm_handler._save_geoparquet(_units(num_features), path)
+    side = (BOUNDING_BOX[2] - BOUNDING_BOX[0]) * bbox_fraction ** 0.5
+    bbox = (BOUNDING_BOX[0], BOUNDING_BOX[1], BOUNDING_BOX[0] + side, BOUNDING_BOX[1] + side)
+    return lambda: osm_handler.read_layer(path, columns=["unit_id"], bbox=bbox)
+
+
+BENCHMARKS = [
+    Benchmark(
+        "generate_voronoi_units",
+        _setup_voronoi_units,
+        {
+            "quick": [{"num_units": 1_000}, {"num_units": 10_000}],
+            "full": [{"num_units": 1_000}, {"num_units": 10_000}, {"num_units": 100_000}],
+        },
+    ),
+    Benchmark(
+        "assign_units_to_points",
+        _setup_assign_units,
+        {
+            "quick": [
+                {"num_units": 1_000, "num_customers": 100_000, "method": "kdtree"},
+                {"num_units": 1_000, "num_customers": 20_000, "method": "sjoin"},
+            ],
+            "full": [
+                {"num_units": 1_000, "num_customers": 100_000, "method": "kdtree"},
+                {"num_units": 10_000, "num_customers": 1_000_000, "method": "kdtree"},
+                {"num_units": 100_000, "num_customers": 1_000_000, "method": "kdtree"},
+                {"num_units": 10_000, "num_customers": 200_000, "method": "sjoin"},
+            ],
+        },
+    ),
+    Benchmark(
+        "generate_data",
+        _setup_generate_data,
+        {
+            "quick": [{"num_units": 2_000, "num_customers": 50_000}],
+            "full": [
+                {"num_units": 2_000, "num_customers": 50_000},
+                {"num_units": 20_000, "num_customers": 500_000},
+                {"num_units": 100_000, "num_customers": 2_000_000},
+            ],
+        },
+    ),
+    Benchmark(
+        "analyze_k_function",
+        _setup_k_function,
+        {
+            "quick": [{"num_points": 2_000, "permutations": 19}],
+            "full": [
+                {"num_points": 2_000, "permutations": 19},
+                {"num_points": 2_000, "permutations": 99},
+                {"num_points": 20_000, "permutations": 19},
+                {"num_points": 20_000, "permutations": 99},
+            ],
+        },
+    ),
+    Benchmark(
+        "osm_boundary_cache_load",
+        _setup_boundary_cache,
+        {
+            "quick": [{"num_polygons": 1_000}],
+            "full": [{"num_polygons": 1_000}, {"num_polygons": 50_000}],
+        },
+    ),
+    Benchmark(
+        "osm_road_network_cache_load",
+        _setup_road_network_cache,
+        {
+            "quick": [{"grid_size": 50, "as_csr": False}, {"grid_size": 50, "as_csr": True}],
+            "full": [
+                {"grid_size": 50, "as_csr": False},
+                {"grid_size": 200, "as_csr": False},
+                {"grid_size": 200, "as_csr": True},
+            ],
+        },
+        # Millisecond-scale loads are dominated by file system jitter
+        time_threshold=0.5,
+    ),
+    Benchmark(
+        "osm_read_layer",
+        _setup_read_layer,
+        {
+            "quick": [{"num_features": 20_000, "bbox_fraction": 1.0}, {"num_features": 20_000, "bbox_fraction": 0.05}],
+            "full": [
+                {"num_features": 200_000, "bbox_fraction": 1.0},
+                {"num_features": 200_000, "bbox_fraction": 0.05},
+            ],
+        },
+    ),
+]
+
+
+# --- Measurement ---
+
+def case_id(name: str, params: Dict[str, Any]) -> str:
+    """Returns the stable identifier that results are matched to their baseline by."""
+    return f"{name}[{','.join(f'{key}={value}' for key, value in params.items())}]"
+
+
+def measure(fn: Callable[[], Any], repeats: int) -> Dict[str, float]:
+    """
+    Times a function and traces its peak memory.
+
+    The memory run is separate because tracing slows down Python code. It
+    counts Python and NumPy allocations, not memory allocated inside GEOS.
+
+    Returns:
+        The best and median wall time in seconds and the peak traced bytes.
+    """
+    times = []
+    with contextlib.redirect_stdout(io.StringIO()):
+        # The traced run goes first and doubles as the warm-up
+        gc.collect()
+        tracemalloc.start()
+        try:
+            fn()
+            peak = tracemalloc.get_traced_memory()[1]
+        finally:
+            tracemalloc.stop()
+
+        for _ in range(repeats):
+            gc.collect()
+            start = time.perf_counter()
+            fn()
+            times.append(time.perf_counter() - start)
+    return {"seconds": min(times), "median_seconds": statistics.median(times), "peak_memory_bytes": peak}
+
+
+def _machine() -> Dict[str, Any]:
+    return {
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "processor": platform.processor(),
+        "cpu_count": os.cpu_count(),
+        "numpy": np.__version__,
+    }
+
+
+def run_suite(
+    benchmarks: List[Benchmark],
+    profile: str = "quick",
+    repeats: int = 5,
+    time_threshold: float = DEFAULT_TIME_THRESHOLD,
+    memory_threshold: float = DEFAULT_MEMORY_THRESHOLD,
+) -> Dict[str, Any]:
+    """
+    Runs every case of the given benchmarks for one profile.
+
+    Args:
+        benchmarks: The benchmarks to run.
+        profile: The size profile, "quick" or "full".
+        repeats: The number of timed runs per case; the best is reported.
+        time_threshold: The default relative time threshold of tracked cases.
+        memory_threshold: The default relative memory threshold of tracked cases.
+
+    Returns:
+        The machine-readable results.
+    """
+    results = []
+    with tempfile.TemporaryDirectory(prefix="tap-bench-") as workdir, offline_osm(Path(workdir)) as osm:
+        for benchmark in benchmarks:
+            for params in benchmark.cases.get(profile, []):
+                with contextlib.redirect_stdout(io.StringIO()):
+                    fn = benchmark.setup(osm, **params)
+                measured = measure(fn, repeats)
+                result = {
+                    "id": case_id(benchmark.name, params),
+                    "benchmark": benchmark.name,
+                    "params": params,
+                    "tracked": benchmark.tracked,
+                    "time_threshold": time_threshold if benchmark.time_threshold is None else benchmark.time_threshold,
+                    "memory_threshold": (
+                        memory_threshold if benchmark.memory_threshold is None else benchmark.memory_threshold
+                    ),
+                    "repeats": repeats,
+                    **measured,
+                }
+                print(
+                    f"{result['id']:<80} {result['seconds'] * 1000:10.1f} ms "
+                    f"{result['peak_memory_bytes'] / 1024 ** 2:10.1f} MiB"
+                )
+                results.append(result)
+    return {
+        "created_at": time.strftime("%Y-%m-%dT%H:%M:%S%z"),
+        "profile": profile,
+        "machine": _machine(),
+        "results": results,
+    }
+
+
+def find_regressions(results: Dict[str, Any], baseline: Dict[str, Any]) -> List[str]:
+    """
+    Compares tracked cases with a baseline run.
+
+    A case regresses if its time or peak memory exceeds the baseline by more
+    than its relative threshold and by more than a small absolute margin.
+    Cases missing from the baseline are skipped.
+
+    Returns:
+        One message per regression.
+    """
+    previous = {result["id"]: result for result in baseline["results"]}
+    regressions = []
+    for result in results["results"]:
+        before = previous.get(result["id"])
+        if before is None or not result["tracked"]:
+            continue
+        for metric, threshold, margin, unit, scale in (
+            ("seconds", result["time_threshold"], _MIN_TIME_DELTA, "ms", 1000),
+            ("peak_memory_bytes", result["memory_threshold"], _MIN_MEMORY_DELTA, "MiB", 1 / 1024 ** 2),
+        ):
+            now, then = result[metric], before[metric]
+            if now > then * (1 + threshold) and now - then > margin:
+                regressions.append(
+                    f"{result['id']}: {metric} {then * scale:.1f} -> {now * scale:.1f} {unit} "
+                    f"(+{(now / then - 1) * 100:.0f}%, threshold {threshold * 100:.0f}%)"
+                )
+    return regressions
+
+
+def _positive_int(value: str) -> int:
+    """Parses a command line count of at least 1."""
+    number = int(value)
+    if number < 1:
+        raise argparse.ArgumentTypeError(f"must be at least 1, got {number}")
+    return number
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--profile", choices=("quick", "full"), default="quick", help="The input size profile.")
+    parser.add_argument("--only", action="append", default=None, help="Run only this benchmark; repeatable.")
+    parser.add_argument("--repeats", type=_positive_int, default=5, help="Timed runs per case.")
+    parser.add_argument("--output", type=Path, default=None, help="Write the results to this JSON file.")
+    parser.add_argument("--baseline", type=Path, default=None, help="Fail on regressions against this results file.")
+    parser.add_argument("--time-threshold", type=float, default=DEFAULT_TIME_THRESHOLD,
+                        help="Allowed relative slowdown of tracked benchmarks.")
+    parser.add_argument("--memory-threshold", type=float, default=DEFAULT_MEMORY_THRESHOLD,
+                        help="Allowed relative peak memory growth of tracked benchmarks.")
+    args = parser.parse_args()
+
+    benchmarks = BENCHMARKS
+    if args.only:
+        unknown = sorted(set(args.only) - {benchmark.name for benchmark in BENCHMARKS})
+        if unknown:
+            parser.error(f"Unknown benchmarks: {unknown}")
+        benchmarks = [benchmark for benchmark in BENCHMARKS if benchmark.name in args.only]
+
+    results = run_suite(benchmarks, args.profile, args.repeats, args.time_threshold, args.memory_threshold)
+    if args.output:
+        args.output.write_text(json.dumps(results, indent=2), encoding="utf-8")
+        print(f"Results written to {args.output}")
+
+    if args.baseline:
+        baseline = json.loads(args.baseline.read_text(encoding="utf-8"))
+        if baseline.get("machine") != results["machine"]:
+            print("Warning: the baseline was recorded on a different machine or environment.")
+        regressions = find_regressions(results, baseline)
+        for message in regressions:
+            print(f"REGRESSION {message}")
+        if regressions:
+            sys.exit(1)
+        print("No regressions against the baseline.")
+
+
+if __name__ == "__main__":
+    main()
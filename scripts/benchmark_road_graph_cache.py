@@ -0,0 +1,129 @@
+# -*- coding: utf-8 -*-
+"""
+Benchmarks the binary road-network cache format against GraphML.
+
+By default a synthetic osmnx-like grid network is generated; pass
+``--graphml`` to benchmark an existing GraphML file instead (e.g. an old
+road network from the OSM cache directory).
+
+Usage:
+    python -m scripts.benchmark_road_graph_cache --grid-size 150
+    python -m scripts.benchmark_road_graph_cache --graphml data/cache/osm/<key>_road_network.graphml
+"""
+
+import argparse
+import tempfile
+import time
+from pathlib import Path
+from typing import Callable, Dict
+
+import networkx as nx
+import numpy as np
+import osmnx as ox
+from shapely.geometry import LineString
+
+from src.common.road_graph_io import load_road_graph, load_road_graph_csr, save_road_graph
+
+
+def _synthetic_network(grid_size: int, seed: int = 0) -> nx.MultiDiGraph:
+    """Builds a two-way grid network with osmnx-style node and edge attributes."""
+    rng = np.random.default_rng(seed)
+    G = nx.MultiDiGraph(crs="EPSG:4326", simplified=True)
+    spacing = 0.001
+
+    for i in range(grid_size):
+        for j in range(grid_size):
+            G.add_node(
+                i * grid_size + j,
+                x=j * spacing + rng.normal(0, spacing / 10),
+                y=i * spacing + rng.normal(0, spacing / 10),
+                street_count=4,
+            )
+
+    osmid = 0
+    for i in range(grid_size):
+        for j in range(grid_size):
+            u = i * grid_size + j
+            for v in ((u + 1) if j + 1 < grid_size else None, (u + grid_size) if i + 1 < grid_size else None):
+                if v is None:
+                    continue
+                osmid += 1
+                line = LineString([(G.nodes[u]["x"], G.nodes[u]["y"]), (G.nodes[v]["x"], G.nodes[v]["y"])])
+                attrs = {
+                    "osmid": osmid,
+                    "highway": "residential" if osmid % 5 else "primary",
+                    "oneway": False,
+                    "length": float(line.length * 111_000),
+                    "geometry": line,
+                }
+                if osmid % 3 == 0:
+                    attrs["name"] = f"Street {osmid % 97}"
+                G.add_edge(u, v, reversed=False, **attrs)
+                G.add_edge(v, u, reversed=True, **attrs)
+    return G
+
+
+def _time(fn: Callable[[], object], repeats: int) -> float:
+    """Returns the best wall time over several runs."""
+    best = float("inf")
+    for _ in range(repeats):
+        start = time.perf_counter()
+        fn()
+        best = min(best, time.perf_counter() - start)
+    return best
+
+
+def run_benchmark(graph: nx.MultiDiGraph, repeats: int = 3) -> Dict[str, Dict[str, float]]:
+    """
+    Saves a graph in both formats and measures load time and file size.
+
+    Args:
+        graph: The road network to benchmark with.
+        repeats: The number of timed loads per format; the best is reported.
+
+    Returns:
+        Per format, the load time in seconds and the file size in bytes.
+    """
+    with tempfile.TemporaryDirectory() as tmp:
+        graphml_path = Path(tmp) / "network.graphml"
+        binary_path = Path(tmp) / "network.npz"
+        ox.save_graphml(graph, filepath=graphml_path)
+        save_road_graph(graph, binary_path)
+
+        return {
+            "graphml -> MultiDiGraph": {
+                "seconds": _time(lambda: ox.load_graphml(graphml_path), repeats),
+                "bytes": graphml_path.stat().st_size,
+            },
+            "binary -> MultiDiGraph": {
+                "seconds": _time(lambda: load_road_graph(binary_path), repeats),
+                "bytes": binary_path.stat().st_size,
+            },
+            "binary -> CSR view (mmap)": {
+                "seconds": _time(lambda: load_road_graph_csr(binary_path), repeats),
+                "bytes": binary_path.stat().st_size,
+            },
+        }
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--grid-size", type=int, default=100, help="Side length of the synthetic grid network.")
+    parser.add_argument("--graphml", type=Path, default=None, help="Benchmark an existing GraphML file instead.")
+    parser.add_argument("--repeats", type=int, default=3, help="Timed loads per format.")
+    args = parser.parse_args()
+
+    graph = ox.load_graphml(args.graphml) if args.graphml else _synthetic_network(args.grid_size)
+    print(f"Network: {graph.number_of_nodes()} nodes, {graph.number_of_edges()} edges")
+
+    results = run_benchmark(graph, repeats=args.repeats)
+    baseline = results["graphml -> MultiDiGraph"]["seconds"]
+    for name, result in results.items():
+        print(
+            f"{name:<28} {result['seconds'] * 1000:10.1f} ms "
+            f"({baseline / result['seconds']:6.1f}x) {result['bytes'] / 1024**2:8.2f} MiB"
+        )
+
+
+if __name__ == "__main__":
+    main()
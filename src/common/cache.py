@@ -0,0 +1,572 @@
+# -*- coding: utf-8 -*-
+"""
+This module provides shared caching utilities for the TAP Toolbox.
+
+It contains the stable parameter hashing used for all cache keys, a
+two-tier (memory + disk) result cache for expensive, deterministic
+computations such as spatial statistics, and a managed file store for
+downloaded or parsed artefacts such as OSM layers.
+"""
+
+import hashlib
+import json
+import logging
+import os
+import pickle
+import threading
+import time
+from collections import OrderedDict
+from contextlib import ExitStack, contextmanager
+from pathlib import Path
+from typing import Any, Callable, Dict, Iterator, List, Optional, Tuple, TypeVar, Union
+
+try:
+    import fcntl
+except ImportError:  # pragma: no cover - non-POSIX platforms
+    fcntl = None
+
+import numpy as np
+
+from src.common.instrumentation import count, span
+
+logger = logging.getLogger(__name__)
+
+# --- Constants & Configuration ---
+DEFAULT_RESULT_CACHE_DIR = Path(os.getenv("TAP_RESULT_CACHE_DIR", "data/cache/results"))
+
+T = TypeVar("T")
+
+
+def _touch(path: Path) -> None:
+    """Sets a file's mtime to now, marking it as recently used."""
+    # Explicit timestamps: utime(None) uses the coarse kernel clock,
+    # which cannot order entries touched within a few milliseconds
+    now = time.time_ns()
+    try:
+        os.utime(path, ns=(now, now))
+    except FileNotFoundError:
+        pass
+
+
+def get_cache_key(params: Dict[str, Any]) -> str:
+    """Generates a stable SHA256 hash for a dictionary of parameters."""
+    # Sort the dict to ensure consistent ordering
+    sorted_params_str = json.dumps(params, sort_keys=True)
+    return hashlib.sha256(sorted_params_str.encode("utf-8")).hexdigest()
+
+
+def hash_array(array: np.ndarray) -> str:
+    """Generates a SHA256 content hash of a NumPy array, including its shape and dtype."""
+    array = np.ascontiguousarray(array)
+    digest = hashlib.sha256(f"{array.dtype.str}{array.shape}".encode("utf-8"))
+    digest.update(array.tobytes())
+    return digest.hexdigest()
+
+
+class ResultCache:
+    """
+    A content-addressed, two-tier cache for computation results.
+
+    Entries live in an in-memory LRU tier and, optionally, in an on-disk tier
+    of pickle files. Both tiers are bounded by their total size in bytes and
+    evict the least recently used entries first. A disk hit is promoted to
+    the memory tier. Values are stored serialized, so callers always get an
+    independent copy they are free to mutate.
+    """
+
+    def __init__(
+        self,
+        cache_dir: Optional[Union[str, Path]] = DEFAULT_RESULT_CACHE_DIR,
+        max_memory_bytes: int = 64 * 1024 ** 2,
+        max_disk_bytes: int = 1024 ** 3,
+    ):
+        """
+        Args:
+            cache_dir: The directory of the disk tier, or None for memory only.
+            max_memory_bytes: The size budget of the memory tier.
+            max_disk_bytes: The size budget of the disk tier.
+        """
+        self.cache_dir = Path(cache_dir) if cache_dir is not None else None
+        self.max_memory_bytes = max_memory_bytes
+        self.max_disk_bytes = max_disk_bytes
+        self._memory: "OrderedDict[str, bytes]" = OrderedDict()
+        self._memory_bytes = 0
+        self._lock = threading.Lock()
+        self._stats = {"memory_hits": 0, "disk_hits": 0, "misses": 0, "evictions": 0}
+
+    def _disk_path(self, key: str) -> Path:
+        return self.cache_dir / f"{key}.pkl"
+
+    def _touch(self, key: str) -> None:
+        """Refreshes the recency of a disk entry, which drives disk eviction."""
+        if self.cache_dir is not None:
+            _touch(self._disk_path(key))
+
+    def _put_memory(self, key: str, payload: bytes) -> None:
+        """Inserts into the memory tier and evicts down to the budget. Caller holds the lock."""
+        if key in self._memory:
+            self._memory_bytes -= len(self._memory.pop(key))
+        if len(payload) > self.max_memory_bytes:
+            return
+        self._memory[key] = payload
+        self._memory_bytes += len(payload)
+        while self._memory_bytes > self.max_memory_bytes:
+            _, evicted = self._memory.popitem(last=False)
+            self._memory_bytes -= len(evicted)
+            self._stats["evictions"] += 1
+
+    def _evict_disk(self) -> None:
+        """Removes the least recently used files until the disk tier fits its budget."""
+        entries = []
+        for path in self.cache_dir.glob("*.pkl"):
+            try:
+                stat = path.stat()
+            except FileNotFoundError:
+                continue
+            entries.append((stat.st_mtime_ns, stat.st_size, path))
+        total = sum(size for _, size, _ in entries)
+        for _, size, path in sorted(entries, key=lambda entry: entry[0]):
+            if total <= self.max_disk_bytes:
+                break
+            path.unlink(missing_ok=True)
+            total -= size
+            with self._lock:
+                self._stats["evictions"] += 1
+
+    def get(self, key: str) -> Optional[Any]:
+        """Returns the cached value for the key, or None on a miss."""
+        with self._lock:
+            payload = self._memory.get(key)
+            if payload is not None:
+                self._memory.move_to_end(key)
+                self._stats["memory_hits"] += 1
+        if payload is not None:
+            count("result_cache_memory_hits")
+            self._touch(key)
+            return pickle.loads(payload)
+
+        if self.cache_dir is not None:
+            path = self._disk_path(key)
+            try:
+                payload = path.read_bytes()
+            except FileNotFoundError:
+                payload = None
+            if payload is not None:
+                self._touch(key)
+                with self._lock:
+                    self._stats["disk_hits"] += 1
+                    self._put_memory(key, payload)
+                count("result_cache_disk_hits")
+                return pickle.loads(payload)
+
+        with self._lock:
+            self._stats["misses"] += 1
+        count("result_cache_misses")
+        return None
+
+    def put(self, key: str, value: Any) -> None:
+        """Stores a value in both tiers."""
+        payload = pickle.dumps(value, protocol=pickle.HIGHEST_PROTOCOL)
+        with self._lock:
+            self._put_memory(key, payload)
+
+        if self.cache_dir is not None and len(payload) <= self.max_disk_bytes:
+            self.cache_dir.mkdir(parents=True, exist_ok=True)
+            path = self._disk_path(key)
+            # Write then rename, so readers never see a partial file
+            tmp_path = path.with_suffix(f".{os.getpid()}.{threading.get_ident()}.tmp")
+            tmp_path.write_bytes(payload)
+            os.replace(tmp_path, path)
+            self._touch(key)
+            self._evict_disk()
+
+    def clear(self) -> None:
+        """Removes all entries from both tiers. The counters are kept."""
+        with self._lock:
+            self._memory.clear()
+            self._memory_bytes = 0
+        if self.cache_dir is not None and self.cache_dir.exists():
+            for path in self.cache_dir.glob("*.pkl"):
+                path.unlink(missing_ok=True)
+
+    def stats(self) -> Dict[str, int]:
+        """Returns the hit/miss/eviction counters and the current memory tier size."""
+        with self._lock:
+            stats = dict(self._stats)
+            stats["memory_entries"] = len(self._memory)
+            stats["memory_bytes"] = self._memory_bytes
+        return stats
+
+
+# Parsed CacheStore indexes by path, reused while the index file is unchanged
+_INDEX_CACHE: Dict[Path, Tuple[Tuple[int, int, int], Dict[str, Dict[str, Any]]]] = {}
+_INDEX_CACHE_LOCK = threading.Lock()
+
+# Returned by CacheStore._load when an entry vanished between lookup and load
+_MISSING = object()
+
+
+# Fallback for platforms without fcntl: locks only exclude threads of this process
+_THREAD_LOCKS: Dict[str, threading.Lock] = {}
+_THREAD_LOCKS_GUARD = threading.Lock()
+
+
+@contextmanager
+def _file_lock(path: Path) -> Iterator[None]:
+    """
+    Holds an exclusive advisory lock on the given lock file.
+
+    Lock files may be deleted by _remove_lock_file while others wait on them.
+    A waiter that wakes up holding a deleted file retries on the file now at
+    the path, so two holders can never lock different files.
+    """
+    if fcntl is None:  # pragma: no cover
+        with _THREAD_LOCKS_GUARD:
+            lock = _THREAD_LOCKS.setdefault(str(path), threading.Lock())
+        with lock:
+            yield
+        return
+
+    while True:
+        lock_file = open(path, "a+b")
+        fcntl.flock(lock_file.fileno(), fcntl.LOCK_EX)
+        try:
+            if os.stat(path).st_ino == os.fstat(lock_file.fileno()).st_ino:
+                break
+        except FileNotFoundError:
+            pass
+        lock_file.close()
+
+    with lock_file:
+        try:
+            yield
+        finally:
+            fcntl.flock(lock_file.fileno(), fcntl.LOCK_UN)
+
+
+def _remove_lock_file(path: Path) -> None:
+    """Deletes a lock file, unless it is currently held."""
+    if fcntl is None:  # pragma: no cover - thread locks have no files
+        return
+    try:
+        lock_file = open(path, "r+b")
+    except FileNotFoundError:
+        return
+    with lock_file:
+        try:
+            fcntl.flock(lock_file.fileno(), fcntl.LOCK_EX | fcntl.LOCK_NB)
+        except BlockingIOError:
+            return
+        path.unlink(missing_ok=True)
+
+
+class CacheStore:
+    """
+    A managed, size-bounded and concurrency-safe file cache.
+
+    Every entry is a single file named ``<key><suffix>`` in the cache
+    directory. A JSON metadata index records each entry's size and creation
+    time; only files listed in the index are served, and files are always
+    written to a temporary name and renamed into place before being indexed,
+    so an interrupted write can never be returned as a hit. Hits do not
+    write the index: they read it without locking (it is replaced
+    atomically) and record their access in the entry file's mtime, which
+    drives eviction.
+
+    Concurrent misses on the same key are serialized by a per-key lock file:
+    the first caller fetches and writes, the others wait and then read the
+    fresh entry. A key's lock file is deleted along with its entry. Entries
+    older than ``ttl_seconds`` are treated as misses and are removed on the
+    next write, and least recently used entries are evicted whenever the
+    total size exceeds ``max_bytes``.
+    """
+
+    INDEX_FILENAME = "index.json"
+
+    def __init__(
+        self,
+        cache_dir: Union[str, Path],
+        max_bytes: Optional[int] = None,
+        ttl_seconds: Optional[float] = None,
+    ):
+        """
+        Args:
+            cache_dir: The directory holding the entries and the index.
+            max_bytes: The size budget of all entries, or None for no limit.
+            ttl_seconds: The maximum age of an entry, or None for no expiry.
+        """
+        self.cache_dir = Path(cache_dir)
+        self.max_bytes = max_bytes
+        self.ttl_seconds = ttl_seconds
+        self._lock_dir = self.cache_dir / ".locks"
+
+    # --- Index handling ---
+
+    @contextmanager
+    def _locked_index(self) -> Iterator[Dict[str, Dict[str, Any]]]:
+        """Yields the index under the index lock and writes it back atomically."""
+        self._lock_dir.mkdir(parents=True, exist_ok=True)
+        with _file_lock(self._lock_dir / "index.lock"):
+            index = self._read_index()
+            yield index
+            self._atomic_write_bytes(
+                self.cache_dir / self.INDEX_FILENAME, json.dumps(index).encode("utf-8")
+            )
+
+    def _read_index(self) -> Dict[str, Dict[str, Any]]:
+        try:
+            return json.loads((self.cache_dir / self.INDEX_FILENAME).read_text(encoding="utf-8"))
+        except (FileNotFoundError, json.JSONDecodeError):
+            return {}
+
+    def _read_index_cached(self) -> Dict[str, Dict[str, Any]]:
+        """Returns the index for reading, parsing it only if the file was replaced since the last read."""
+        path = self.cache_dir / self.INDEX_FILENAME
+        try:
+            stat = path.stat()
+        except FileNotFoundError:
+            return {}
+        # Every write replaces the file, so a new inode means a new index
+        signature = (stat.st_ino, stat.st_mtime_ns, stat.st_size)
+        with _INDEX_CACHE_LOCK:
+            cached = _INDEX_CACHE.get(path)
+        if cached is not None and cached[0] == signature:
+            return cached[1]
+        index = self._read_index()
+        with _INDEX_CACHE_LOCK:
+            _INDEX_CACHE[path] = (signature, index)
+        return index
+
+    def _atomic_write_bytes(self, path: Path, payload: bytes) -> None:
+        tmp_path = self._tmp_path(path.name)
+        tmp_path.write_bytes(payload)
+        os.replace(tmp_path, path)
+
+    def _tmp_path(self, filename: str) -> Path:
+        # Keep the real suffix last, some writers infer the format from it
+        return self.cache_dir / f".tmp.{os.getpid()}.{threading.get_ident()}.{filename}"
+
+    def _is_expired(self, entry: Dict[str, Any]) -> bool:
+        return self.ttl_seconds is not None and time.time() - entry["created"] > self.ttl_seconds
+
+    def _is_valid(self, filename: str, entry: Optional[Dict[str, Any]]) -> bool:
+        if entry is None or not (self.cache_dir / filename).exists():
+            return False
+        return not self._is_expired(entry)
+
+    def _key_lock_path(self, filename: str) -> Path:
+        return self._lock_dir / f"{filename}.lock"
+
+    def _drop(self, index: Dict[str, Dict[str, Any]], filename: str) -> None:
+        """Deletes an entry, its file and its lock file. Caller holds the index lock."""
+        (self.cache_dir / filename).unlink(missing_ok=True)
+        _remove_lock_file(self._key_lock_path(filename))
+        del index[filename]
+
+    def _drop_expired(self, index: Dict[str, Dict[str, Any]], keep: Optional[str] = None) -> None:
+        """Deletes every entry older than the TTL. Caller holds the index lock."""
+        for filename, entry in list(index.items()):
+            if filename != keep and self._is_expired(entry):
+                self._drop(index, filename)
+
+    def _last_access(self, filename: str, entry: Dict[str, Any]) -> float:
+        # Hits touch the file; the index only knows when the entry was written
+        try:
+            return max(entry["last_access"], (self.cache_dir / filename).stat().st_mtime)
+        except FileNotFoundError:
+            return entry["last_access"]
+
+    def _evict(self, index: Dict[str, Dict[str, Any]], keep: str) -> None:
+        """
+        Drops expired entries, then least recently used ones until the budget is met.
+
+        Caller holds the index lock.
+        """
+        self._drop_expired(index, keep)
+        if self.max_bytes is None:
+            return
+        total = sum(entry["size"] for entry in index.values())
+        if total <= self.max_bytes:
+            return
+        by_recency = sorted(index.items(), key=lambda item: self._last_access(*item))
+        for filename, entry in by_recency:
+            if total <= self.max_bytes:
+                break
+            if filename == keep:
+                continue
+            self._drop(index, filename)
+            total -= entry["size"]
+
+    # --- Public API ---
+
+    def path_for(self, key: str, suffix: str) -> Path:
+        """Returns the path an entry is stored at."""
+        return self.cache_dir / f"{key}{suffix}"
+
+    def lookup(self, key: str, suffix: str) -> Optional[Path]:
+        """Returns the path of a valid entry and marks it as used, or None on a miss."""
+        filename = f"{key}{suffix}"
+        if not self._is_valid(filename, self._read_index_cached().get(filename)):
+            return None
+        path = self.cache_dir / filename
+        _touch(path)
+        return path
+
+    def _load(self, path: Path, load: Callable[[Path], T]) -> Any:
+        """Loads a hit, or returns _MISSING if another process evicted it after the lookup."""
+        try:
+            with span("cache.load", file=path.name):
+                value = load(path)
+        except FileNotFoundError:
+            logger.debug("Cache entry %s was evicted before it could be loaded", path)
+            return _MISSING
+        logger.debug("Cache hit. Loaded from %s", path)
+        count("cache_hits")
+        return value
+
+    def get_or_create(
+        self,
+        key: str,
+        suffix: str,
+        fetch: Callable[[], T],
+        save: Callable[[T, Path], None],
+        load: Callable[[Path], T],
+    ) -> T:
+        """
+        Returns the cached value for a key, fetching and storing it on a miss.
+
+        Args:
+            key: The cache key, typically from get_cache_key.
+            suffix: The file suffix, e.g. "_boundary.feather".
+            fetch: Produces the value on a miss.
+            save: Writes a value to the given path.
+            load: Reads a value from the given path.
+
+        Returns:
+            The cached or freshly fetched value.
+        """
+        path = self.lookup(key, suffix)
+        if path is not None:
+            value = self._load(path, load)
+            if value is not _MISSING:
+                return value
+
+        self._lock_dir.mkdir(parents=True, exist_ok=True)
+        with _file_lock(self._key_lock_path(f"{key}{suffix}")):
+            # Another worker may have filled the entry while we waited
+            path = self.lookup(key, suffix)
+            if path is not None:
+                value = self._load(path, load)
+                if value is not _MISSING:
+                    return value
+
+            logger.info("Cache miss for %s%s. Fetching...", key, suffix)
+            count("cache_misses")
+            with span("cache.fetch", suffix=suffix):
+                value = fetch()
+            self.put(key, suffix, value, save)
+            return value
+
+    def get_or_create_many(
+        self,
+        entries: Dict[str, Tuple[str, str]],
+        fetch: Callable[[List[str]], Dict[str, T]],
+        save: Callable[[T, Path], None],
+        load: Callable[[Path], T],
+    ) -> Dict[str, T]:
+        """
+        Returns several cached values, fetching all missing ones in one call.
+
+        This is for sources where producing several values together is much
+        cheaper than producing them one by one, e.g. layers parsed from the
+        same file. The per-key locks of all missing entries are held while
+        fetching, so it interoperates with get_or_create on the same keys.
+
+        Args:
+            entries: Maps a name to its (key, suffix) pair.
+            fetch: Produces the values for a list of missing names.
+            save: Writes a value to the given path.
+            load: Reads a value from the given path.
+
+        Returns:
+            The values, keyed by name in the order of entries.
+        """
+        results: Dict[str, T] = {}
+
+        def load_cached(names: List[str]) -> List[str]:
+            missing = []
+            for name in names:
+                path = self.lookup(*entries[name])
+                value = _MISSING if path is None else self._load(path, load)
+                if value is _MISSING:
+                    missing.append(name)
+                else:
+                    results[name] = value
+            return missing
+
+        missing = load_cached(list(entries))
+        if missing:
+            self._lock_dir.mkdir(parents=True, exist_ok=True)
+            # Lock in a fixed order so overlapping groups cannot deadlock
+            lock_names = sorted({"".join(entries[name]) for name in missing})
+            with ExitStack() as stack:
+                for lock_name in lock_names:
+                    stack.enter_context(_file_lock(self._key_lock_path(lock_name)))
+                missing = load_cached(missing)
+                if missing:
+                    logger.info("Cache miss for %d entries. Fetching...", len(missing))
+                    count("cache_misses", len(missing))
+                    with span("cache.fetch", entries=len(missing)):
+                        fetched = fetch(missing)
+                    for name in missing:
+                        self.put(*entries[name], fetched[name], save)
+                        results[name] = fetched[name]
+
+        return {name: results[name] for name in entries}
+
+    def put(self, key: str, suffix: str, value: T, save: Callable[[T, Path], None]) -> Path:
+        """Atomically writes a value and records it in the index."""
+        filename = f"{key}{suffix}"
+        path = self.cache_dir / filename
+        self.cache_dir.mkdir(parents=True, exist_ok=True)
+
+        tmp_path = self._tmp_path(filename)
+        try:
+            with span("cache.save", file=filename):
+                save(value, tmp_path)
+            os.replace(tmp_path, path)
+        finally:
+            tmp_path.unlink(missing_ok=True)
+
+        _touch(path)
+        now = time.time()
+        with self._locked_index() as index:
+            index[filename] = {"size": path.stat().st_size, "created": now, "last_access": now}
+            self._evict(index, keep=filename)
+        logger.debug("Saved to cache: %s", path)
+        return path
+
+    def status(self) -> Dict[str, Any]:
+        """Returns the number of live entries, their total size and the configured limits."""
+        index = self._read_index()
+        if any(self._is_expired(entry) for entry in index.values()):
+            with self._locked_index() as index:
+                self._drop_expired(index)
+        return {
+            "cache_dir": str(self.cache_dir),
+            "num_entries": len(index),
+            "total_bytes": sum(entry["size"] for entry in index.values()),
+            "max_bytes": self.max_bytes,
+            "ttl_seconds": self.ttl_seconds,
+        }
+
+    def clear(self) -> None:
+        """Removes every indexed entry and every per-key lock file not currently held."""
+        if not self.cache_dir.exists():
+            return
+        with self._locked_index() as index:
+            for filename in list(index):
+                self._drop(index, filename)
+            for lock_path in self._lock_dir.glob("*.lock"):
+                if lock_path.name != "index.lock":
+                    _remove_lock_file(lock_path)
@@ -0,0 +1,332 @@
+# -*- coding: utf-8 -*-
+"""
+This module provides lightweight instrumentation of pipeline stages.
+
+Code marks its stages with nested ``span`` blocks (or the ``traced``
+decorator), counts events such as cache hits with ``count`` and attaches
+facts such as row counts to the current stage with ``annotate``. Nothing
+is recorded unless the caller runs the code inside ``instrument``, which
+collects the spans into a structured, JSON-serializable report::
+
+    with instrument("scenario") as recording:
+        generate_data(config)
+    report = recording.report()
+    export_chrome_trace(report, "scenario.trace.json")
+
+When no recording is active, every call returns after a single context
+variable lookup. The active recording lives in a ``ContextVar``, so spans
+opened in asyncio tasks nest under the span that created the task, while
+other threads and worker processes record nothing unless they start a
+recording of their own.
+
+Every span samples the process' peak resident set size when it ends. With
+``trace_memory`` the peak traced allocations above the span's starting
+point are measured as well; tracemalloc slows down allocation-heavy
+Python code noticeably, so this is off by default. Since tracemalloc is
+process-wide, the peak of a span includes allocations of concurrently
+running spans.
+"""
+
+import functools
+import json
+import os
+import sys
+import threading
+import time
+import tracemalloc
+from contextlib import contextmanager
+from contextvars import ContextVar
+from pathlib import Path
+from typing import Any, Callable, Dict, Iterator, List, Optional, TypeVar, Union
+
+try:
+    import resource
+except ImportError:  # pragma: no cover - non-POSIX platforms
+    resource = None
+
+F = TypeVar("F", bound=Callable[..., Any])
+
+# ru_maxrss is in kilobytes on Linux and in bytes on macOS
+_RSS_UNIT = 1 if sys.platform == "darwin" else 1024
+
+
+def _max_rss_bytes() -> Optional[int]:
+    if resource is None:
+        return None
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss * _RSS_UNIT
+
+
+class _Span:
+    """One timed stage of a recording."""
+
+    __slots__ = (
+        "recording", "parent", "name", "attributes", "counters", "children", "thread",
+        "start", "end", "memory_start", "memory_peak", "memory_end", "max_rss", "_token",
+    )
+
+    def __init__(self, recording: "Recording", parent: Optional["_Span"], name: str, attributes: Dict[str, Any]):
+        self.recording = recording
+        self.parent = parent
+        self.name = name
+        self.attributes = attributes
+        self.counters: Dict[str, float] = {}
+        self.children: List[_Span] = []
+        self.thread = threading.get_native_id()
+        self.start = self.end = None
+        self.memory_start = self.memory_peak = self.memory_end = None
+        self.max_rss = None
+
+    def __enter__(self) -> "_Span":
+        if self.parent is not None:
+            self.parent.children.append(self)
+        self.recording._open(self)
+        self._token = _CURRENT.set(self)
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback) -> bool:
+        _CURRENT.reset(self._token)
+        self.recording._close(self)
+        if exc_type is not None:
+            self.attributes["error"] = exc_type.__name__
+        return False
+
+    def to_dict(self, origin: float) -> Dict[str, Any]:
+        end = self.end if self.end is not None else time.perf_counter()
+        span = {
+            "name": self.name,
+            "start_seconds": self.start - origin,
+            "duration_seconds": end - self.start,
+            "thread": self.thread,
+            "attributes": dict(self.attributes),
+            "counters": dict(self.counters),
+            "max_rss_bytes": self.max_rss,
+        }
+        if self.memory_start is not None:
+            span["peak_memory_bytes"] = self.memory_peak - self.memory_start
+            if self.memory_end is not None:
+                span["memory_delta_bytes"] = self.memory_end - self.memory_start
+        span["children"] = [child.to_dict(origin) for child in self.children]
+        return span
+
+
+class _NullSpan:
+    """The span returned while nothing is recorded."""
+
+    __slots__ = ()
+
+    def __enter__(self) -> "_NullSpan":
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback) -> bool:
+        return False
+
+
+_NULL_SPAN = _NullSpan()
+_CURRENT: ContextVar[Optional[_Span]] = ContextVar("tap_instrumentation_span", default=None)
+
+
+class Recording:
+    """The spans and counters collected by one ``instrument`` block."""
+
+    def __init__(self, name: str, trace_memory: bool = False):
+        """
+        Args:
+            name: The name of the root span.
+            trace_memory: Whether spans measure their peak traced memory.
+        """
+        self.trace_memory = trace_memory
+        self.pid = os.getpid()
+        self.started_at = time.time()
+        self._lock = threading.Lock()
+        self._open_spans: List[_Span] = []
+        self.root = _Span(self, None, name, {})
+
+    def _fold_memory_peak(self) -> int:
+        # tracemalloc has a single peak, so hand it to every open span before resetting it
+        current, peak = tracemalloc.get_traced_memory()
+        for span in self._open_spans:
+            span.memory_peak = max(span.memory_peak, peak)
+        tracemalloc.reset_peak()
+        return current
+
+    def _open(self, span: _Span) -> None:
+        if self.trace_memory and tracemalloc.is_tracing():
+            with self._lock:
+                span.memory_start = span.memory_peak = self._fold_memory_peak()
+                self._open_spans.append(span)
+        span.start = time.perf_counter()
+
+    def _close(self, span: _Span) -> None:
+        span.end = time.perf_counter()
+        if span.memory_start is not None:
+            with self._lock:
+                span.memory_end = self._fold_memory_peak()
+                self._open_spans.remove(span)
+        span.max_rss = _max_rss_bytes()
+
+    def _count(self, span: _Span, name: str, value: float) -> None:
+        with self._lock:
+            span.counters[name] = span.counters.get(name, 0) + value
+
+    def report(self) -> Dict[str, Any]:
+        """
+        Returns the recording as plain JSON data.
+
+        Returns:
+            A dictionary with the root span tree under ``spans``, the counter
+            totals over all spans under ``counters`` and, per span name, the
+            number of calls and their total duration under ``stages``.
+        """
+        spans = self.root.to_dict(self.root.start)
+        counters: Dict[str, float] = {}
+        stages: Dict[str, Dict[str, Any]] = {}
+        pending = [spans]
+        while pending:
+            span = pending.pop()
+            for name, value in span["counters"].items():
+                counters[name] = counters.get(name, 0) + value
+            stage = stages.setdefault(span["name"], {"calls": 0, "total_seconds": 0.0})
+            stage["calls"] += 1
+            stage["total_seconds"] += span["duration_seconds"]
+            if "peak_memory_bytes" in span:
+                stage["max_peak_memory_bytes"] = max(stage.get("max_peak_memory_bytes", 0), span["peak_memory_bytes"])
+            pending.extend(span["children"])
+        return {
+            "name": self.root.name,
+            "pid": self.pid,
+            "started_at": self.started_at,
+            "duration_seconds": spans["duration_seconds"],
+            "trace_memory": self.trace_memory,
+            "counters": counters,
+            "stages": stages,
+            "spans": spans,
+        }
+
+
+@contextmanager
+def instrument(name: str = "run", trace_memory: bool = False) -> Iterator[Recording]:
+    """
+    Records the spans and counters of everything run inside the block.
+
+    Args:
+        name: The name of the root span, e.g. a run id.
+        trace_memory: Whether to measure the peak traced memory of every
+                      span. Starts tracemalloc for the block if needed.
+
+    Yields:
+        The Recording; call ``report()`` on it once the block is done.
+    """
+    started_tracing = trace_memory and not tracemalloc.is_tracing()
+    if started_tracing:
+        tracemalloc.start()
+    try:
+        recording = Recording(name, trace_memory)
+        with recording.root:
+            yield recording
+    finally:
+        if started_tracing:
+            tracemalloc.stop()
+
+
+def span(name: str, **attributes: Any) -> Union[_Span, _NullSpan]:
+    """
+    Returns a context manager timing a stage under the current span.
+
+    Args:
+        name: The stage name.
+        **attributes: JSON-serializable facts about the stage.
+    """
+    parent = _CURRENT.get()
+    if parent is None:
+        return _NULL_SPAN
+    return _Span(parent.recording, parent, name, attributes)
+
+
+def traced(name: Optional[str] = None) -> Callable[[F], F]:
+    """Decorates a function to run in a span, named after the function by default."""
+    def decorator(func: F) -> F:
+        span_name = name or func.__qualname__
+
+        @functools.wraps(func)
+        def wrapper(*args: Any, **kwargs: Any) -> Any:
+            if _CURRENT.get() is None:
+                return func(*args, **kwargs)
+            with span(span_name):
+                return func(*args, **kwargs)
+
+        return wrapper
+
+    return decorator
+
+
+def count(name: str, value: float = 1) -> None:
+    """Adds to a counter of the current span, e.g. ``count("cache_hits")``."""
+    current = _CURRENT.get()
+    if current is not None:
+        current.recording._count(current, name, value)
+
+
+def annotate(**attributes: Any) -> None:
+    """Attaches JSON-serializable facts, e.g. row counts, to the current span."""
+    current = _CURRENT.get()
+    if current is not None:
+        current.attributes.update(attributes)
+
+
+def is_recording() -> bool:
+    """Returns whether a recording is active, to skip computing expensive attributes."""
+    return _CURRENT.get() is not None
+
+
+def chrome_trace(reports: Union[Dict[str, Any], List[Dict[str, Any]]]) -> Dict[str, Any]:
+    """
+    Converts one or more reports to the Chrome trace event format.
+
+    Reports from different processes, e.g. the runs of a sweep, share one
+    timeline. The result can be opened in Perfetto or ``chrome://tracing``.
+
+    Args:
+        reports: A report from ``Recording.report`` or a list of them.
+
+    Returns:
+        The trace as a dictionary with a ``traceEvents`` list.
+    """
+    if isinstance(reports, dict):
+        reports = [reports]
+    events = []
+    for report in reports:
+        origin = report["started_at"] * 1e6
+        pending = [report["spans"]]
+        while pending:
+            span = pending.pop()
+            args = {**span["attributes"], **span["counters"]}
+            for key in ("max_rss_bytes", "peak_memory_bytes", "memory_delta_bytes"):
+                if span.get(key) is not None:
+                    args[key] = span[key]
+            events.append({
+                "name": span["name"],
+                "cat": report["name"],
+                "ph": "X",
+                "ts": origin + span["start_seconds"] * 1e6,
+                "dur": span["duration_seconds"] * 1e6,
+                "pid": report["pid"],
+                "tid": span["thread"],
+                "args": args,
+            })
+            pending.extend(span["children"])
+    for pid in sorted({report["pid"] for report in reports}):
+        events.append({"name": "process_name", "ph": "M", "pid": pid, "args": {"name": f"pid {pid}"}})
+    return {"traceEvents": sorted(events, key=lambda event: event.get("ts", 0)), "displayTimeUnit": "ms"}
+
+
+def export_chrome_trace(reports: Union[Dict[str, Any], List[Dict[str, Any]]], path: Union[str, Path]) -> Path:
+    """
+    Writes one or more reports as a Chrome trace JSON file.
+
+    Returns:
+        The path written to.
+    """
+    path = Path(path)
+    path.parent.mkdir(parents=True, exist_ok=True)
+    path.write_text(json.dumps(chrome_trace(reports)), encoding="utf-8")
+    return path
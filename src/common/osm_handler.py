@@ -3,155 +3,761 @@
 This module handles all interactions with OpenStreetMap (OSM) data.
 
 It provides a centralized, cached, and robust way to fetch geospatial data
-from the OSM API (via osmnx) or from local PBF files (via pyrosm).
+from the OSM API (via osmnx) or from local PBF files (via pyrosm). All
+results go through a managed CacheStore, which bounds the cache size,
+expires stale entries and makes sure concurrent workers that miss on the
+same request fetch it only once.
 """
 
-import hashlib
+import asyncio
 import json
+import logging
+import math
 import os
+import struct
+import zlib
+from concurrent.futures import ProcessPoolExecutor
 from pathlib import Path
-from typing import Any, Dict, Optional
+from typing import Any, Callable, Dict, List, Optional, Tuple, Union
 
 import geopandas as gpd
 import networkx as nx
+import numpy as np
 import osmnx as ox
+import pandas as pd
+import pyarrow.parquet as pq
+import shapely
+from osmnx._errors import InsufficientResponseError
 from pyrosm import OSM
-from shapely.geometry import Polygon
+from pyrosm.proto import fileformat_pb2, osmformat_pb2
+from shapely.geometry import Polygon, box
+
+from src.common.cache import CacheStore
+from src.common.cache import get_cache_key as _get_cache_key
+from src.common.instrumentation import annotate, count, is_recording, span, traced
+from src.common.road_graph_io import (
+    RoadGraphCSR,
+    load_road_graph,
+    load_road_graph_csr,
+    save_road_graph,
+)
+from src.common.schemas import PBFLayerConfig
+
+logger = logging.getLogger(__name__)
 
 # --- Constants & Configuration ---
 DEFAULT_CACHE_DIR = Path(os.getenv("TAP_CACHE_DIR", "data/cache/osm"))
+DEFAULT_CACHE_MAX_BYTES = int(os.getenv("TAP_CACHE_MAX_BYTES", str(5 * 1024**3)))
+DEFAULT_CACHE_TTL_SECONDS = (
+    float(os.environ["TAP_CACHE_TTL_SECONDS"]) if os.getenv("TAP_CACHE_TTL_SECONDS") else None
+)
+# Rows per Parquet row group of cached layers, the granularity of bbox filtering
+LAYER_ROW_GROUP_SIZE = 50_000
+# Road network tile edge length in degrees, roughly 2 km at mid latitudes
+DEFAULT_TILE_SIZE = 0.02
+
+
+def get_cache_store() -> CacheStore:
+    """Returns the managed store backing the OSM cache directory."""
+    return CacheStore(
+        DEFAULT_CACHE_DIR,
+        max_bytes=DEFAULT_CACHE_MAX_BYTES,
+        ttl_seconds=DEFAULT_CACHE_TTL_SECONDS,
+    )
+
+
+def _save_geoparquet(gdf: gpd.GeoDataFrame, path: Path) -> None:
+    """
+    Writes a layer as GeoParquet with a bbox covering column.
+
+    Larger layers are written in Hilbert order so that every row group covers
+    a compact area, which makes the bbox row-group statistics selective.
+    """
+    if len(gdf) > LAYER_ROW_GROUP_SIZE:
+        # Missing and empty geometries have no position on the curve, keep them last
+        valid = ~(gdf.geometry.isna() | gdf.geometry.is_empty).to_numpy()
+        distances = np.full(len(gdf), np.iinfo(np.int64).max)
+        if valid.any():
+            distances[valid] = gdf.geometry[valid].hilbert_distance().to_numpy()
+        gdf = gdf.iloc[np.argsort(distances, kind="stable")]
+    gdf.to_parquet(path, write_covering_bbox=True, row_group_size=LAYER_ROW_GROUP_SIZE)
+
+
+def _select(
+    gdf: gpd.GeoDataFrame,
+    columns: Optional[List[str]],
+    bbox: Optional[Tuple[float, float, float, float]],
+) -> gpd.GeoDataFrame:
+    """Applies the same projection and bbox filter as read_layer to an in-memory layer."""
+    if bbox is not None:
+        min_x, min_y, max_x, max_y = bbox
+        bounds = gdf.geometry.bounds
+        gdf = gdf[
+            (bounds["minx"] <= max_x) & (bounds["maxx"] >= min_x)
+            & (bounds["miny"] <= max_y) & (bounds["maxy"] >= min_y)
+        ]
+    if columns is not None:
+        gdf = gdf[list(dict.fromkeys([*columns, gdf.geometry.name]))]
+    return gdf
+
 
+@traced("osm.read_layer")
+def read_layer(
+    path: Union[str, Path],
+    columns: Optional[List[str]] = None,
+    bbox: Optional[Tuple[float, float, float, float]] = None,
+) -> gpd.GeoDataFrame:
+    """
+    Reads a cached GeoParquet layer or partitioned dataset, reading only what is needed.
 
-def _get_cache_key(params: Dict[str, Any]) -> str:
-    """Generates a stable SHA256 hash for a dictionary of parameters."""
-    # Sort the dict to ensure consistent ordering
-    sorted_params_str = json.dumps(params, sort_keys=True)
-    return hashlib.sha256(sorted_params_str.encode("utf-8")).hexdigest()
+    Column projection and the bbox filter are pushed down to the Parquet
+    reader: only the requested columns are decoded, and row groups whose
+    bbox statistics do not intersect ``bbox`` are skipped entirely.
 
+    Args:
+        path: A GeoParquet file or a directory of parts.
+        columns: The attribute columns to read; the geometry column is
+                 always included. Defaults to all columns.
+        bbox: An optional (min_x, min_y, max_x, max_y) window; only features
+              whose bounding box intersects it are returned.
 
-def get_boundary_from_api(query: str, tags: Dict[str, str]) -> gpd.GeoDataFrame:
+    Returns:
+        The selected features, in their original row order.
+    """
+    if columns is not None:
+        schema_path = path if Path(path).is_file() else next(Path(path).glob("*.parquet"))
+        geo_metadata = json.loads(pq.read_schema(schema_path).metadata[b"geo"])
+        columns = list(dict.fromkeys([*columns, geo_metadata["primary_column"]]))
+    gdf = gpd.read_parquet(path, columns=columns, bbox=bbox)
+    annotate(rows=len(gdf))
+    # Layers are stored in spatial order, restore the order they were extracted in
+    return gdf.sort_index() if Path(path).is_file() else gdf
+
+
+@traced("osm.get_boundary")
+def get_boundary_from_api(
+    query: str,
+    tags: Dict[str, str],
+    columns: Optional[List[str]] = None,
+    bbox: Optional[Tuple[float, float, float, float]] = None,
+) -> gpd.GeoDataFrame:
     """
     Fetches administrative boundaries from the OSM API (Nominatim) via osmnx.
 
-    Results are cached locally to avoid repeated API calls.
+    Results are cached locally as GeoParquet to avoid repeated API calls.
+    ``columns`` and ``bbox`` select what is returned, as in read_layer, and
+    are not part of the cache key. The Nominatim geocoder has no tag filter,
+    so ``tags`` only distinguish cache entries; put the administrative level
+    into the query itself. To resolve many boundaries at once, use
+    get_boundaries_batch.
     """
-    DEFAULT_CACHE_DIR.mkdir(parents=True, exist_ok=True)
     params = {"query": query, "tags": tags}
     cache_key = _get_cache_key(params)
-    cache_path = DEFAULT_CACHE_DIR / f"{cache_key}_boundary.feather"
 
-    if cache_path.exists():
-        print(f"Cache hit. Loading boundary from {cache_path}")
-        return gpd.read_feather(cache_path)
-
-    print("Cache miss. Fetching boundary from OSM API...")
-    gdf = ox.geocode_to_gdf(query, by_osmid=False, by_polygon=False, **tags)
-    
-    # Save to cache
-    gdf.to_feather(cache_path)
-    print(f"Saved boundary to cache: {cache_path}")
+    def fetch() -> gpd.GeoDataFrame:
+        logger.info("Fetching boundary from OSM API...")
+        count("osm_api_requests")
+        return ox.geocode_to_gdf(query, by_osmid=False)
 
+    gdf = get_cache_store().get_or_create(
+        cache_key, "_boundary.parquet", fetch, _save_geoparquet,
+        lambda path: read_layer(path, columns=columns, bbox=bbox),
+    )
+    gdf = _select(gdf, columns, bbox)
+    annotate(rows=len(gdf))
     return gdf
 
 
+class _AsyncRateLimiter:
+    """Spaces out acquisitions to at most ``rate`` per second across all tasks of a loop."""
+
+    def __init__(self, rate: Optional[float]):
+        self._interval = 1.0 / rate if rate else 0.0
+        self._lock = asyncio.Lock()
+        self._next_time = 0.0
+
+    async def acquire(self) -> None:
+        async with self._lock:
+            now = asyncio.get_running_loop().time()
+            wait = self._next_time - now
+            self._next_time = max(now, self._next_time) + self._interval
+        if wait > 0:
+            await asyncio.sleep(wait)
+
+
+class BoundaryFetcher:
+    """
+    Resolves many boundaries concurrently while being polite to the geocoder.
+
+    Cache hits are served without touching the geocoder. Misses run in
+    worker threads through get_boundary_from_api, so they fill the same
+    cache, with at most ``max_concurrency`` requests in flight and request
+    starts spaced to ``requests_per_second``. Identical queries that are in
+    flight at the same time share a single request.
+    """
+
+    def __init__(self, max_concurrency: int = 4, requests_per_second: Optional[float] = 1.0):
+        """
+        Args:
+            max_concurrency: The maximum number of simultaneous geocoder requests.
+            requests_per_second: The maximum request rate, or None for no limit.
+                                 The public Nominatim allows 1 request per second.
+        """
+        self._semaphore = asyncio.Semaphore(max_concurrency)
+        self._limiter = _AsyncRateLimiter(requests_per_second)
+        self._in_flight: Dict[str, asyncio.Future] = {}
+        self.stats = {"requests": 0, "cache_hits": 0, "deduplicated": 0}
+
+    async def fetch(self, query: str, tags: Dict[str, str]) -> gpd.GeoDataFrame:
+        """Returns the boundary for one query, sharing any identical request in flight."""
+        key = _get_cache_key({"query": query, "tags": tags})
+        task = self._in_flight.get(key)
+        if task is None:
+            task = asyncio.ensure_future(self._resolve(query, tags, key))
+            self._in_flight[key] = task
+            task.add_done_callback(lambda _: self._in_flight.pop(key, None))
+        else:
+            self.stats["deduplicated"] += 1
+        # Shield the shared task so one cancelled caller does not cancel it for the others
+        gdf = await asyncio.shield(task)
+        return gdf.copy()
+
+    async def _resolve(self, query: str, tags: Dict[str, str], key: str) -> gpd.GeoDataFrame:
+        path = await asyncio.to_thread(get_cache_store().lookup, key, "_boundary.parquet")
+        if path is not None:
+            self.stats["cache_hits"] += 1
+            count("cache_hits")
+            return await asyncio.to_thread(read_layer, path)
+
+        async with self._semaphore:
+            await self._limiter.acquire()
+            self.stats["requests"] += 1
+            return await asyncio.to_thread(get_boundary_from_api, query, tags)
+
+    async def fetch_many(
+        self,
+        queries: List[Tuple[str, Dict[str, str]]],
+        return_exceptions: bool = False,
+    ) -> List[Union[gpd.GeoDataFrame, BaseException]]:
+        """Resolves a list of (query, tags) pairs, returning results in input order."""
+        return await asyncio.gather(
+            *(self.fetch(query, tags) for query, tags in queries),
+            return_exceptions=return_exceptions,
+        )
+
+
+async def get_boundaries_async(
+    queries: List[Tuple[str, Dict[str, str]]],
+    max_concurrency: int = 4,
+    requests_per_second: Optional[float] = 1.0,
+    return_exceptions: bool = False,
+    columns: Optional[List[str]] = None,
+    bbox: Optional[Tuple[float, float, float, float]] = None,
+) -> List[Union[gpd.GeoDataFrame, BaseException]]:
+    """
+    Fetches many administrative boundaries concurrently.
+
+    Args:
+        queries: A list of (query, tags) pairs, as for get_boundary_from_api.
+        max_concurrency: The maximum number of simultaneous geocoder requests.
+        requests_per_second: The maximum geocoder request rate, or None.
+        return_exceptions: Whether failed queries return their exception in
+                           place of a result instead of raising.
+        columns: The attribute columns to return, as in read_layer.
+        bbox: An optional window to filter the returned features by.
+
+    Returns:
+        One GeoDataFrame (or exception) per query, in input order.
+    """
+    fetcher = BoundaryFetcher(max_concurrency, requests_per_second)
+    with span("osm.get_boundaries", queries=len(queries)):
+        results = await fetcher.fetch_many(queries, return_exceptions=return_exceptions)
+        annotate(**fetcher.stats)
+    logger.info(
+        "Resolved %d boundaries: %d requests, %d cache hits, %d deduplicated",
+        len(queries), fetcher.stats["requests"], fetcher.stats["cache_hits"], fetcher.stats["deduplicated"],
+    )
+    return [
+        result if isinstance(result, BaseException) else _select(result, columns, bbox)
+        for result in results
+    ]
+
+
+def get_boundaries_batch(
+    queries: List[Tuple[str, Dict[str, str]]],
+    max_concurrency: int = 4,
+    requests_per_second: Optional[float] = 1.0,
+    return_exceptions: bool = False,
+    columns: Optional[List[str]] = None,
+    bbox: Optional[Tuple[float, float, float, float]] = None,
+) -> List[Union[gpd.GeoDataFrame, BaseException]]:
+    """Synchronous wrapper around get_boundaries_async for code without an event loop."""
+    return asyncio.run(
+        get_boundaries_async(
+            queries, max_concurrency, requests_per_second, return_exceptions, columns, bbox
+        )
+    )
+
+
+def _normalize_tag_filter(tags: Optional[Dict[str, Any]]) -> Optional[Dict[str, Any]]:
+    """Converts a tag filter into pyrosm's custom_filter form ({key: True | [values]})."""
+    if not tags:
+        return None
+    return {
+        key: value if value is True or isinstance(value, list) else [value]
+        for key, value in tags.items()
+    }
+
+
+# Maps each supported feature type to its pyrosm extraction call
+_PBF_EXTRACTORS: Dict[str, Callable[[OSM, PBFLayerConfig, Optional[Dict[str, Any]]], Any]] = {
+    "boundaries": lambda osm, layer, tags: osm.get_boundaries(custom_filter=tags),
+    "roads": lambda osm, layer, tags: osm.get_network(network_type=layer.network_type, custom_filter=tags),
+    "pois": lambda osm, layer, tags: osm.get_pois(custom_filter=tags),
+    "buildings": lambda osm, layer, tags: osm.get_buildings(custom_filter=tags),
+    "landuse": lambda osm, layer, tags: osm.get_landuse(custom_filter=tags),
+}
+
+
+@traced("osm.extract_layers_from_pbf")
+def extract_layers_from_pbf(
+    pbf_path: str,
+    layers: List[PBFLayerConfig],
+    bounding_box: Optional[Tuple[float, float, float, float]] = None,
+    columns: Optional[List[str]] = None,
+    bbox: Optional[Tuple[float, float, float, float]] = None,
+) -> Dict[str, gpd.GeoDataFrame]:
+    """
+    Extracts several feature layers from a local .osm.pbf file in one pass.
+
+    Each layer is cached on its own as GeoParquet, keyed by the file, its
+    modification time, the layer's feature type, tag filter and network
+    type, and the bounding box. All layers missing from the cache are
+    extracted from a single pyrosm reader, so the file is parsed at most
+    once per call. Cache hits only read the requested columns and rows.
+
+    Args:
+        pbf_path: The path to the .osm.pbf file.
+        layers: The layers to extract; their names must be unique.
+        bounding_box: An optional (min_x, min_y, max_x, max_y) window to
+                      restrict parsing to. Part of the cache key.
+        columns: The attribute columns to return for every layer; the
+                 geometry column is always included. Defaults to all.
+        bbox: An optional (min_x, min_y, max_x, max_y) window to filter the
+              returned features by, pushed down to the cache reader. Not
+              part of the cache key.
+
+    Returns:
+        A dictionary mapping each layer name to its GeoDataFrame.
+    """
+    pbf_file = Path(pbf_path)
+    if not pbf_file.exists():
+        raise FileNotFoundError(f"PBF file not found at: {pbf_path}")
+
+    layers_by_name = {layer.name: layer for layer in layers}
+    if len(layers_by_name) != len(layers):
+        raise ValueError("Layer names must be unique.")
+    for layer in layers:
+        if layer.feature_type not in _PBF_EXTRACTORS:
+            raise ValueError(f"Unsupported feature_type: {layer.feature_type}")
+
+    entries = {}
+    for layer in layers:
+        params = {
+            "pbf_path": str(pbf_file.resolve()),
+            "mtime": pbf_file.stat().st_mtime,
+            "feature_type": layer.feature_type,
+            "tags": layer.tags or {},
+            "network_type": layer.network_type if layer.feature_type == "roads" else None,
+            "bounding_box": list(bounding_box) if bounding_box is not None else None,
+        }
+        entries[layer.name] = (_get_cache_key(params), f"_{layer.feature_type}.parquet")
+
+    def fetch(names: List[str]) -> Dict[str, gpd.GeoDataFrame]:
+        logger.info("Parsing %s from PBF file...", ", ".join(names))
+        bbox = list(bounding_box) if bounding_box is not None else None
+        osm = OSM(pbf_path, bounding_box=bbox)
+        extracted = {}
+        for name in names:
+            layer = layers_by_name[name]
+            with span("osm.parse_pbf_layer", layer=name, feature_type=layer.feature_type):
+                gdf = _PBF_EXTRACTORS[layer.feature_type](osm, layer, _normalize_tag_filter(layer.tags))
+                if gdf is None or gdf.empty:
+                    raise ValueError(f"No {layer.feature_type} found in PBF with specified tags.")
+                annotate(rows=len(gdf))
+            extracted[name] = gdf
+        return extracted
+
+    extracted = get_cache_store().get_or_create_many(
+        entries, fetch, _save_geoparquet,
+        lambda path: read_layer(path, columns=columns, bbox=bbox),
+    )
+    return {name: _select(gdf, columns, bbox) for name, gdf in extracted.items()}
+
+
 def extract_from_pbf(
     pbf_path: str,
     feature_type: str,
-    tags: Optional[Dict[str, Any]] = None
+    tags: Optional[Dict[str, Any]] = None,
+    columns: Optional[List[str]] = None,
+    bbox: Optional[Tuple[float, float, float, float]] = None,
 ) -> gpd.GeoDataFrame:
     """
     Extracts specified features from a local .osm.pbf file.
 
-    Results are cached to avoid repeated parsing of large PBF files.
+    Results are cached to avoid repeated parsing of large PBF files. To read
+    several feature types from the same file, use extract_layers_from_pbf,
+    which parses the file only once. ``columns`` and ``bbox`` select what is
+    returned, as in read_layer.
     """
-    DEFAULT_CACHE_DIR.mkdir(parents=True, exist_ok=True)
-    
-    # Create a params dict for caching
-    pbf_file = Path(pbf_path)
-    if not pbf_file.exists():
-        raise FileNotFoundError(f"PBF file not found at: {pbf_path}")
+    layer = PBFLayerConfig(name=feature_type, feature_type=feature_type, tags=tags)
+    return extract_layers_from_pbf(pbf_path, [layer], columns=columns, bbox=bbox)[feature_type]
+
+
+def _read_pbf_header_bbox(pbf_path: str) -> Tuple[float, float, float, float]:
+    """Reads the (min_x, min_y, max_x, max_y) bounding box from a PBF file's header block."""
+    with open(pbf_path, "rb") as f:
+        header_size = struct.unpack(">I", f.read(4))[0]
+        blob_header = fileformat_pb2.BlobHeader()
+        blob_header.ParseFromString(f.read(header_size))
+        blob = fileformat_pb2.Blob()
+        blob.ParseFromString(f.read(blob_header.datasize))
+
+    data = zlib.decompress(blob.zlib_data) if blob.HasField("zlib_data") else blob.raw
+    header = osmformat_pb2.HeaderBlock()
+    header.ParseFromString(data)
+    if blob_header.type != "OSMHeader" or not header.HasField("bbox"):
+        raise ValueError(f"PBF file has no header bounding box, pass bounding_box explicitly: {pbf_path}")
+
+    # Header coordinates are in nanodegrees
+    bbox = header.bbox
+    return (bbox.left / 1e9, bbox.bottom / 1e9, bbox.right / 1e9, bbox.top / 1e9)
+
+
+def _window_grid(
+    bounding_box: Tuple[float, float, float, float], window_size: float
+) -> Tuple[int, int]:
+    """Returns the number of window columns and rows covering a bounding box."""
+    min_x, min_y, max_x, max_y = bounding_box
+    num_cols = max(1, math.ceil((max_x - min_x) / window_size))
+    num_rows = max(1, math.ceil((max_y - min_y) / window_size))
+    return num_cols, num_rows
+
+
+def _owning_windows(
+    gdf: gpd.GeoDataFrame,
+    bounding_box: Tuple[float, float, float, float],
+    window_size: float,
+) -> np.ndarray:
+    """
+    Returns the flat index of the window that owns each feature.
 
-    params = {
-        "pbf_path": str(pbf_file.resolve()),
-        "mtime": pbf_file.stat().st_mtime,
-        "feature_type": feature_type,
-        "tags": tags or {},
-    }
-    cache_key = _get_cache_key(params)
-    cache_path = DEFAULT_CACHE_DIR / f"{cache_key}_{feature_type}.feather"
+    A feature is owned by the window containing its first vertex inside the
+    extent. That vertex is an OSM node, so the owning window is always one
+    that read the feature, and every window computes the same owner from the
+    same geometry without any coordination.
+    """
+    min_x, min_y, max_x, max_y = bounding_box
+    num_cols, num_rows = _window_grid(bounding_box, window_size)
+    coords, geom_index = shapely.get_coordinates(gdf.geometry.values, return_index=True)
+
+    inside = (
+        (coords[:, 0] >= min_x) & (coords[:, 0] <= max_x)
+        & (coords[:, 1] >= min_y) & (coords[:, 1] <= max_y)
+    )
+    # Fall back to the first vertex for features without a vertex inside the extent
+    owner_coords = np.full((len(gdf), 2), np.nan)
+    _, first = np.unique(geom_index, return_index=True)
+    owner_coords[geom_index[first]] = coords[first]
+    _, first_inside = np.unique(geom_index[inside], return_index=True)
+    owner_coords[geom_index[inside][first_inside]] = coords[inside][first_inside]
+
+    cols = np.clip(np.floor((owner_coords[:, 0] - min_x) / window_size), 0, num_cols - 1)
+    rows = np.clip(np.floor((owner_coords[:, 1] - min_y) / window_size), 0, num_rows - 1)
+    owners = (rows * num_cols + cols).astype(np.int64)
+    # Empty geometries have no vertex; leave them with window 0
+    owners[np.isnan(owner_coords[:, 0])] = 0
+    return owners
+
+
+def _extract_window(args: Tuple[Any, ...]) -> Dict[str, int]:
+    """Extracts and writes all layers of one window. Runs in a worker process."""
+    pbf_path, layers, bounding_box, window_size, window_index, output_dir = args
+    min_x, min_y, _, _ = bounding_box
+    num_cols, _ = _window_grid(bounding_box, window_size)
+    row, col = divmod(window_index, num_cols)
+    window = [
+        min_x + col * window_size,
+        min_y + row * window_size,
+        min_x + (col + 1) * window_size,
+        min_y + (row + 1) * window_size,
+    ]
+
+    osm = OSM(pbf_path, bounding_box=window)
+    counts = {}
+    for layer in layers:
+        gdf = _PBF_EXTRACTORS[layer.feature_type](osm, layer, _normalize_tag_filter(layer.tags))
+        if gdf is None or gdf.empty:
+            counts[layer.name] = 0
+            continue
+
+        gdf = gdf[_owning_windows(gdf, bounding_box, window_size) == window_index]
+        counts[layer.name] = len(gdf)
+        if len(gdf):
+            _save_geoparquet(gdf, Path(output_dir) / layer.name / f"part-{window_index:05d}.parquet")
+    return counts
+
+
+def _deduplicate_parts(layer_dir: Path) -> int:
+    """
+    Drops features repeated across the parts of a layer, keeping the first.
+
+    Only the id columns are read for the scan; a part is rewritten only if it
+    contains duplicates, which the ownership rule leaves only for features
+    that windows assemble differently (e.g. relations cut by a window).
+    """
+    seen = set()
+    removed = 0
+    for part in sorted(layer_dir.glob("part-*.parquet")):
+        key_columns = [name for name in ("osm_type", "id") if name in pq.read_schema(part).names]
+        if not key_columns:
+            return 0
+        keys = pd.read_parquet(part, columns=key_columns).itertuples(index=False, name=None)
+        duplicate = np.array([key in seen or seen.add(key) for key in keys], dtype=bool)
+        if duplicate.any():
+            # Both reads return rows in stored order, so the mask lines up
+            gdf = gpd.read_parquet(part)
+            tmp_path = part.with_name(f".{part.name}.tmp")
+            _save_geoparquet(gdf[~duplicate], tmp_path)
+            os.replace(tmp_path, part)
+            removed += int(duplicate.sum())
+    return removed
+
+
+@traced("osm.extract_layers_from_pbf_windowed")
+def extract_layers_from_pbf_windowed(
+    pbf_path: str,
+    layers: List[PBFLayerConfig],
+    output_dir: Union[str, Path],
+    window_size: float = 0.5,
+    bounding_box: Optional[Tuple[float, float, float, float]] = None,
+    max_workers: Optional[int] = None,
+) -> Dict[str, Any]:
+    """
+    Extracts layers from a PBF file too large to hold in memory at once.
 
-    if cache_path.exists():
-        print(f"Cache hit. Loading {feature_type} from {cache_path}")
-        return gpd.read_feather(cache_path)
+    The file's extent is split into square windows of ``window_size``
+    degrees, and each window is parsed and extracted in a worker process
+    and written straight to a partitioned GeoParquet dataset, one
+    ``<output_dir>/<layer>/part-NNNNN.parquet`` file per non-empty window.
+    Peak memory is therefore bounded by a single window per worker. Features
+    crossing window edges are read by every window they touch, but written
+    only by the window owning them, with a final id-based pass removing any
+    remaining duplicates.
 
-    print(f"Cache miss. Parsing {feature_type} from PBF file...")
-    osm = OSM(pbf_path)
-    gdf = None
+    Args:
+        pbf_path: The path to the .osm.pbf file.
+        layers: The layers to extract; their names must be unique.
+        output_dir: The root directory of the partitioned dataset.
+        window_size: The window edge length in degrees.
+        bounding_box: The (min_x, min_y, max_x, max_y) extent to cover;
+                      defaults to the bounding box in the PBF header.
+        max_workers: The number of worker processes. ``1`` processes the
+                     windows serially in this process.
 
-    if feature_type == "boundaries":
-        gdf = osm.get_boundaries()
-    elif feature_type == "roads":
-        gdf = osm.get_network(network_type="driving")
-    # Add more feature types as needed, e.g., pois
+    Returns:
+        A dictionary with the number of windows and, per layer, the dataset
+        directory, the number of parts and features, and the number of
+        duplicates removed.
+    """
+    pbf_file = Path(pbf_path)
+    if not pbf_file.exists():
+        raise FileNotFoundError(f"PBF file not found at: {pbf_path}")
+    if len({layer.name for layer in layers}) != len(layers):
+        raise ValueError("Layer names must be unique.")
+    for layer in layers:
+        if layer.feature_type not in _PBF_EXTRACTORS:
+            raise ValueError(f"Unsupported feature_type: {layer.feature_type}")
+
+    if bounding_box is None:
+        bounding_box = _read_pbf_header_bbox(pbf_path)
+    bounding_box = tuple(float(value) for value in bounding_box)
+
+    output_dir = Path(output_dir)
+    for layer in layers:
+        layer_dir = output_dir / layer.name
+        layer_dir.mkdir(parents=True, exist_ok=True)
+        for stale in layer_dir.glob("part-*.parquet"):
+            stale.unlink()
+
+    num_cols, num_rows = _window_grid(bounding_box, window_size)
+    tasks = [
+        (str(pbf_path), layers, bounding_box, window_size, index, str(output_dir))
+        for index in range(num_cols * num_rows)
+    ]
+    logger.info("Extracting %d layers from %d windows...", len(layers), len(tasks))
+    annotate(num_windows=len(tasks))
+
+    if max_workers == 1 or len(tasks) <= 1:
+        window_counts = [_extract_window(task) for task in tasks]
     else:
-        raise ValueError(f"Unsupported feature_type: {feature_type}")
+        with ProcessPoolExecutor(max_workers=max_workers) as executor:
+            window_counts = list(executor.map(_extract_window, tasks))
+
+    summary: Dict[str, Any] = {"num_windows": len(tasks), "layers": {}}
+    for layer in layers:
+        layer_dir = output_dir / layer.name
+        removed = _deduplicate_parts(layer_dir)
+        summary["layers"][layer.name] = {
+            "path": str(layer_dir),
+            "num_parts": len(list(layer_dir.glob("part-*.parquet"))),
+            "num_features": sum(counts[layer.name] for counts in window_counts) - removed,
+            "duplicates_removed": removed,
+        }
+        logger.info("Wrote %d %s features to %s", summary["layers"][layer.name]["num_features"], layer.name, layer_dir)
+    annotate(rows={name: layer_summary["num_features"] for name, layer_summary in summary["layers"].items()})
+    return summary
+
+
+def _tile_indices(polygon: Polygon, tile_size: float) -> List[Tuple[int, int]]:
+    """Returns the (column, row) indices of the grid tiles intersecting a polygon."""
+    min_x, min_y, max_x, max_y = polygon.bounds
+    cols = np.arange(math.floor(min_x / tile_size), math.floor(max_x / tile_size) + 1)
+    rows = np.arange(math.floor(min_y / tile_size), math.floor(max_y / tile_size) + 1)
+    col_grid, row_grid = (grid.ravel() for grid in np.meshgrid(cols, rows))
+    tiles = shapely.box(
+        col_grid * tile_size, row_grid * tile_size,
+        (col_grid + 1) * tile_size, (row_grid + 1) * tile_size,
+    )
+    hits = shapely.intersects(tiles, polygon)
+    return list(zip(col_grid[hits].tolist(), row_grid[hits].tolist()))
 
-    if gdf is None or gdf.empty:
-        raise ValueError(f"No {feature_type} found in PBF with specified tags.")
 
-    # Save to cache
-    gdf.to_feather(cache_path)
-    print(f"Saved {feature_type} to cache: {cache_path}")
+@traced("osm.get_road_network_tile")
+def _get_road_network_tile(col: int, row: int, tile_size: float, network_type: str) -> nx.MultiDiGraph:
+    """
+    Fetches the unsimplified road network of one grid tile, through the cache.
 
-    return gdf
+    Tiles keep every edge with at least one endpoint inside the tile, so
+    edges crossing a tile border appear in both neighbours and the stitched
+    graph has no gaps.
+    """
+    params = {
+        "tile": [col, row],
+        "tile_size": tile_size,
+        "network_type": network_type,
+    }
+    cache_key = _get_cache_key(params)
+
+    def fetch() -> nx.MultiDiGraph:
+        logger.info("Fetching road network tile (%d, %d) from OSM API...", col, row)
+        count("osm_api_requests")
+        tile = box(col * tile_size, row * tile_size, (col + 1) * tile_size, (row + 1) * tile_size)
+        try:
+            return ox.graph_from_polygon(
+                tile,
+                network_type=network_type,
+                retain_all=True,
+                simplify=False,
+                truncate_by_edge=True,
+            )
+        except InsufficientResponseError:
+            # Tiles without any roads are cached as empty graphs
+            return nx.MultiDiGraph(crs="EPSG:4326")
+
+    return get_cache_store().get_or_create(
+        cache_key, "_road_tile.npz", fetch, save_road_graph, load_road_graph
+    )
 
 
+def _fetch_tiled_road_network(
+    polygon: Polygon,
+    network_type: str,
+    truncate_by_polygon: bool,
+    tile_size: float,
+) -> nx.MultiDiGraph:
+    """Stitches the cached tiles covering a polygon, clips to it and simplifies."""
+    tiles = _tile_indices(polygon, tile_size)
+    logger.info("Assembling road network from %d tiles...", len(tiles))
+    with span("osm.assemble_road_network", tiles=len(tiles)):
+        graph = nx.compose_all(
+            [_get_road_network_tile(col, row, tile_size, network_type) for col, row in tiles]
+        )
+        with span("osm.truncate_and_simplify"):
+            graph = ox.truncate.truncate_graph_polygon(
+                graph, polygon, truncate_by_edge=not truncate_by_polygon
+            )
+            return ox.simplify_graph(graph)
+
+
+@traced("osm.get_road_network")
 def get_road_network_from_api(
     polygon: Polygon,
     network_type: str = "drive",
     truncate_by_polygon: bool = True,
-) -> nx.MultiDiGraph:
+    as_csr: bool = False,
+    tile_size: Optional[float] = DEFAULT_TILE_SIZE,
+) -> Union[nx.MultiDiGraph, RoadGraphCSR]:
     """
     Fetches a road network graph from the OSM API within a given polygon.
 
-    Results are cached locally to avoid repeated API calls. The cache key is
-    generated from the polygon's geometry and the network type.
+    Results are cached locally to avoid repeated API calls. The area is split
+    into fixed grid tiles of ``tile_size`` degrees which are fetched and
+    cached independently, then stitched, clipped to the polygon and
+    simplified, so overlapping or shifted polygons only download the tiles
+    that are not cached yet. The assembled network is cached as well, keyed
+    by the polygon's geometry, the network type and the tile size. Networks
+    are stored in the columnar binary format of road_graph_io, which loads
+    much faster than GraphML.
 
     Args:
         polygon: The shapely Polygon to define the area of interest.
         network_type: The type of network (e.g., 'drive', 'walk', 'bike').
-        truncate_by_polygon: Whether to truncate the graph to the polygon's
-                             boundary. Defaults to True.
+        truncate_by_polygon: Whether to truncate the graph strictly to the
+                             polygon's boundary. If False, edges with one
+                             endpoint inside are kept. Defaults to True.
+        as_csr: Whether to return a memory-mapped RoadGraphCSR view instead
+                of a networkx graph. Defaults to False.
+        tile_size: The tile edge length in degrees, or None to fetch the
+                   whole polygon in a single request.
 
     Returns:
-        A NetworkX MultiDiGraph representing the road network.
+        A NetworkX MultiDiGraph representing the road network, or its
+        RoadGraphCSR view if as_csr is True.
     """
-    DEFAULT_CACHE_DIR.mkdir(parents=True, exist_ok=True)
-
     # Use WKT representation for stable hashing of the geometry
     params = {
         "polygon_wkt": polygon.wkt,
         "network_type": network_type,
         "truncate_by_polygon": truncate_by_polygon,
+        "tile_size": tile_size,
     }
     cache_key = _get_cache_key(params)
-    cache_path = DEFAULT_CACHE_DIR / f"{cache_key}_road_network.graphml"
-
-    if cache_path.exists():
-        print(f"Cache hit. Loading road network from {cache_path}")
-        return ox.load_graphml(cache_path)
-
-    print("Cache miss. Fetching road network from OSM API...")
-    graph = ox.graph_from_polygon(
-        polygon,
-        network_type=network_type,
-        truncate_by_polygon=truncate_by_polygon,
-        retain_all=True,
-        simplify=True,
-    )
 
-    # Save to cache
-    ox.save_graphml(graph, filepath=cache_path)
-    print(f"Saved road network to cache: {cache_path}")
-
-    return graph
+    def fetch() -> nx.MultiDiGraph:
+        if tile_size is not None:
+            return _fetch_tiled_road_network(polygon, network_type, truncate_by_polygon, tile_size)
+
+        logger.info("Fetching road network from OSM API...")
+        count("osm_api_requests")
+        return ox.graph_from_polygon(
+            polygon,
+            network_type=network_type,
+            truncate_by_edge=not truncate_by_polygon,
+            retain_all=True,
+            simplify=True,
+        )
+
+    load = load_road_graph_csr if as_csr else load_road_graph
+    network = get_cache_store().get_or_create(
+        cache_key, "_road_network.npz", fetch, save_road_graph, load
+    )
+    if as_csr and isinstance(network, nx.MultiDiGraph):
+        # Freshly fetched on this call
+        network = RoadGraphCSR.from_graph(network)
+    if is_recording():
+        if as_csr:
+            annotate(nodes=network.num_nodes, edges=network.num_edges)
+        else:
+            annotate(nodes=network.number_of_nodes(), edges=network.number_of_edges())
+    return network
@@ -0,0 +1,390 @@
+# -*- coding: utf-8 -*-
+"""
+This module provides a compact, columnar binary format for road networks.
+
+Parsing GraphML is dominated by XML and per-attribute string conversion,
+which on a city-scale drive network costs far more than the routing work
+done afterwards. Here a graph is stored as flat NumPy columns in a single
+uncompressed ``.npz`` archive:
+
+- node ids and one column per node attribute,
+- edge endpoints (as node positions), edge keys and one column per edge
+  attribute,
+- a small JSON header with graph attributes and column encodings.
+
+Numeric and boolean attributes that are present on every element are kept
+as native arrays; geometries are stored as ragged WKB and anything else as
+ragged JSON. Because the archive is uncompressed, its members can be
+memory-mapped directly, so a CSR view for scipy/csgraph algorithms can be
+opened without building a networkx graph at all.
+"""
+
+import json
+import struct
+import zipfile
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Union
+
+import networkx as nx
+import numpy as np
+import scipy.sparse as sp
+import shapely
+from shapely.geometry.base import BaseGeometry
+
+FORMAT_VERSION = 1
+
+_NATIVE_ENCODINGS = {"int64", "float64", "bool"}
+_META_KEY = "meta"
+
+
+# --- Column encoding ---
+
+def _native_encoding(values: List[Any]) -> Optional[str]:
+    """Returns the native dtype name if every value is a plain scalar of one kind."""
+    if any(value is None for value in values):
+        return None
+    if all(isinstance(value, (bool, np.bool_)) for value in values):
+        return "bool"
+    if all(isinstance(value, (int, np.integer)) and not isinstance(value, (bool, np.bool_)) for value in values):
+        return "int64"
+    if all(isinstance(value, (int, float, np.integer, np.floating)) and not isinstance(value, (bool, np.bool_)) for value in values):
+        return "float64"
+    return None
+
+
+def _ragged(chunks: List[bytes]) -> Dict[str, np.ndarray]:
+    lengths = np.fromiter((len(chunk) for chunk in chunks), dtype=np.int64, count=len(chunks))
+    offsets = np.zeros(len(chunks) + 1, dtype=np.int64)
+    np.cumsum(lengths, out=offsets[1:])
+    data = np.frombuffer(b"".join(chunks), dtype=np.uint8)
+    return {"data": data, "offsets": offsets}
+
+
+def _encode_column(values: List[Any]) -> Dict[str, Any]:
+    """Encodes one attribute column; missing values are given as None."""
+    native = _native_encoding(values)
+    if native is not None:
+        return {"encoding": native, "arrays": {"values": np.asarray(values, dtype=native)}}
+
+    present = [value for value in values if value is not None]
+    if present and all(isinstance(value, BaseGeometry) for value in present):
+        chunks = [b"" if value is None else shapely.to_wkb(value) for value in values]
+        return {"encoding": "geometry", "arrays": _ragged(chunks)}
+
+    # Missing values are empty chunks, any real JSON document is non-empty
+    chunks = [b"" if value is None else json.dumps(value, default=_json_default).encode("utf-8") for value in values]
+    return {"encoding": "json", "arrays": _ragged(chunks)}
+
+
+def _json_default(value: Any) -> Any:
+    if isinstance(value, np.generic):
+        return value.item()
+    raise TypeError(f"Attribute value of type {type(value).__name__} cannot be cached")
+
+
+def _decode_column(encoding: str, arrays: Dict[str, np.ndarray]) -> List[Any]:
+    """Decodes a column back into a list of Python values, None for missing."""
+    if encoding in _NATIVE_ENCODINGS:
+        return arrays["values"].tolist()
+
+    data = np.asarray(arrays["data"]).tobytes()
+    offsets = np.asarray(arrays["offsets"]).tolist()
+    chunks = [data[start:end] for start, end in zip(offsets[:-1], offsets[1:])]
+    if encoding == "geometry":
+        present = [i for i, chunk in enumerate(chunks) if chunk]
+        decoded: List[Any] = [None] * len(chunks)
+        geometries = shapely.from_wkb(np.array([chunks[i] for i in present], dtype=object))
+        for i, geometry in zip(present, geometries):
+            decoded[i] = geometry
+        return decoded
+    if encoding == "json":
+        return [json.loads(chunk) if chunk else None for chunk in chunks]
+    raise ValueError(f"Unknown column encoding: {encoding}")
+
+
+def _attribute_names(attr_dicts: List[Dict[str, Any]]) -> List[str]:
+    """Returns the union of attribute names in first-seen order."""
+    names: Dict[str, None] = {}
+    for attrs in attr_dicts:
+        for name in attrs:
+            names.setdefault(name, None)
+    return list(names)
+
+
+# --- Graph <-> arrays ---
+
+def graph_to_arrays(graph: nx.MultiDiGraph) -> Dict[str, np.ndarray]:
+    """
+    Converts a road network into the flat arrays of the binary format.
+
+    Args:
+        graph: A networkx MultiDiGraph, typically produced by osmnx.
+
+    Returns:
+        A mapping from array name to array, ready for np.savez.
+    """
+    arrays: Dict[str, np.ndarray] = {}
+    node_ids = list(graph.nodes)
+    node_attrs = [graph.nodes[node] for node in node_ids]
+    node_position = {node: i for i, node in enumerate(node_ids)}
+
+    edges = list(graph.edges(keys=True, data=True))
+    arrays["edges/u"] = np.fromiter((node_position[u] for u, _, _, _ in edges), dtype=np.int64, count=len(edges))
+    arrays["edges/v"] = np.fromiter((node_position[v] for _, v, _, _ in edges), dtype=np.int64, count=len(edges))
+
+    meta: Dict[str, Any] = {
+        "version": FORMAT_VERSION,
+        "directed": graph.is_directed(),
+        "multigraph": graph.is_multigraph(),
+        "graph": dict(graph.graph),
+        "columns": {},
+    }
+
+    def add_column(prefix: str, values: List[Any]) -> None:
+        encoded = _encode_column(values)
+        meta["columns"][prefix] = encoded["encoding"]
+        for name, array in encoded["arrays"].items():
+            arrays[f"{prefix}/{name}"] = array
+
+    add_column("nodes/id", node_ids)
+    add_column("edges/key", [key for _, _, key, _ in edges])
+    for name in _attribute_names(node_attrs):
+        add_column(f"nodes/attr/{name}", [attrs.get(name) for attrs in node_attrs])
+    edge_attrs = [data for _, _, _, data in edges]
+    for name in _attribute_names(edge_attrs):
+        add_column(f"edges/attr/{name}", [attrs.get(name) for attrs in edge_attrs])
+
+    arrays[_META_KEY] = np.frombuffer(
+        json.dumps(meta, default=_json_default).encode("utf-8"), dtype=np.uint8
+    )
+    return arrays
+
+
+def _columns(arrays: Dict[str, np.ndarray], meta: Dict[str, Any], prefix: str) -> Dict[str, List[Any]]:
+    """Decodes all attribute columns under a prefix into lists."""
+    decoded = {}
+    for column, encoding in meta["columns"].items():
+        if not column.startswith(prefix):
+            continue
+        decoded[column[len(prefix):]] = _decode_column(encoding, _column_arrays(arrays, column))
+    return decoded
+
+
+def arrays_to_graph(arrays: Dict[str, np.ndarray]) -> nx.MultiDiGraph:
+    """Rebuilds a networkx MultiDiGraph from the arrays of the binary format."""
+    meta = _read_meta(arrays)
+    graph = nx.MultiDiGraph(**meta["graph"])
+
+    node_ids = _decode_column(meta["columns"]["nodes/id"], _column_arrays(arrays, "nodes/id"))
+    node_columns = _columns(arrays, meta, "nodes/attr/")
+    graph.add_nodes_from(
+        (node, {name: values[i] for name, values in node_columns.items() if values[i] is not None})
+        for i, node in enumerate(node_ids)
+    )
+
+    u = np.asarray(arrays["edges/u"]).tolist()
+    v = np.asarray(arrays["edges/v"]).tolist()
+    keys = _decode_column(meta["columns"]["edges/key"], _column_arrays(arrays, "edges/key"))
+    edge_columns = _columns(arrays, meta, "edges/attr/")
+    graph.add_edges_from(
+        (
+            node_ids[u[i]],
+            node_ids[v[i]],
+            keys[i],
+            {name: values[i] for name, values in edge_columns.items() if values[i] is not None},
+        )
+        for i in range(len(u))
+    )
+    return graph
+
+
+def _column_arrays(arrays: Dict[str, np.ndarray], column: str) -> Dict[str, np.ndarray]:
+    """Returns the arrays of one column keyed by their role, e.g. "values" or "offsets"."""
+    prefix = column + "/"
+    return {
+        key[len(prefix):]: array
+        for key, array in arrays.items()
+        if key.startswith(prefix) and "/" not in key[len(prefix):]
+    }
+
+
+def _read_meta(arrays: Dict[str, np.ndarray]) -> Dict[str, Any]:
+    meta = json.loads(np.asarray(arrays[_META_KEY]).tobytes().decode("utf-8"))
+    if meta.get("version") != FORMAT_VERSION:
+        raise ValueError(f"Unsupported road graph format version: {meta.get('version')}")
+    return meta
+
+
+# --- File I/O ---
+
+def save_road_graph(graph: nx.MultiDiGraph, path: Union[str, Path]) -> None:
+    """
+    Writes a road network to an uncompressed ``.npz`` archive.
+
+    Args:
+        graph: The road network to store.
+        path: The destination path. Its suffix is kept as given.
+    """
+    # Write through a file handle so numpy does not append ".npz" to the name
+    with open(path, "wb") as f:
+        np.savez(f, **graph_to_arrays(graph))
+
+
+def _memmap_npz(path: Path) -> Dict[str, np.ndarray]:
+    """Memory-maps every member of an uncompressed .npz archive."""
+    arrays = {}
+    with zipfile.ZipFile(path) as archive, open(path, "rb") as f:
+        for info in archive.infolist():
+            if info.compress_type != zipfile.ZIP_STORED:
+                raise ValueError(f"Cannot memory-map compressed member {info.filename}")
+            # The local file header is 30 bytes plus the name and extra fields
+            f.seek(info.header_offset)
+            header = f.read(30)
+            name_len, extra_len = struct.unpack("<HH", header[26:30])
+            f.seek(info.header_offset + 30 + name_len + extra_len)
+
+            version = np.lib.format.read_magic(f)
+            if version == (1, 0):
+                shape, fortran_order, dtype = np.lib.format.read_array_header_1_0(f)
+            else:
+                shape, fortran_order, dtype = np.lib.format.read_array_header_2_0(f)
+            name = info.filename[:-len(".npy")]
+            if int(np.prod(shape)) == 0:
+                arrays[name] = np.empty(shape, dtype=dtype)
+            else:
+                arrays[name] = np.memmap(
+                    path, dtype=dtype, mode="r", shape=shape,
+                    order="F" if fortran_order else "C", offset=f.tell(),
+                )
+    return arrays
+
+
+def load_road_graph_arrays(path: Union[str, Path], mmap: bool = True) -> Dict[str, np.ndarray]:
+    """
+    Opens the arrays of a stored road network.
+
+    Args:
+        path: The path written by save_road_graph.
+        mmap: Whether to memory-map the arrays instead of reading them.
+
+    Returns:
+        A mapping from array name to (possibly memory-mapped) array.
+    """
+    path = Path(path)
+    if mmap:
+        return _memmap_npz(path)
+    with np.load(path, allow_pickle=False) as archive:
+        return {name: archive[name] for name in archive.files}
+
+
+def load_road_graph(path: Union[str, Path]) -> nx.MultiDiGraph:
+    """Reads a road network written by save_road_graph into a MultiDiGraph."""
+    return arrays_to_graph(load_road_graph_arrays(path, mmap=False))
+
+
+# --- CSR view ---
+
+@dataclass
+class RoadGraphCSR:
+    """
+    A lightweight compressed-sparse-row view of a road network.
+
+    Outgoing edges of node position ``i`` are ``indices[indptr[i]:indptr[i + 1]]``
+    and ``edge_ids`` maps each CSR slot back to the stored edge row, so numeric
+    edge attributes can be gathered in CSR order without networkx.
+
+    Attributes:
+        node_ids: The original node ids, indexed by node position.
+        indptr: The CSR row pointer, of length num_nodes + 1.
+        indices: The target node position of every CSR slot.
+        edge_ids: The stored edge row of every CSR slot.
+        node_columns: Native numeric node attribute columns (e.g. "x", "y").
+        edge_columns: Native numeric edge attribute columns (e.g. "length").
+    """
+    node_ids: np.ndarray
+    indptr: np.ndarray
+    indices: np.ndarray
+    edge_ids: np.ndarray
+    node_columns: Dict[str, np.ndarray]
+    edge_columns: Dict[str, np.ndarray]
+
+    @property
+    def num_nodes(self) -> int:
+        return len(self.indptr) - 1
+
+    @property
+    def num_edges(self) -> int:
+        return len(self.indices)
+
+    @classmethod
+    def from_arrays(cls, arrays: Dict[str, np.ndarray]) -> "RoadGraphCSR":
+        """Builds the view from stored arrays; only native numeric columns are exposed."""
+        meta = _read_meta(arrays)
+        id_encoding = meta["columns"]["nodes/id"]
+        if id_encoding in _NATIVE_ENCODINGS:
+            node_ids = np.asarray(arrays["nodes/id/values"])
+        else:
+            node_ids = np.array(_decode_column(id_encoding, _column_arrays(arrays, "nodes/id")), dtype=object)
+
+        u = np.asarray(arrays["edges/u"])
+        v = np.asarray(arrays["edges/v"])
+        num_nodes = len(node_ids)
+        edge_ids = np.argsort(u, kind="stable")
+        indptr = np.zeros(num_nodes + 1, dtype=np.int64)
+        np.cumsum(np.bincount(u, minlength=num_nodes), out=indptr[1:])
+
+        def native(prefix: str) -> Dict[str, np.ndarray]:
+            return {
+                column[len(prefix):]: arrays[f"{column}/values"]
+                for column, encoding in meta["columns"].items()
+                if column.startswith(prefix) and encoding in ("int64", "float64")
+            }
+
+        return cls(
+            node_ids=node_ids,
+            indptr=indptr,
+            indices=v[edge_ids],
+            edge_ids=edge_ids,
+            node_columns=native("nodes/attr/"),
+            edge_columns=native("edges/attr/"),
+        )
+
+    @classmethod
+    def from_graph(cls, graph: nx.MultiDiGraph) -> "RoadGraphCSR":
+        """Builds the view directly from a networkx graph."""
+        return cls.from_arrays(graph_to_arrays(graph))
+
+    def edge_attribute(self, name: str) -> np.ndarray:
+        """Returns a numeric edge attribute in CSR slot order."""
+        return np.asarray(self.edge_columns[name])[self.edge_ids]
+
+    def to_sparse(self, weight: Union[str, np.ndarray] = "length") -> sp.csr_matrix:
+        """
+        Returns a scipy CSR adjacency matrix for csgraph algorithms.
+
+        Parallel edges are collapsed to the smallest weight, which is what
+        shortest-path routines would pick anyway.
+
+        Args:
+            weight: The name of a numeric edge attribute, or an array of
+                    weights in CSR slot order (e.g. derived travel times).
+        """
+        if isinstance(weight, str):
+            weight = self.edge_attribute(weight)
+        weights = np.asarray(weight, dtype=np.float64)
+        rows = np.repeat(np.arange(self.num_nodes), np.diff(self.indptr))
+        # Sort by (row, col, weight) and keep the first slot of each (row, col) pair
+        order = np.lexsort((weights, self.indices, rows))
+        rows, cols, weights = rows[order], self.indices[order], weights[order]
+        keep = np.ones(len(rows), dtype=bool)
+        keep[1:] = (rows[1:] != rows[:-1]) | (cols[1:] != cols[:-1])
+        return sp.csr_matrix(
+            (weights[keep], (rows[keep], cols[keep])),
+            shape=(self.num_nodes, self.num_nodes),
+        )
+
+
+def load_road_graph_csr(path: Union[str, Path], mmap: bool = True) -> RoadGraphCSR:
+    """Opens a stored road network as a CSR view without building networkx objects."""
+    return RoadGraphCSR.from_arrays(load_road_graph_arrays(path, mmap=mmap))
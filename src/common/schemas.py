@@ -7,7 +7,8 @@ particularly the data generator and the orchestration pipeline.
 """
 
 from dataclasses import dataclass, field
-from typing import List, Tuple, Optional, Union
+from enum import Enum
+from typing import Any, Dict, List, Tuple, Optional, Union
 
 
 @dataclass
@@ -26,7 +27,9 @@ class HomogeneousPoissonConfig:
 @dataclass
 class InhomogeneousPoissonConfig:
     """Configuration for an Inhomogeneous Poisson Process distribution."""
-    # A list of peaks defined by [center_x, center_y, peak_value, std_dev]
+    # A list of Gaussian peaks defined by [center_x, center_y, peak_value, std_dev].
+    # peak_value is the intensity (expected points per unit area) at the center;
+    # the intensity surface is the sum of all peaks.
     intensity_peaks: List[Tuple[float, float, float, float]]
 
 
@@ -56,3 +59,102 @@ class DataGeneratorConfig:
     # The system will prioritize sampling_config if both are present.
     distribution_config: Optional[Union[HomogeneousPoissonConfig, InhomogeneousPoissonConfig, NeymanScottConfig]] = None
     sampling_config: Optional[SamplingConfig] = None
+
+
+@dataclass
+class PBFLayerConfig:
+    """Configuration for one layer extracted from a local .osm.pbf file."""
+    name: str
+    # One of "boundaries", "roads", "pois", "buildings" or "landuse".
+    feature_type: str
+    # OSM tag filter, e.g. {"highway": ["primary", "secondary"]} or {"amenity": True}.
+    tags: Optional[Dict[str, Any]] = None
+    # Only used for roads: the pyrosm network type.
+    network_type: str = "driving"
+
+
+class ContiguityMethod(Enum):
+    """How adjacency between base units is defined."""
+    ROOK = "rook"  # Units share a border of positive length
+    QUEEN = "queen"  # Units share a border or a single point
+
+
+class WeightingMethod(Enum):
+    """How the weight of an edge between adjacent units is computed."""
+    UNIFORM = "uniform"  # All edges have weight 1.0
+    SHARED_BORDER_LENGTH = "shared_border_length"  # Length of the common border (0.0 for corner-only neighbours)
+    DISTANCE = "distance"  # Distance between the unit centroids
+
+
+@dataclass
+class GraphBuilderConfig:
+    """Configuration for building the territory graph from base units."""
+    contiguity_method: ContiguityMethod = ContiguityMethod.QUEEN
+    weighting_method: WeightingMethod = WeightingMethod.UNIFORM
+
+
+class BalanceMetric(Enum):
+    """The unit attribute that territories are balanced on."""
+    WORKLOAD = "total_workload"
+    SALES_POTENTIAL = "total_sales_potential"
+
+
+@dataclass
+class PartitionerConfig:
+    """
+    Common configuration of all partitioning algorithms.
+    Algorithm-specific configurations inherit from this class.
+    """
+    num_partitions: int  # The number of territories to create
+
+
+@dataclass
+class MultilevelPartitionerConfig(PartitionerConfig):
+    """Configuration for the multilevel balanced partitioner."""
+    balance_metric: BalanceMetric = BalanceMetric.WORKLOAD
+    # Allowed relative deviation of each territory's weight from the mean
+    balance_tolerance: float = 0.05
+    # Coarsening stops at about this many vertices per territory
+    coarsening_threshold: int = 20
+    # Maximum refinement passes per level
+    refinement_passes: int = 10
+    seed: Optional[int] = None  # Seed for reproducible results
+
+
+@dataclass
+class IncrementalAlignmentConfig:
+    """Configuration for re-balancing an existing alignment after customer changes."""
+    balance_metric: BalanceMetric = BalanceMetric.WORKLOAD
+    # Allowed relative deviation of each territory's weight from the mean
+    balance_tolerance: float = 0.05
+    # At most this many units change territory; balance may then stay incomplete
+    max_moved_units: int = 200
+
+
+@dataclass
+class ScenarioConfig:
+    """One generated dataset of an experiment sweep."""
+    name: str
+    data_generator_config: DataGeneratorConfig
+    graph_builder_config: GraphBuilderConfig = field(default_factory=GraphBuilderConfig)
+
+
+@dataclass
+class AlgorithmConfig:
+    """One partitioning algorithm of an experiment sweep."""
+    name: str
+    # The registered algorithm type, e.g. "multilevel"
+    type: str
+    # Keyword arguments of the algorithm's PartitionerConfig; the seed is set per run
+    params: Dict[str, Any] = field(default_factory=dict)
+
+
+@dataclass
+class ExperimentSweepConfig:
+    """A grid of scenarios x algorithms x seeds, run as one experiment."""
+    name: str
+    scenarios: List[ScenarioConfig]
+    algorithms: List[AlgorithmConfig]
+    # Every seed regenerates each scenario with it as random_seed (None keeps
+    # the scenario's own) and seeds the partitioner
+    seeds: List[Optional[int]] = field(default_factory=lambda: [None])
@@ -6,14 +6,18 @@ It can generate data from scratch using spatial point process models or
 sample from existing real-world data to create semi-synthetic datasets.
 """
 
-from typing import Tuple, Union
+import logging
+from concurrent.futures import ProcessPoolExecutor
+from multiprocessing.context import BaseContext
+from pathlib import Path
+from typing import Any, Dict, Iterator, List, Optional, Tuple, Union
 
 import geopandas as gpd
 import numpy as np
 import pandas as pd
-from scipy.spatial import Voronoi
-from shapely.geometry import box, Point, Polygon
-from sklearn.datasets import make_blobs
+from scipy.spatial import cKDTree
+import shapely
+from shapely.geometry import box
 
 from src.common.schemas import (
     DataGeneratorConfig,
@@ -23,90 +27,180 @@ from src.common.schemas import (
     InhomogeneousPoissonConfig,
     NeymanScottConfig
 )
+from src.common.instrumentation import annotate, span
 
-def _generate_voronoi_units(config: VoronoiConfig) -> gpd.GeoDataFrame:
-    """Generates a GeoDataFrame of Voronoi cells within a bounding box."""
+logger = logging.getLogger(__name__)
+
+def _generate_voronoi_units(config: VoronoiConfig, rng: np.random.Generator) -> gpd.GeoDataFrame:
+    """
+    Generates a GeoDataFrame of Voronoi cells that tile the bounding box.
+
+    The diagram is built in a single GEOS call with the cells extended to the
+    bounding box, so border seeds get finite cells instead of being dropped.
+    All cells are then clipped in bulk, which yields exactly ``num_units``
+    units whose union covers the whole bounding box.
+    """
     min_x, min_y, max_x, max_y = config.bounding_box
-    x_coords = np.random.uniform(min_x, max_x, config.num_units)
-    y_coords = np.random.uniform(min_y, max_y, config.num_units)
+    x_coords = rng.uniform(min_x, max_x, config.num_units)
+    y_coords = rng.uniform(min_y, max_y, config.num_units)
     points = np.vstack([x_coords, y_coords]).T
 
-    # Add points at the corners of the bounding box to ensure the Voronoi cells cover the entire area
-    # This is a common technique to handle infinite Voronoi regions
-    points = np.concatenate([points, [[min_x, min_y], [min_x, max_y], [max_x, min_y], [max_x, max_y]]])
-
-    vor = Voronoi(points)
-    
     bounding_box_poly = box(*config.bounding_box)
-    polygons = []
-    for region in vor.regions:
-        if not region or -1 in region:
-            continue
-        
-        polygon_vertices = [vor.vertices[i] for i in region]
-        if len(polygon_vertices) > 2:
-            # Create a shapely Polygon and clip it to the bounding box
-            shape = Polygon(polygon_vertices)
-            if shape.is_valid:
-                clipped_shape = shape.intersection(bounding_box_poly)
-                if not clipped_shape.is_empty:
-                    polygons.append(clipped_shape)
+    # ordered=True keeps cell i aligned with seed i
+    cells = shapely.voronoi_polygons(
+        shapely.multipoints(points), extend_to=bounding_box_poly, ordered=True
+    )
+    polygons = shapely.intersection(shapely.get_parts(cells), bounding_box_poly)
 
     units_gdf = gpd.GeoDataFrame(geometry=polygons, crs="EPSG:4326")
-    # Filter out any potential empty geometries that might have been created
-    units_gdf = units_gdf[~units_gdf.is_empty]
     units_gdf["unit_id"] = range(len(units_gdf))
+    # Keep the generating seeds, they allow nearest-seed assignment of customers
+    units_gdf["seed_x"] = x_coords
+    units_gdf["seed_y"] = y_coords
     return units_gdf
 
-def _generate_points_from_distribution(
-    config: Union[HomogeneousPoissonConfig, InhomogeneousPoissonConfig, NeymanScottConfig],
-    bounding_box: Tuple[float, float, float, float]
-) -> gpd.GeoDataFrame:
-    """Generates customer points based on a specified distribution model."""
+
+# Resolution of the piecewise-constant envelope used when thinning an
+# inhomogeneous Poisson process. Each cell gets its own majorant intensity,
+# which keeps the acceptance rate high even for narrow intensity peaks.
+_THINNING_GRID_SIZE = 64
+
+
+def _gaussian_intensity(
+    x: np.ndarray,
+    y: np.ndarray,
+    intensity_peaks: List[Tuple[float, float, float, float]]
+) -> np.ndarray:
+    """Evaluates the sum-of-Gaussians intensity surface at the given coordinates."""
+    intensity = np.zeros(np.broadcast(x, y).shape)
+    for center_x, center_y, peak_value, std_dev in intensity_peaks:
+        sq_dist = (x - center_x) ** 2 + (y - center_y) ** 2
+        intensity += peak_value * np.exp(-sq_dist / (2.0 * std_dev ** 2))
+    return intensity
+
+
+def _iter_homogeneous_poisson(
+    config: HomogeneousPoissonConfig,
+    bounding_box: Tuple[float, float, float, float],
+    rng: np.random.Generator,
+    chunk_size: Optional[int] = None
+) -> Iterator[np.ndarray]:
+    """Samples a homogeneous Poisson process, yielding at most chunk_size points at a time."""
     min_x, min_y, max_x, max_y = bounding_box
     area = (max_x - min_x) * (max_y - min_y)
-    points = []
+    num_points = rng.poisson(config.intensity * area)
+    step = chunk_size or max(num_points, 1)
 
-    if isinstance(config, HomogeneousPoissonConfig):
-        num_points = np.random.poisson(config.intensity * area)
-        x_coords = np.random.uniform(min_x, max_x, num_points)
-        y_coords = np.random.uniform(min_y, max_y, num_points)
-        points = np.vstack([x_coords, y_coords]).T
+    for start in range(0, num_points, step):
+        n = min(step, num_points - start)
+        x_coords = rng.uniform(min_x, max_x, n)
+        y_coords = rng.uniform(min_y, max_y, n)
+        yield np.vstack([x_coords, y_coords]).T
 
-    elif isinstance(config, InhomogeneousPoissonConfig):
-        # Using make_blobs is a reasonable approximation for clustered distributions
-        centers = [peak[:2] for peak in config.intensity_peaks]
-        # Treat peak value as number of samples for simplicity
-        n_samples = [int(peak[2]) for peak in config.intensity_peaks]
-        cluster_std = [peak[3] for peak in config.intensity_peaks]
-
-        points, _ = make_blobs(
-            n_samples=n_samples,
-            centers=centers,
-            cluster_std=cluster_std
-        )
 
-    elif isinstance(config, NeymanScottConfig):
-        # 1. Generate parent points
-        num_parents = np.random.poisson(config.parent_intensity * area)
-        parent_x = np.random.uniform(min_x, max_x, num_parents)
-        parent_y = np.random.uniform(min_y, max_y, num_parents)
-
-        # 2. Generate offspring for each parent
-        for i in range(num_parents):
-            # Generate random angles and radii for offspring
-            angles = np.random.uniform(0, 2 * np.pi, config.offspring_per_parent)
-            radii = np.random.uniform(0, config.offspring_radius, config.offspring_per_parent)
-            
-            offspring_x = parent_x[i] + radii * np.cos(angles)
-            offspring_y = parent_y[i] + radii * np.sin(angles)
-            points.extend(zip(offspring_x, offspring_y))
-        
-        points = np.array(points)
+def _iter_inhomogeneous_poisson(
+    intensity_peaks: List[Tuple[float, float, float, float]],
+    bounding_box: Tuple[float, float, float, float],
+    rng: np.random.Generator,
+    chunk_size: Optional[int] = None
+) -> Iterator[np.ndarray]:
+    """
+    Samples an inhomogeneous Poisson process by vectorized Lewis-Shedler thinning.
+
+    The bounding box is divided into a regular grid. For every cell, an upper
+    bound of the intensity is obtained by evaluating each peak at the point of
+    the cell closest to its center. Candidates are drawn from this piecewise
+    constant majorant in batches of at most chunk_size and accepted with
+    probability ``intensity / majorant``.
+    """
+    min_x, min_y, max_x, max_y = bounding_box
+    n = _THINNING_GRID_SIZE
+    x_edges = np.linspace(min_x, max_x, n + 1)
+    y_edges = np.linspace(min_y, max_y, n + 1)
+    cell_w = (max_x - min_x) / n
+    cell_h = (max_y - min_y) / n
+
+    # Majorant per cell: each Gaussian is maximal at the cell point nearest to its center.
+    majorant = np.zeros((n, n))
+    for center_x, center_y, peak_value, std_dev in intensity_peaks:
+        nearest_x = np.clip(center_x, x_edges[:-1], x_edges[1:])
+        nearest_y = np.clip(center_y, y_edges[:-1], y_edges[1:])
+        sq_dist = (nearest_x[:, None] - center_x) ** 2 + (nearest_y[None, :] - center_y) ** 2
+        majorant += peak_value * np.exp(-sq_dist / (2.0 * std_dev ** 2))
+    majorant = majorant.ravel()
+
+    counts = rng.poisson(majorant * cell_w * cell_h)
+    cell_ends = np.cumsum(counts)
+    num_candidates = int(cell_ends[-1])
+    step = chunk_size or max(num_candidates, 1)
+
+    for start in range(0, num_candidates, step):
+        # Map candidate positions to their cells without materializing the full index
+        cell_idx = np.searchsorted(cell_ends, np.arange(start, min(start + step, num_candidates)), side="right")
+        x = x_edges[cell_idx // n] + rng.uniform(0, cell_w, len(cell_idx))
+        y = y_edges[cell_idx % n] + rng.uniform(0, cell_h, len(cell_idx))
+
+        accept_prob = _gaussian_intensity(x, y, intensity_peaks) / majorant[cell_idx]
+        keep = rng.uniform(0, 1, len(cell_idx)) < accept_prob
+        yield np.column_stack([x[keep], y[keep]])
+
 
+def _iter_neyman_scott(
+    config: NeymanScottConfig,
+    bounding_box: Tuple[float, float, float, float],
+    rng: np.random.Generator,
+    chunk_size: Optional[int] = None
+) -> Iterator[np.ndarray]:
+    """Samples a Neyman-Scott cluster process, drawing the offspring of many parents per batch."""
+    min_x, min_y, max_x, max_y = bounding_box
+    area = (max_x - min_x) * (max_y - min_y)
+
+    # 1. Generate parent points
+    num_parents = rng.poisson(config.parent_intensity * area)
+    parent_x = rng.uniform(min_x, max_x, num_parents)
+    parent_y = rng.uniform(min_y, max_y, num_parents)
+
+    # 2. Generate the offspring of a whole batch of parents at once
+    if chunk_size:
+        parents_per_batch = max(chunk_size // max(config.offspring_per_parent, 1), 1)
+    else:
+        parents_per_batch = max(num_parents, 1)
+
+    for start in range(0, num_parents, parents_per_batch):
+        batch = slice(start, start + parents_per_batch)
+        num_offspring = len(parent_x[batch]) * config.offspring_per_parent
+        angles = rng.uniform(0, 2 * np.pi, num_offspring)
+        radii = rng.uniform(0, config.offspring_radius, num_offspring)
+        offspring_x = np.repeat(parent_x[batch], config.offspring_per_parent) + radii * np.cos(angles)
+        offspring_y = np.repeat(parent_y[batch], config.offspring_per_parent) + radii * np.sin(angles)
+        yield np.column_stack([offspring_x, offspring_y])
+
+
+def _iter_points_from_distribution(
+    config: Union[HomogeneousPoissonConfig, InhomogeneousPoissonConfig, NeymanScottConfig],
+    bounding_box: Tuple[float, float, float, float],
+    rng: np.random.Generator,
+    chunk_size: Optional[int] = None
+) -> Iterator[np.ndarray]:
+    """Dispatches to the batch sampler of the configured distribution model."""
+    if isinstance(config, HomogeneousPoissonConfig):
+        return _iter_homogeneous_poisson(config, bounding_box, rng, chunk_size)
+    elif isinstance(config, InhomogeneousPoissonConfig):
+        return _iter_inhomogeneous_poisson(config.intensity_peaks, bounding_box, rng, chunk_size)
+    elif isinstance(config, NeymanScottConfig):
+        return _iter_neyman_scott(config, bounding_box, rng, chunk_size)
     else:
         raise NotImplementedError(f"Distribution type {type(config)} not yet implemented.")
 
+
+def _points_to_customers(
+    points: np.ndarray,
+    bounding_box: Tuple[float, float, float, float],
+    rng: np.random.Generator
+) -> gpd.GeoDataFrame:
+    """Clips raw coordinates to the bounding box and attaches mock business data."""
+    min_x, min_y, max_x, max_y = bounding_box
+
     if len(points) == 0:
         # Return empty GeoDataFrame with correct columns if no points were generated
         return gpd.GeoDataFrame({
@@ -126,64 +220,384 @@ def _generate_points_from_distribution(
         crs="EPSG:4326"
     )
     # Add mock business data
-    customers_gdf["sales_potential"] = np.random.uniform(1000, 10000, size=len(customers_gdf)).round(2)
-    customers_gdf["workload"] = np.random.uniform(1, 10, size=len(customers_gdf)).round(2)
+    customers_gdf["sales_potential"] = rng.uniform(1000, 10000, size=len(customers_gdf)).round(2)
+    customers_gdf["workload"] = rng.uniform(1, 10, size=len(customers_gdf)).round(2)
     return customers_gdf
 
-def _generate_points_from_sampling(config: SamplingConfig) -> gpd.GeoDataFrame:
-    """Generates customer points by sampling from a source file."""
-    source_df = pd.read_csv(config.source_filepath)
-    # Assuming source_df has 'latitude' and 'longitude' columns
-    sampled_df = source_df.sample(frac=config.fraction, random_state=42) # Using fixed seed for sampling part
-    
-    customers_gdf = gpd.GeoDataFrame(
+
+def _generate_points_from_distribution(
+    config: Union[HomogeneousPoissonConfig, InhomogeneousPoissonConfig, NeymanScottConfig],
+    bounding_box: Tuple[float, float, float, float],
+    rng: np.random.Generator
+) -> gpd.GeoDataFrame:
+    """Generates customer points based on a specified distribution model."""
+    batches = list(_iter_points_from_distribution(config, bounding_box, rng))
+    points = np.concatenate(batches) if batches else np.empty((0, 2))
+    return _points_to_customers(points, bounding_box, rng)
+
+
+def _sampled_to_customers(sampled_df: pd.DataFrame) -> gpd.GeoDataFrame:
+    """Wraps sampled source rows into a customers GeoDataFrame."""
+    # Assuming the source has 'latitude' and 'longitude' columns
+    return gpd.GeoDataFrame(
         sampled_df,
         geometry=gpd.points_from_xy(sampled_df.longitude, sampled_df.latitude),
         crs="EPSG:4326"
     )
-    return customers_gdf
 
-def _assign_units_to_points(
+
+def _generate_points_from_sampling(config: SamplingConfig, rng: np.random.Generator) -> gpd.GeoDataFrame:
+    """Generates customer points by sampling from a source file."""
+    source_df = pd.read_csv(config.source_filepath)
+    sampled_df = source_df.sample(frac=config.fraction, random_state=rng)
+    return _sampled_to_customers(sampled_df)
+
+
+def _iter_points_from_sampling(
+    config: SamplingConfig, rng: np.random.Generator, chunk_size: int
+) -> Iterator[gpd.GeoDataFrame]:
+    """Samples the source file chunk by chunk without loading it entirely."""
+    for source_chunk in pd.read_csv(config.source_filepath, chunksize=chunk_size):
+        sampled_df = source_chunk.sample(frac=config.fraction, random_state=rng)
+        yield _sampled_to_customers(sampled_df)
+
+
+def _assign_units_by_nearest_seed(
     customers_gdf: gpd.GeoDataFrame, units_gdf: gpd.GeoDataFrame
 ) -> gpd.GeoDataFrame:
-    """Spatially joins customer points to the generated Voronoi units."""
-    # Perform the spatial join
+    """
+    Assigns every customer to the unit of its nearest Voronoi seed.
+
+    For Voronoi units, point-in-cell is equivalent to nearest-seed, so a
+    KD-tree query replaces all polygon tests. Points equidistant from several
+    seeds (i.e. on a shared cell boundary) go to the lowest ``unit_id``, and
+    points outside the extent of the unit layer are dropped, as with sjoin.
+    """
+    seeds = units_gdf[["seed_x", "seed_y"]].to_numpy()
+    unit_ids = units_gdf["unit_id"].to_numpy()
+    coords = shapely.get_coordinates(customers_gdf.geometry.values)
+
+    min_x, min_y, max_x, max_y = units_gdf.total_bounds
+    inside = (
+        (coords[:, 0] >= min_x) & (coords[:, 0] <= max_x) &
+        (coords[:, 1] >= min_y) & (coords[:, 1] <= max_y)
+    )
+    coords = coords[inside]
+
+    k = min(2, len(seeds))
+    dist, idx = cKDTree(seeds).query(coords, k=k)
+    if k == 1:
+        nearest = unit_ids[idx]
+    else:
+        # Break exact ties deterministically in favour of the lowest unit_id
+        candidates = unit_ids[idx]
+        tie = np.isclose(dist[:, 0], dist[:, 1], rtol=0, atol=1e-12)
+        nearest = np.where(tie, candidates.min(axis=1), candidates[:, 0])
+
+    assigned_gdf = customers_gdf[inside].copy()
+    assigned_gdf["unit_id"] = nearest
+    return assigned_gdf
+
+
+def _assign_units_by_sjoin(
+    customers_gdf: gpd.GeoDataFrame, units_gdf: gpd.GeoDataFrame
+) -> gpd.GeoDataFrame:
+    """Spatially joins customer points to an arbitrary unit layer."""
+    # Perform the spatial join. 'intersects' keeps customers lying exactly on a
+    # shared boundary; those matching several units are given the lowest one.
     # This adds an 'index_right' column which corresponds to the index of the units_gdf
-    joined_gdf = gpd.sjoin(customers_gdf, units_gdf, how="inner", predicate="within")
-    
+    joined_gdf = gpd.sjoin(
+        customers_gdf, units_gdf[["unit_id", "geometry"]], how="inner", predicate="intersects"
+    )
+    joined_gdf = joined_gdf.sort_values("index_right", kind="stable")
+    joined_gdf = joined_gdf[~joined_gdf.index.duplicated(keep="first")]
+    joined_gdf = joined_gdf.reindex(customers_gdf.index[customers_gdf.index.isin(joined_gdf.index)])
+
     # Rename 'index_right' to 'unit_id' from the units GeoDataFrame
     # Note: The original unit_id column in units_gdf is used for the join's index.
     joined_gdf = joined_gdf.drop(columns=["unit_id"])
-    joined_gdf = joined_gdf.rename(columns={"index_right": "unit_id"})
+    return joined_gdf.rename(columns={"index_right": "unit_id"})
+
+
+def _assign_units_to_points(
+    customers_gdf: gpd.GeoDataFrame,
+    units_gdf: gpd.GeoDataFrame,
+    method: str = "auto",
+) -> gpd.GeoDataFrame:
+    """
+    Assigns each customer point to the base unit that contains it.
+
+    Args:
+        customers_gdf: The customer points.
+        units_gdf: The base units. Units generated by ``_generate_voronoi_units``
+                   carry their seeds in ``seed_x``/``seed_y``.
+        method: "kdtree" for a nearest-seed query (Voronoi units only),
+                "sjoin" for a general spatial join, or "auto" to use the
+                KD-tree whenever seed columns are present.
+
+    Returns:
+        The customers that fall inside the unit layer, with ``unit_id`` and
+        ``customer_id`` columns.
+    """
+    has_seeds = {"seed_x", "seed_y"}.issubset(units_gdf.columns)
+    if method == "auto":
+        method = "kdtree" if has_seeds else "sjoin"
+
+    if method == "kdtree":
+        if not has_seeds:
+            raise ValueError("The 'kdtree' method requires seed_x/seed_y columns on the units.")
+        joined_gdf = _assign_units_by_nearest_seed(customers_gdf, units_gdf)
+    elif method == "sjoin":
+        joined_gdf = _assign_units_by_sjoin(customers_gdf, units_gdf)
+    else:
+        raise ValueError(f"Unsupported assignment method: {method}")
+
     joined_gdf["customer_id"] = range(len(joined_gdf))
     return joined_gdf
 
+def _scenario_rngs(
+    config: DataGeneratorConfig,
+    seed_sequence: Optional[np.random.SeedSequence] = None,
+) -> Tuple[np.random.Generator, np.random.Generator]:
+    """
+    Derives independent generators for the base units and the customers.
+
+    Using separate child streams means the customer points of a scenario do
+    not shift when only the number of units changes. The children are built
+    from the spawn key directly, so the same SeedSequence always yields the
+    same streams no matter how often it is reused.
+    """
+    if seed_sequence is None:
+        seed_sequence = np.random.SeedSequence(config.random_seed)
+    units_seq, customers_seq = (
+        np.random.SeedSequence(
+            seed_sequence.entropy,
+            spawn_key=(*seed_sequence.spawn_key, i),
+            pool_size=seed_sequence.pool_size,
+        )
+        for i in range(2)
+    )
+    return np.random.default_rng(units_seq), np.random.default_rng(customers_seq)
+
+
 def generate_data(
     config: DataGeneratorConfig,
+    seed_sequence: Optional[np.random.SeedSequence] = None,
 ) -> Tuple[gpd.GeoDataFrame, gpd.GeoDataFrame]:
-    """Main function to generate a complete synthetic dataset."""
-    # 1. Set random seed for reproducibility
-    np.random.seed(config.random_seed)
-
-    # 2. Generate base geographic units
-    print("Generating Voronoi base units...")
-    base_units_gdf = _generate_voronoi_units(config.voronoi_config)
-
-    # 3. Generate customer points based on the selected mode
-    if config.sampling_config:
-        print("Generating customer points from sampling...")
-        customers_gdf = _generate_points_from_sampling(config.sampling_config)
-    elif config.distribution_config:
-        print("Generating customer points from distribution model...")
-        customers_gdf = _generate_points_from_distribution(
-            config.distribution_config, config.voronoi_config.bounding_box
-        )
+    """
+    Main function to generate a complete synthetic dataset.
+
+    Randomness comes from generators local to this call, seeded from
+    ``seed_sequence`` or, by default, from ``config.random_seed``, so the
+    function is safe to run concurrently.
+    """
+    with span("generate_data"):
+        # 1. Create the random streams for reproducibility
+        units_rng, customers_rng = _scenario_rngs(config, seed_sequence)
+
+        # 2. Generate base geographic units
+        logger.info("Generating Voronoi base units...")
+        with span("generate_voronoi_units"):
+            base_units_gdf = _generate_voronoi_units(config.voronoi_config, units_rng)
+            annotate(rows=len(base_units_gdf))
+
+        # 3. Generate customer points based on the selected mode
+        if config.sampling_config:
+            logger.info("Generating customer points from sampling...")
+            with span("generate_customers", mode="sampling"):
+                customers_gdf = _generate_points_from_sampling(config.sampling_config, customers_rng)
+                annotate(rows=len(customers_gdf))
+        elif config.distribution_config:
+            logger.info("Generating customer points from distribution model...")
+            with span("generate_customers", mode=type(config.distribution_config).__name__):
+                customers_gdf = _generate_points_from_distribution(
+                    config.distribution_config, config.voronoi_config.bounding_box, customers_rng
+                )
+                annotate(rows=len(customers_gdf))
+        else:
+            raise ValueError("Either distribution_config or sampling_config must be provided.")
+
+        # 4. Assign customers to the base units
+        logger.info("Assigning customers to base units...")
+        with span("assign_units_to_points"):
+            final_customers_gdf = _assign_units_to_points(customers_gdf, base_units_gdf)
+            annotate(rows=len(final_customers_gdf))
+
+        annotate(num_units=len(base_units_gdf), num_customers=len(final_customers_gdf))
+        logger.info("Synthetic data generation complete.")
+    return base_units_gdf, final_customers_gdf
+
+
+def _generate_scenario(
+    args: Tuple[DataGeneratorConfig, np.random.SeedSequence]
+) -> Tuple[gpd.GeoDataFrame, gpd.GeoDataFrame]:
+    """Process-pool entry point for a single batch scenario."""
+    config, seed_sequence = args
+    return generate_data(config, seed_sequence)
+
+
+def generate_data_batch(
+    configs: List[DataGeneratorConfig],
+    max_workers: Optional[int] = None,
+    base_seed: Optional[int] = None,
+    mp_context: Optional[BaseContext] = None,
+) -> List[Tuple[gpd.GeoDataFrame, gpd.GeoDataFrame]]:
+    """
+    Generates many scenarios in parallel across a process pool.
+
+    Each scenario gets its own SeedSequence, decided before any work is
+    scheduled, so the output is bit-for-bit identical for any worker count
+    or completion order.
+
+    Args:
+        configs: The scenario configurations.
+        max_workers: The number of worker processes. ``1`` runs the scenarios
+                     in the calling process; ``None`` uses all CPUs.
+        base_seed: If given, scenario ``i`` uses child ``i`` spawned from
+                   ``SeedSequence(base_seed)``, giving statistically
+                   independent streams even for configs sharing a
+                   ``random_seed``. Otherwise each scenario is seeded from its
+                   own ``random_seed``, exactly as ``generate_data`` would be.
+        mp_context: The multiprocessing context for the worker processes, e.g.
+                    a forkserver context when called from a threaded program.
+                    Defaults to the platform's start method.
+
+    Returns:
+        A list of ``(base_units_gdf, customers_gdf)`` tuples in input order.
+    """
+    if base_seed is not None:
+        seed_sequences = np.random.SeedSequence(base_seed).spawn(len(configs))
     else:
+        seed_sequences = [np.random.SeedSequence(config.random_seed) for config in configs]
+    tasks = list(zip(configs, seed_sequences))
+
+    if max_workers == 1 or len(tasks) <= 1:
+        return [_generate_scenario(task) for task in tasks]
+
+    with ProcessPoolExecutor(max_workers=max_workers, mp_context=mp_context) as executor:
+        return list(executor.map(_generate_scenario, tasks))
+
+
+# Number of customer points materialized at once in streaming mode.
+DEFAULT_CHUNK_SIZE = 500_000
+
+
+def generate_data_stream(
+    config: DataGeneratorConfig,
+    chunk_size: int = DEFAULT_CHUNK_SIZE,
+    seed_sequence: Optional[np.random.SeedSequence] = None,
+) -> Tuple[gpd.GeoDataFrame, Iterator[gpd.GeoDataFrame]]:
+    """
+    Generates a synthetic dataset whose customers are produced in bounded-size chunks.
+
+    The base units are built eagerly, since their size depends only on
+    ``num_units``. Customers are generated lazily: each chunk is sampled,
+    assigned to the base units and yielded before the next one is drawn, so
+    peak memory is governed by ``chunk_size`` and not the total point count.
+
+    Args:
+        config: The data generator configuration.
+        chunk_size: The maximum number of candidate points drawn per chunk.
+        seed_sequence: Optional seed, defaults to ``config.random_seed``.
+
+    Returns:
+        A tuple of the base units GeoDataFrame and an iterator of assigned
+        customer chunks. ``customer_id`` is unique across all chunks.
+    """
+    if chunk_size <= 0:
+        raise ValueError("chunk_size must be a positive integer.")
+    if not (config.sampling_config or config.distribution_config):
         raise ValueError("Either distribution_config or sampling_config must be provided.")
 
-    # 4. Assign customers to the base units
-    print("Assigning customers to base units...")
-    final_customers_gdf = _assign_units_to_points(customers_gdf, base_units_gdf)
+    units_rng, customers_rng = _scenario_rngs(config, seed_sequence)
+    logger.info("Generating Voronoi base units...")
+    with span("generate_voronoi_units"):
+        base_units_gdf = _generate_voronoi_units(config.voronoi_config, units_rng)
+        annotate(rows=len(base_units_gdf))
 
-    print("Synthetic data generation complete.")
-    return base_units_gdf, final_customers_gdf
+    def _chunks() -> Iterator[gpd.GeoDataFrame]:
+        bounding_box = config.voronoi_config.bounding_box
+        if config.sampling_config:
+            raw_chunks = _iter_points_from_sampling(config.sampling_config, customers_rng, chunk_size)
+        else:
+            raw_chunks = (
+                _points_to_customers(points, bounding_box, customers_rng)
+                for points in _iter_points_from_distribution(
+                    config.distribution_config, bounding_box, customers_rng, chunk_size
+                )
+            )
+
+        offset = 0
+        for customers_gdf in raw_chunks:
+            customers_gdf.index = pd.RangeIndex(offset, offset + len(customers_gdf))
+            with span("assign_units_to_points", chunk_offset=offset):
+                assigned_gdf = _assign_units_to_points(customers_gdf, base_units_gdf)
+                annotate(rows=len(assigned_gdf))
+            assigned_gdf["customer_id"] += offset
+            offset += len(customers_gdf)
+            yield assigned_gdf
+
+    return base_units_gdf, _chunks()
+
+
+def write_data_stream(
+    config: DataGeneratorConfig,
+    output_dir: Union[str, Path],
+    chunk_size: int = DEFAULT_CHUNK_SIZE,
+    file_format: str = "parquet",
+) -> Dict[str, Any]:
+    """
+    Generates a synthetic dataset and writes it incrementally to disk.
+
+    Base units are written to ``base_units.<ext>``. Customers are written as a
+    partitioned dataset under ``customers/``, one ``part-NNNNN.<ext>`` file per
+    chunk, which GeoPandas/pyarrow can read back as a single dataset.
+
+    Args:
+        config: The data generator configuration.
+        output_dir: The directory to write the dataset to.
+        chunk_size: The maximum number of candidate points drawn per chunk.
+        file_format: Either "parquet" (GeoParquet) or "feather".
+
+    Returns:
+        A summary dictionary with the written paths and row counts.
+    """
+    if file_format not in ("parquet", "feather"):
+        raise ValueError(f"Unsupported file_format: {file_format}")
+
+    output_dir = Path(output_dir)
+    customers_dir = output_dir / "customers"
+    customers_dir.mkdir(parents=True, exist_ok=True)
+
+    def _write(gdf: gpd.GeoDataFrame, path: Path) -> None:
+        if file_format == "parquet":
+            gdf.to_parquet(path)
+        else:
+            gdf.to_feather(path)
+
+    with span("write_data_stream", file_format=file_format):
+        base_units_gdf, chunks = generate_data_stream(config, chunk_size)
+        base_units_path = output_dir / f"base_units.{file_format}"
+        with span("write_chunk", rows=len(base_units_gdf)):
+            _write(base_units_gdf, base_units_path)
+
+        num_chunks = 0
+        num_customers = 0
+        for customers_gdf in chunks:
+            if customers_gdf.empty:
+                continue
+            with span("write_chunk", rows=len(customers_gdf)):
+                _write(customers_gdf, customers_dir / f"part-{num_chunks:05d}.{file_format}")
+            num_chunks += 1
+            num_customers += len(customers_gdf)
+            logger.info("Wrote chunk %d (%d customers so far)", num_chunks, num_customers)
+
+        annotate(num_units=len(base_units_gdf), num_chunks=num_chunks, num_customers=num_customers)
+        logger.info("Synthetic data generation complete.")
+    return {
+        "base_units_path": str(base_units_path),
+        "customers_dir": str(customers_dir),
+        "num_units": len(base_units_gdf),
+        "num_chunks": num_chunks,
+        "num_customers": num_customers,
+    }
@@ -0,0 +1,459 @@
+# -*- coding: utf-8 -*-
+"""
+This module runs experiment sweeps: every combination of scenario,
+algorithm and seed, fanned out over a process pool.
+
+A sweep is described in YAML, for example::
+
+    name: uniform_vs_clustered
+    seeds: [1, 2, 3]
+    scenarios:
+      - name: uniform_2k
+        data_generator_config:
+          voronoi_config: {num_units: 2000}
+          distribution_config: {type: homogeneous_poisson, intensity: 20}
+        graph_builder_config: {contiguity_method: rook}
+    algorithms:
+      - name: multilevel_5pct
+        type: multilevel
+        params: {num_partitions: 12, balance_tolerance: 0.05}
+
+A seed replicate draws new data as well as a new partitioner seed: each
+scenario is generated with the sweep seed as its ``random_seed`` (a ``None``
+seed keeps the scenario's own), so every (scenario, seed) pair is a fresh
+point pattern. Each of these datasets is generated and turned into a
+``TerritoryGraph`` once, in the parent process. Its arrays (CSR adjacency, customer aggregates and the unit
+polygons as shapely ragged coordinate arrays) are written as ``.npy`` files
+to a scratch directory, RAM-backed ``/dev/shm`` by default, and workers
+memory-map them instead of unpickling GeoDataFrames; each worker attaches a
+graph once and reuses it for all its runs. Runs are partitioned and
+evaluated in the workers and each result is appended to an
+``ExperimentStore`` as soon as it finishes, so the sweep can be queried
+while it is running. Every run is instrumented (see
+``src.common.instrumentation``) and its record carries the stage timing
+report under ``instrumentation``; ``ExperimentStore.export_chrome_trace``
+turns the reports of a sweep into a single Chrome trace.
+"""
+
+import json
+import logging
+import multiprocessing
+import os
+import tempfile
+import threading
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from dataclasses import asdict, fields, is_dataclass, replace
+from enum import Enum
+from multiprocessing.context import BaseContext
+from pathlib import Path
+from typing import Any, Callable, Dict, List, Optional, Tuple, Union
+
+import numpy as np
+import scipy.sparse as sp
+import shapely
+import yaml
+
+from src.common.instrumentation import instrument, span
+from src.common.schemas import (
+    AlgorithmConfig,
+    BalanceMetric,
+    DataGeneratorConfig,
+    ExperimentSweepConfig,
+    GraphBuilderConfig,
+    HomogeneousPoissonConfig,
+    InhomogeneousPoissonConfig,
+    MultilevelPartitionerConfig,
+    NeymanScottConfig,
+    SamplingConfig,
+    ScenarioConfig,
+    VoronoiConfig,
+)
+from src.data_processing.synthetic_generator import generate_data_batch
+from src.orchestration.result_store import ExperimentStore
+from src.tap.alignment import MultilevelPartitioner
+from src.tap.evaluator import PartitionEvaluator
+from src.tap.graph_builder import TerritoryGraph, build_graph
+
+logger = logging.getLogger(__name__)
+
+# Partitioner and config class of every algorithm type usable in a sweep.
+# The partitioner must provide partition_territory_graph(graph, config).
+ALGORITHMS = {
+    "multilevel": (MultilevelPartitioner, MultilevelPartitionerConfig),
+}
+
+_DISTRIBUTIONS = {
+    "homogeneous_poisson": HomogeneousPoissonConfig,
+    "inhomogeneous_poisson": InhomogeneousPoissonConfig,
+    "neyman_scott": NeymanScottConfig,
+}
+
+_GRAPH_ARRAYS = ("indptr", "indices", "data", "unit_ids", "customers", "total_sales_potential", "total_workload")
+
+# Graphs attached by this worker process, keyed by their scratch directory
+_ATTACHED_GRAPHS: Dict[str, TerritoryGraph] = {}
+
+
+def _worker_context() -> BaseContext:
+    """
+    Returns the multiprocessing context for the sweep's process pools.
+
+    Sweeps run in a background thread (see start_sweep), and a child forked
+    from a multi-threaded process can deadlock on locks held by the other
+    threads at fork time. Workers are therefore started from a forkserver,
+    or spawned where forkserver is unavailable.
+    """
+    methods = multiprocessing.get_all_start_methods()
+    return multiprocessing.get_context("forkserver" if "forkserver" in methods else "spawn")
+
+
+# --- Configuration ---
+
+def _build_config(cls: type, data: Dict[str, Any]) -> Any:
+    """Builds a flat config dataclass from plain data, converting enum values."""
+    if not isinstance(data, dict):
+        raise ValueError(f"Expected a mapping for {cls.__name__}, got {data!r}")
+    known = {f.name: f for f in fields(cls)}
+    unknown = sorted(set(data) - set(known))
+    if unknown:
+        raise ValueError(f"Unknown {cls.__name__} fields: {unknown}")
+    values = {}
+    for name, value in data.items():
+        field_type = known[name].type
+        if isinstance(field_type, type) and issubclass(field_type, Enum) and not isinstance(value, Enum):
+            value = field_type(value)
+        values[name] = value
+    return cls(**values)
+
+
+def _data_generator_config(data: Dict[str, Any]) -> DataGeneratorConfig:
+    data = dict(data)
+    data["voronoi_config"] = _build_config(VoronoiConfig, data.get("voronoi_config") or {})
+    distribution = data.get("distribution_config")
+    if distribution is not None:
+        distribution = dict(distribution)
+        kind = distribution.pop("type", None)
+        if kind not in _DISTRIBUTIONS:
+            raise ValueError(f"Unknown distribution type {kind!r}. Available types: {sorted(_DISTRIBUTIONS)}")
+        data["distribution_config"] = _build_config(_DISTRIBUTIONS[kind], distribution)
+    if data.get("sampling_config") is not None:
+        data["sampling_config"] = _build_config(SamplingConfig, data["sampling_config"])
+    return _build_config(DataGeneratorConfig, data)
+
+
+def load_sweep_config(source: Union[str, Path, Dict[str, Any]]) -> ExperimentSweepConfig:
+    """
+    Reads a sweep configuration.
+
+    Args:
+        source: A path to a YAML file, or the already parsed mapping.
+
+    Returns:
+        The validated sweep configuration.
+    """
+    if not isinstance(source, dict):
+        with open(source, encoding="utf-8") as f:
+            source = yaml.safe_load(f)
+    data = dict(source)
+
+    scenarios = [
+        ScenarioConfig(
+            name=scenario["name"],
+            data_generator_config=_data_generator_config(scenario["data_generator_config"]),
+            graph_builder_config=_build_config(GraphBuilderConfig, scenario.get("graph_builder_config") or {}),
+        )
+        for scenario in data.pop("scenarios", [])
+    ]
+    algorithms = [_build_config(AlgorithmConfig, algorithm) for algorithm in data.pop("algorithms", [])]
+    config = _build_config(ExperimentSweepConfig, dict(data, scenarios=scenarios, algorithms=algorithms))
+    _validate_sweep(config)
+    return config
+
+
+def _validate_sweep(config: ExperimentSweepConfig) -> None:
+    if not config.scenarios or not config.algorithms or not config.seeds:
+        raise ValueError("A sweep needs at least one scenario, one algorithm and one seed.")
+    for kind, items in (("scenario", config.scenarios), ("algorithm", config.algorithms)):
+        names = [item.name for item in items]
+        if len(set(names)) != len(names):
+            raise ValueError(f"Duplicate {kind} names: {names}")
+    for algorithm in config.algorithms:
+        if algorithm.type not in ALGORITHMS:
+            raise ValueError(f"Unknown algorithm type {algorithm.type!r}. Available types: {sorted(ALGORITHMS)}")
+        # Fail before any work is scheduled, not in every worker
+        _build_config(ALGORITHMS[algorithm.type][1], dict(algorithm.params, seed=None))
+
+
+def _to_plain(config: Any) -> Any:
+    """Converts a config dataclass to JSON-serializable data."""
+    data = asdict(config) if is_dataclass(config) else config
+    return json.loads(json.dumps(data, default=lambda value: value.value if isinstance(value, Enum) else str(value)))
+
+
+# --- Shared graph arrays ---
+
+def _default_scratch_dir() -> Optional[str]:
+    """Prefers RAM-backed /dev/shm, so memory-mapped arrays never touch the disk."""
+    return "/dev/shm" if os.path.isdir("/dev/shm") and os.access("/dev/shm", os.W_OK) else None
+
+
+def _share_graph(graph: TerritoryGraph, directory: Path) -> None:
+    """Writes the arrays of a territory graph as .npy files for workers to memory-map."""
+    directory.mkdir()
+    unit_ids = graph.unit_ids if graph.unit_ids.dtype.kind in "biuf" else graph.unit_ids.astype(str)
+    arrays = {
+        "indptr": graph.adjacency.indptr,
+        "indices": graph.adjacency.indices,
+        "data": graph.adjacency.data,
+        "unit_ids": unit_ids,
+        "customers": graph.customers,
+        "total_sales_potential": graph.total_sales_potential,
+        "total_workload": graph.total_workload,
+    }
+    geometry_type, coords, offsets = shapely.to_ragged_array(graph.geometry)
+    arrays["coords"] = coords
+    arrays.update({f"offsets_{i}": offset for i, offset in enumerate(offsets)})
+    for name, array in arrays.items():
+        np.save(directory / f"{name}.npy", np.ascontiguousarray(array))
+    meta = {"geometry_type": int(geometry_type), "num_offsets": len(offsets), "num_units": graph.num_units}
+    (directory / "meta.json").write_text(json.dumps(meta), encoding="utf-8")
+
+
+def _attach_graph(directory: str) -> TerritoryGraph:
+    """Memory-maps a shared territory graph, once per worker process."""
+    graph = _ATTACHED_GRAPHS.get(directory)
+    if graph is not None:
+        return graph
+
+    path = Path(directory)
+    meta = json.loads((path / "meta.json").read_text(encoding="utf-8"))
+    arrays = {name: np.load(path / f"{name}.npy", mmap_mode="r") for name in _GRAPH_ARRAYS}
+    offsets = tuple(np.load(path / f"offsets_{i}.npy", mmap_mode="r") for i in range(meta["num_offsets"]))
+    geometry = shapely.from_ragged_array(
+        shapely.GeometryType(meta["geometry_type"]), np.load(path / "coords.npy", mmap_mode="r"), offsets
+    )
+    n = meta["num_units"]
+    graph = TerritoryGraph(
+        unit_ids=arrays["unit_ids"],
+        geometry=geometry,
+        adjacency=sp.csr_matrix((arrays["data"], arrays["indices"], arrays["indptr"]), shape=(n, n)),
+        customers=arrays["customers"],
+        total_sales_potential=arrays["total_sales_potential"],
+        total_workload=arrays["total_workload"],
+    )
+    _ATTACHED_GRAPHS[directory] = graph
+    return graph
+
+
+# --- Runs ---
+
+def _plan_runs(config: ExperimentSweepConfig) -> List[Dict[str, Any]]:
+    return [
+        {
+            "run_id": f"run-{index:04d}",
+            "scenario": scenario.name,
+            "algorithm": algorithm.name,
+            "seed": seed,
+        }
+        for index, (scenario, algorithm, seed) in enumerate(
+            (scenario, algorithm, seed)
+            for scenario in config.scenarios
+            for algorithm in config.algorithms
+            for seed in config.seeds
+        )
+    ]
+
+
+def _run_experiment(
+    task: Tuple[Dict[str, Any], str, AlgorithmConfig, bool]
+) -> Tuple[Dict[str, Any], Optional[np.ndarray]]:
+    """Process-pool entry point: partitions and evaluates one scenario with one algorithm and seed."""
+    run, graph_dir, algorithm, trace_memory = task
+    start_time = time.perf_counter()
+    with instrument(run["run_id"], trace_memory=trace_memory) as recording:
+        try:
+            with span("attach_graph"):
+                graph = _attach_graph(graph_dir)
+            partitioner_cls, config_cls = ALGORITHMS[algorithm.type]
+            partitioner_config = _build_config(config_cls, dict(algorithm.params, seed=run["seed"]))
+            with span("partition", algorithm=algorithm.name, num_units=graph.num_units):
+                labels = partitioner_cls().partition_territory_graph(graph, partitioner_config)
+            partition_time = time.perf_counter() - start_time
+
+            with span("evaluate"):
+                evaluator = PartitionEvaluator(
+                    graph,
+                    labels,
+                    num_partitions=partitioner_config.num_partitions,
+                    balance_metric=getattr(partitioner_config, "balance_metric", BalanceMetric.WORKLOAD),
+                )
+                evaluation = evaluator.report()
+            record = dict(
+                run,
+                status="completed",
+                partition_seconds=partition_time,
+                duration_seconds=time.perf_counter() - start_time,
+                evaluation=evaluation,
+            )
+            labels = labels.astype(np.int32)
+        except Exception as error:
+            record = dict(
+                run,
+                status="failed",
+                error=f"{type(error).__name__}: {error}",
+                duration_seconds=time.perf_counter() - start_time,
+            )
+            labels = None
+    record["instrumentation"] = recording.report()
+    return record, labels
+
+
+def _execute_sweep(
+    config: ExperimentSweepConfig,
+    runs: List[Dict[str, Any]],
+    experiment_id: str,
+    store: ExperimentStore,
+    n_jobs: Optional[int],
+    scratch_dir: Optional[Union[str, Path]],
+    trace_memory: bool = False,
+) -> None:
+    """Generates the scenarios, shares their graphs and streams all run results into the store."""
+    recorded = set()
+
+    def record(result: Tuple[Dict[str, Any], Optional[np.ndarray]]) -> None:
+        run_record, labels = result
+        store.append_result(experiment_id, run_record, labels)
+        recorded.add(run_record["run_id"])
+        logger.info(
+            "[%d/%d] %s (%s, %s, seed=%s): %s", len(recorded), len(runs), run_record["run_id"],
+            run_record["scenario"], run_record["algorithm"], run_record["seed"], run_record["status"],
+        )
+
+    try:
+        _run_all(config, runs, n_jobs, scratch_dir, record, trace_memory)
+    except Exception as error:
+        # Close the experiment, so that it does not look like it is still running
+        logger.error("Experiment %s aborted: %s: %s", experiment_id, type(error).__name__, error)
+        for run in runs:
+            if run["run_id"] not in recorded:
+                record((dict(run, status="failed", error=f"Sweep aborted: {type(error).__name__}: {error}"), None))
+
+
+def _run_all(
+    config: ExperimentSweepConfig,
+    runs: List[Dict[str, Any]],
+    n_jobs: Optional[int],
+    scratch_dir: Optional[Union[str, Path]],
+    record: Callable[[Tuple[Dict[str, Any], Optional[np.ndarray]]], None],
+    trace_memory: bool = False,
+) -> None:
+    # One dataset per scenario and seed; the sweep seed replaces the generator's
+    datasets_to_build = [(scenario, seed) for scenario in config.scenarios for seed in dict.fromkeys(config.seeds)]
+    datasets = generate_data_batch(
+        [
+            scenario.data_generator_config if seed is None
+            else replace(scenario.data_generator_config, random_seed=seed)
+            for scenario, seed in datasets_to_build
+        ],
+        max_workers=n_jobs,
+        mp_context=_worker_context(),
+    )
+    algorithms = {algorithm.name: algorithm for algorithm in config.algorithms}
+
+    with tempfile.TemporaryDirectory(prefix="tap-sweep-", dir=scratch_dir or _default_scratch_dir()) as shared_dir:
+        graph_dirs = {}
+        for (scenario, seed), (base_units, customers) in zip(datasets_to_build, datasets):
+            graph_dir = Path(shared_dir) / f"scenario-{len(graph_dirs)}"
+            _share_graph(build_graph(base_units, customers, scenario.graph_builder_config), graph_dir)
+            graph_dirs[scenario.name, seed] = str(graph_dir)
+        del datasets
+
+        tasks = [
+            (run, graph_dirs[run["scenario"], run["seed"]], algorithms[run["algorithm"]], trace_memory)
+            for run in runs
+        ]
+        n_workers = n_jobs or os.cpu_count() or 1
+        if n_workers == 1 or len(tasks) == 1:
+            try:
+                for task in tasks:
+                    record(_run_experiment(task))
+            finally:
+                for graph_dir in graph_dirs.values():
+                    _ATTACHED_GRAPHS.pop(graph_dir, None)
+            return
+
+        with ProcessPoolExecutor(max_workers=min(n_workers, len(tasks)), mp_context=_worker_context()) as executor:
+            futures = {executor.submit(_run_experiment, task): task[0] for task in tasks}
+            for future in as_completed(futures):
+                try:
+                    result = future.result()
+                except Exception as error:  # e.g. a worker killed by the OS
+                    result = (dict(futures[future], status="failed", error=f"{type(error).__name__}: {error}"), None)
+                record(result)
+
+
+def start_sweep(
+    config: Union[ExperimentSweepConfig, str, Path, Dict[str, Any]],
+    store: Optional[ExperimentStore] = None,
+    n_jobs: Optional[int] = None,
+    scratch_dir: Optional[Union[str, Path]] = None,
+    trace_memory: bool = False,
+) -> Tuple[str, threading.Thread]:
+    """
+    Registers a sweep and runs it in a background thread.
+
+    This is what a request handler such as ``/experiments/run`` calls: the
+    experiment id is available immediately and results appear in the store
+    as runs finish.
+
+    Args:
+        config: The sweep, as a config object, a YAML path or a parsed mapping.
+        store: The result store. Defaults to ``ExperimentStore()``.
+        n_jobs: The number of worker processes. ``1`` runs everything in the
+                calling process; None uses all CPUs.
+        scratch_dir: Where the shared graph arrays are written. Defaults to
+                     ``/dev/shm`` if available, else the system temp directory.
+        trace_memory: Whether the instrumentation of every run also measures
+                      the peak traced memory of each stage, at some cost in speed.
+
+    Returns:
+        The experiment id and the thread running the sweep.
+    """
+    if not isinstance(config, ExperimentSweepConfig):
+        config = load_sweep_config(config)
+    _validate_sweep(config)
+    store = store or ExperimentStore()
+    runs = _plan_runs(config)
+    experiment_id = store.create_experiment(config.name, _to_plain(config), runs)
+    logger.info(
+        "Experiment %s: %d runs (%d scenarios x %d algorithms x %d seeds).", experiment_id, len(runs),
+        len(config.scenarios), len(config.algorithms), len(config.seeds),
+    )
+
+    thread = threading.Thread(
+        target=_execute_sweep,
+        args=(config, runs, experiment_id, store, n_jobs, scratch_dir, trace_memory),
+        name=f"sweep-{experiment_id}",
+        daemon=True,
+    )
+    thread.start()
+    return experiment_id, thread
+
+
+def run_sweep(
+    config: Union[ExperimentSweepConfig, str, Path, Dict[str, Any]],
+    store: Optional[ExperimentStore] = None,
+    n_jobs: Optional[int] = None,
+    scratch_dir: Optional[Union[str, Path]] = None,
+    trace_memory: bool = False,
+) -> str:
+    """
+    Runs a sweep to completion. See ``start_sweep`` for the arguments.
+
+    Returns:
+        The experiment id.
+    """
+    experiment_id, thread = start_sweep(config, store, n_jobs, scratch_dir, trace_memory)
+    thread.join()
+    return experiment_id
@@ -0,0 +1,182 @@
+# -*- coding: utf-8 -*-
+"""
+This module provides the append-only store of experiment results.
+
+Every experiment is a directory holding an immutable ``manifest.json``,
+written once when the sweep starts, and a ``results.jsonl`` file to which
+one JSON line is appended per finished run. Territory labels are stored
+next to it as ``.npy`` files, written before the run's line is appended.
+Records are never rewritten, so readers (e.g. the ``/experiments`` and
+``/experiments/results/{id}`` endpoints) can query a sweep while it is
+still running without any locking: at worst they miss a line that is
+being written.
+"""
+
+import json
+import os
+import time
+import uuid
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Union
+
+import numpy as np
+
+from src.common.instrumentation import export_chrome_trace
+
+DEFAULT_EXPERIMENT_DIR = Path(os.getenv("TAP_EXPERIMENT_DIR", "data/experiments"))
+
+_MANIFEST_FILENAME = "manifest.json"
+_RESULTS_FILENAME = "results.jsonl"
+_LABELS_DIRNAME = "labels"
+
+
+class ExperimentStore:
+    """
+    A directory of experiments with append-only run results.
+
+    A single sweep process writes each experiment; any number of processes
+    may read concurrently.
+    """
+
+    def __init__(self, root_dir: Union[str, Path] = DEFAULT_EXPERIMENT_DIR):
+        """
+        Args:
+            root_dir: The directory holding one subdirectory per experiment.
+        """
+        self.root_dir = Path(root_dir)
+
+    def _experiment_dir(self, experiment_id: str) -> Path:
+        # Ids come from URLs, so refuse anything that is not a plain directory name
+        if Path(experiment_id).name != experiment_id or experiment_id in ("", ".", ".."):
+            raise ValueError(f"Invalid experiment id: {experiment_id!r}")
+        return self.root_dir / experiment_id
+
+    def create_experiment(self, name: str, config: Dict[str, Any], runs: List[Dict[str, Any]]) -> str:
+        """
+        Registers a new experiment.
+
+        Args:
+            name: The sweep name.
+            config: The sweep configuration, as plain JSON data.
+            runs: A description of every planned run, with its ``run_id``.
+
+        Returns:
+            The new experiment id.
+        """
+        experiment_id = f"{time.strftime('%Y%m%d-%H%M%S')}-{uuid.uuid4().hex[:8]}"
+        path = self._experiment_dir(experiment_id)
+        (path / _LABELS_DIRNAME).mkdir(parents=True)
+        manifest = {
+            "experiment_id": experiment_id,
+            "name": name,
+            "created_at": time.time(),
+            "total_runs": len(runs),
+            "runs": runs,
+            "config": config,
+        }
+        tmp_path = path / f".tmp.{_MANIFEST_FILENAME}"
+        tmp_path.write_text(json.dumps(manifest), encoding="utf-8")
+        os.replace(tmp_path, path / _MANIFEST_FILENAME)
+        (path / _RESULTS_FILENAME).touch()
+        return experiment_id
+
+    def append_result(self, experiment_id: str, record: Dict[str, Any], labels: Optional[np.ndarray] = None) -> None:
+        """
+        Appends the record of a finished run.
+
+        Args:
+            experiment_id: The experiment the run belongs to.
+            record: The JSON-serializable run record, with its ``run_id``.
+            labels: The run's territory labels, stored as a ``.npy`` file.
+        """
+        path = self._experiment_dir(experiment_id)
+        record = dict(record, recorded_at=time.time())
+        if labels is not None:
+            filename = f"{record['run_id']}.npy"
+            if Path(filename).name != filename:
+                raise ValueError(f"Invalid run id: {record['run_id']!r}")
+            tmp_path = path / _LABELS_DIRNAME / f".tmp.{filename}"
+            # Write through a file handle so numpy does not append another ".npy"
+            with open(tmp_path, "wb") as f:
+                np.save(f, labels)
+            os.replace(tmp_path, path / _LABELS_DIRNAME / filename)
+            record["labels_file"] = f"{_LABELS_DIRNAME}/{filename}"
+
+        line = json.dumps(record) + "\n"
+        with open(path / _RESULTS_FILENAME, "a", encoding="utf-8") as f:
+            f.write(line)
+            f.flush()
+            os.fsync(f.fileno())
+
+    def _read_manifest(self, experiment_id: str) -> Dict[str, Any]:
+        try:
+            return json.loads((self._experiment_dir(experiment_id) / _MANIFEST_FILENAME).read_text(encoding="utf-8"))
+        except FileNotFoundError:
+            raise KeyError(f"Unknown experiment: {experiment_id}") from None
+
+    def _read_records(self, experiment_id: str) -> List[Dict[str, Any]]:
+        records = []
+        with open(self._experiment_dir(experiment_id) / _RESULTS_FILENAME, encoding="utf-8") as f:
+            for line in f:
+                # A line without its newline is still being written
+                if line.endswith("\n"):
+                    records.append(json.loads(line))
+        return records
+
+    @staticmethod
+    def _summary(manifest: Dict[str, Any], records: List[Dict[str, Any]]) -> Dict[str, Any]:
+        failed = sum(record.get("status") == "failed" for record in records)
+        return {
+            "experiment_id": manifest["experiment_id"],
+            "name": manifest["name"],
+            "created_at": manifest["created_at"],
+            "total_runs": manifest["total_runs"],
+            "finished_runs": len(records),
+            "failed_runs": failed,
+            "status": "running" if len(records) < manifest["total_runs"] else "completed",
+        }
+
+    def list_experiments(self) -> List[Dict[str, Any]]:
+        """Returns a progress summary of every experiment, newest first."""
+        if not self.root_dir.exists():
+            return []
+        summaries = []
+        for path in self.root_dir.iterdir():
+            if (path / _MANIFEST_FILENAME).exists():
+                manifest = self._read_manifest(path.name)
+                summaries.append(self._summary(manifest, self._read_records(path.name)))
+        return sorted(summaries, key=lambda summary: summary["created_at"], reverse=True)
+
+    def get_results(self, experiment_id: str) -> Dict[str, Any]:
+        """
+        Returns an experiment's summary, manifest and the records of all runs finished so far.
+
+        Raises:
+            KeyError: If the experiment does not exist.
+        """
+        manifest = self._read_manifest(experiment_id)
+        records = self._read_records(experiment_id)
+        return {**self._summary(manifest, records), "manifest": manifest, "results": records}
+
+    def load_labels(self, experiment_id: str, run_id: str) -> np.ndarray:
+        """
+        Loads the territory labels of a finished run.
+
+        Raises:
+            KeyError: If the run has not finished or stored no labels.
+        """
+        for record in self._read_records(experiment_id):
+            if record["run_id"] == run_id and "labels_file" in record:
+                return np.load(self._experiment_dir(experiment_id) / record["labels_file"])
+        raise KeyError(f"No labels for run {run_id} of experiment {experiment_id}")
+
+    def export_chrome_trace(self, experiment_id: str, path: Union[str, Path]) -> Path:
+        """
+        Writes the instrumentation reports of all finished runs as one Chrome trace file.
+
+        Raises:
+            KeyError: If the experiment does not exist.
+        """
+        self._read_manifest(experiment_id)
+        reports = [record["instrumentation"] for record in self._read_records(experiment_id) if "instrumentation" in record]
+        return export_chrome_trace(reports, path)
@@ -1,19 +1,293 @@
 # -*- coding: utf-8 -*-
 """
 This module provides functions for spatial point pattern analysis.
+
+Ripley's K-function is computed by a built-in engine: observed pair counts
+come from a single KD-tree pass over all radii, and the CSR simulation
+envelopes are evaluated in parallel across a process pool. Several summary
+statistics of the same point set can be computed together from one hull,
+one KD-tree and one pair-distance histogram with ``analyze_point_pattern``.
 """
 
-from typing import Dict, Any, List, Tuple
+import os
+from concurrent.futures import ProcessPoolExecutor
+from typing import Callable, Dict, Any, List, Optional, Sequence, Tuple
 
 import geopandas as gpd
 import numpy as np
-from pointpats import k_test
+import shapely
+from scipy.spatial import cKDTree
+from scipy.stats import norm
+from shapely.geometry import Polygon
+
+from src.common.cache import ResultCache, get_cache_key, hash_array
+
+# Below this amount of work (points x simulations), spinning up a process pool
+# costs more than it saves, so the simulations run in the calling process.
+_MIN_PARALLEL_WORK = 200_000
+
+# Upper bound on the number of point pairs enumerated at once by _ripley_k.
+_MAX_PAIRS_IN_MEMORY = 20_000_000
+
+_EDGE_CORRECTIONS = (None, "border")
+
+# Fewest points that can span a study area of non-zero size.
+_MIN_POINTS = 3
+
+# Fewest points for a pattern verdict. Below this, most points are vertices of
+# their own convex hull, which biases the observed curves towards dispersion.
+_MIN_CLASSIFIED_POINTS = 10
+
+
+def _study_hull(coords: np.ndarray) -> Polygon:
+    """Returns the convex hull of the points, rejecting degenerate study areas."""
+    if len(coords) < _MIN_POINTS:
+        raise ValueError(f"At least {_MIN_POINTS} points are needed, got {len(coords)}.")
+    hull = shapely.convex_hull(shapely.multipoints(coords))
+    _check_window(hull)
+    return hull
+
+
+def _check_window(hull: Polygon) -> None:
+    """Raises a ValueError for a study area of zero size, e.g. the hull of collinear points."""
+    if hull.area <= 0:
+        raise ValueError("The study area has zero area; the points may be collinear.")
+
+
+def _pairs_fit_in_memory(coords: np.ndarray, support: np.ndarray, hull: Polygon, tree: cKDTree) -> bool:
+    """
+    Decides once per analysis whether _ripley_k may enumerate the close pairs.
+
+    The observed pairs are counted with one dual-tree traversal. The CSR
+    simulations share the decision; their expected pair count guards against
+    observed patterns that are sparser than CSR.
+    """
+    n = len(coords)
+    observed = (tree.count_neighbors(tree, support[-1]) - n) / 2
+    expected = n * (n - 1) / 2 * min(1.0, np.pi * support[-1] ** 2 / hull.area)
+    return max(observed, expected) <= _MAX_PAIRS_IN_MEMORY
+
+
+def _k_support(coords: np.ndarray, tree: cKDTree, steps: int) -> np.ndarray:
+    """Builds the radii, from zero to the largest nearest-neighbour distance."""
+    nn_dist, _ = tree.query(coords, k=2)
+    return np.linspace(0, nn_dist[:, 1].max(), num=steps)
+
+
+def _ripley_k(
+    coords: np.ndarray,
+    support: np.ndarray,
+    hull: Polygon,
+    edge_correction: Optional[str] = None,
+    tree: Optional[cKDTree] = None,
+    enumerate_pairs: bool = True,
+) -> np.ndarray:
+    """
+    Estimates Ripley's K at every radius of the support in one pass.
+
+    All pairs closer than the largest radius are enumerated once from a
+    KD-tree and binned against the support, giving the counts at every
+    radius with a single cumulative sum. When the caller has found that pair
+    set too large to hold in memory (see ``_pairs_fit_in_memory``) and passes
+    ``enumerate_pairs=False``, the uncorrected estimator uses one multi-radius
+    ``count_neighbors`` dual-tree traversal instead.
+
+    With ``"border"`` correction, only points at least ``r`` away from the
+    hull boundary act as centres for radius ``r``. A prebuilt ``tree`` over
+    ``coords`` may be passed in to share it with other statistics.
+    """
+    n = len(coords)
+    if n < _MIN_POINTS:
+        raise ValueError(f"At least {_MIN_POINTS} points are needed, got {n}.")
+    _check_window(hull)
+    intensity = n / hull.area
+    if tree is None:
+        tree = cKDTree(coords)
+
+    if edge_correction is None and not enumerate_pairs:
+        # Strict d < r, as for the pair enumeration below
+        radii = np.nextafter(support, -np.inf)
+        counts = tree.count_neighbors(tree, radii, cumulative=True)
+        num_pairs = (counts - n) / 2
+        return (num_pairs * 2 / n) / intensity
+
+    pairs = tree.query_pairs(support[-1], output_type="ndarray")
+    dist = np.linalg.norm(coords[pairs[:, 0]] - coords[pairs[:, 1]], axis=1)
+    # Index of the first radius strictly greater than each pair distance
+    first = np.searchsorted(support, dist, side="right")
+
+    if edge_correction is None:
+        num_pairs = np.cumsum(np.bincount(first, minlength=len(support) + 1))[:-1]
+        return (num_pairs * 2 / n) / intensity
+
+    # Ordered pair (i, j) counts for every radius r with d_ij < r <= b_i
+    border_dist = shapely.distance(shapely.points(coords), hull.exterior)
+    first = np.concatenate([first, first])
+    last = np.searchsorted(support, border_dist[np.concatenate([pairs[:, 0], pairs[:, 1]])], side="right")
+    valid = first < last
+    delta = np.bincount(first[valid], minlength=len(support) + 1)
+    delta -= np.bincount(last[valid], minlength=len(support) + 1)
+    pair_counts = np.cumsum(delta)[:-1]
+
+    num_centres = (border_dist[None, :] >= support[:, None]).sum(axis=1)
+    with np.errstate(divide="ignore", invalid="ignore"):
+        k_values = pair_counts / num_centres / intensity
+    return np.where(num_centres > 0, k_values, np.nan)
+
+
+def _sample_csr(hull: Polygon, n: int, rng: np.random.Generator) -> np.ndarray:
+    """Draws n points uniformly inside the hull by rejection from its bounding box."""
+    _check_window(hull)
+    min_x, min_y, max_x, max_y = hull.bounds
+    acceptance = hull.area / ((max_x - min_x) * (max_y - min_y))
+    samples: List[np.ndarray] = []
+    remaining = n
+    while remaining > 0:
+        size = int(remaining / acceptance * 1.1) + 16
+        candidates = np.column_stack([
+            rng.uniform(min_x, max_x, size),
+            rng.uniform(min_y, max_y, size),
+        ])
+        candidates = candidates[shapely.contains_xy(hull, candidates[:, 0], candidates[:, 1])]
+        samples.append(candidates[:remaining])
+        remaining -= len(samples[-1])
+    return np.concatenate(samples)
+
+
+def _simulate_k_batch(
+    args: Tuple[Polygon, int, np.ndarray, Optional[str], bool, List[np.random.SeedSequence]]
+) -> np.ndarray:
+    """Runs a batch of CSR simulations, one independent stream per simulation."""
+    hull, n, support, edge_correction, enumerate_pairs, seed_sequences = args
+    return np.array([
+        _ripley_k(
+            _sample_csr(hull, n, np.random.default_rng(seq)), support, hull, edge_correction,
+            enumerate_pairs=enumerate_pairs,
+        )
+        for seq in seed_sequences
+    ]).reshape(len(seed_sequences), len(support))
+
+
+def _run_simulations(
+    batch_fn: Callable[[tuple], Any],
+    fixed_args: tuple,
+    seed_sequences: List[np.random.SeedSequence],
+    n: int,
+    n_jobs: Optional[int] = None,
+) -> List[Any]:
+    """
+    Splits the simulations into one batch per worker and runs them.
+
+    ``batch_fn`` receives ``fixed_args + (seed_batch,)``. Every simulation is
+    seeded by its own SeedSequence, so the result does not depend on the
+    number of workers.
+    """
+    n_workers = n_jobs or os.cpu_count() or 1
+    if n_workers == 1 or n * len(seed_sequences) < _MIN_PARALLEL_WORK:
+        return [batch_fn(fixed_args + (seed_sequences,))]
+
+    batches = [list(batch) for batch in np.array_split(np.array(seed_sequences, dtype=object), n_workers)]
+    tasks = [fixed_args + (batch,) for batch in batches if batch]
+    with ProcessPoolExecutor(max_workers=n_workers) as executor:
+        return list(executor.map(batch_fn, tasks))
+
+
+def _simulate_k(
+    hull: Polygon,
+    n: int,
+    support: np.ndarray,
+    edge_correction: Optional[str],
+    enumerate_pairs: bool,
+    seed_sequences: List[np.random.SeedSequence],
+    n_jobs: Optional[int] = None,
+) -> np.ndarray:
+    """Computes the K-function of CSR patterns, optionally across a process pool."""
+    results = _run_simulations(
+        _simulate_k_batch, (hull, n, support, edge_correction, enumerate_pairs), seed_sequences, n, n_jobs
+    )
+    return np.concatenate(results)
+
+
+def _classify_pattern(
+    observed_k: np.ndarray,
+    lower_env: np.ndarray,
+    upper_env: np.ndarray,
+    upper_limit: float = np.inf,
+    reverse: bool = False,
+) -> str:
+    """
+    Classifies the observed curve against a pointwise simulation envelope.
+
+    ``upper_limit`` is the value a bounded statistic saturates at (1 for
+    distribution functions). ``reverse`` is for statistics that fall below
+    the envelope for clustered patterns, such as the empty-space function F.
+    Without a single informative radius there is nothing to compare, and the
+    pattern is reported as "Insufficient data".
+    """
+    # Only use the radii where the envelope is informative: below them even
+    # CSR patterns often have no pairs at all, so every curve is zero, and
+    # bounded statistics are saturated at the top.
+    informative = (lower_env > 0) & (upper_env < upper_limit) & ~np.isnan(observed_k)
+    if not informative.any():
+        return "Insufficient data"
+    above, below = "Clustered", "Dispersed"
+    if reverse:
+        above, below = below, above
+    if np.all(observed_k[informative] > upper_env[informative]):
+        return above
+    elif np.all(observed_k[informative] < lower_env[informative]):
+        return below
+    return "Random" # Or mixed
+
+
+def _sequential_decision(
+    observed_k: np.ndarray, simulations: np.ndarray, confidence: float
+) -> Optional[str]:
+    """
+    Returns the pattern once it is statistically settled, or None.
+
+    The 2.5/97.5 percentile envelope is approximated per radius by
+    ``mean +/- z * std`` of the simulations run so far. A decision counts as
+    settled when the observed curve clears that envelope by more than the
+    ``confidence``-level estimation error of ``mean + z * std`` after m
+    simulations, Bonferroni-corrected over the radii involved.
+    """
+    m = len(simulations)
+    informative = (np.nanmin(simulations, axis=0) > 0) & ~np.isnan(observed_k)
+    num_radii = int(informative.sum())
+    if m < 3 or num_radii == 0:
+        return None
+
+    obs = observed_k[informative]
+    mean = np.nanmean(simulations[:, informative], axis=0)
+    std = np.nanstd(simulations[:, informative], axis=0, ddof=1)
+    z_env = norm.ppf(0.975)
+    z_conf = norm.ppf(1 - (1 - confidence) / (2 * num_radii))
+    margin = z_conf * std * np.sqrt(1 / m + z_env**2 / (2 * (m - 1)))
+    lower_bound = mean - z_env * std
+    upper_bound = mean + z_env * std
+
+    if np.all(obs > upper_bound + margin):
+        return "Clustered"
+    if np.all(obs < lower_bound - margin):
+        return "Dispersed"
+    if np.any((obs > lower_bound + margin) & (obs < upper_bound - margin)):
+        return "Random"
+    return None
+
 
 def analyze_k_function(
     points_gdf: gpd.GeoDataFrame,
     area: float, # This is kept for API consistency but hull is used for calculation
     steps: int = 100,
     permutations: int = 99,
+    edge_correction: Optional[str] = None,
+    n_jobs: Optional[int] = None,
+    random_seed: Optional[int] = None,
+    adaptive: bool = False,
+    confidence: float = 0.95,
+    batch_size: int = 20,
+    cache: Optional[ResultCache] = None,
 ) -> Dict[str, Any]:
     """
     Performs Ripley's K-function analysis on a set of points.
@@ -23,13 +297,30 @@ def analyze_k_function(
 
     Args:
         points_gdf: A GeoDataFrame containing the point data. The geometry column
-                    must contain Shapely Point objects.
-        area: The total area of the study region. (Note: for k_test, the convex
-              hull of the points is used as the study area).
+                    must contain Shapely Point objects, at least 3 of them and
+                    not all on one line.
+        area: The total area of the study region. (Note: the convex hull of the
+              points is used as the study area).
         steps: The number of distance steps at which to calculate the K-function.
         permutations: The number of permutations to run for generating the
                       confidence envelope, which helps in assessing statistical
                       significance.
+        edge_correction: None for the naive estimator, or "border" to only use
+                         points at least r away from the hull boundary as centres.
+        n_jobs: The number of worker processes for the simulations. None uses
+                all CPUs; small workloads always run in the calling process.
+        random_seed: Seed for the CSR simulations, for reproducible envelopes.
+        adaptive: If True, run the simulations in batches of ``batch_size``
+                  and stop as soon as the pattern decision is stable at the
+                  given ``confidence``. ``permutations`` is then an upper
+                  bound. The simulations of an adaptive run are exactly the
+                  first ones of a full run with the same seed.
+        confidence: The confidence level at which an adaptive decision is
+                    considered stable.
+        batch_size: The number of simulations per adaptive batch.
+        cache: An optional result cache. Results are keyed by a hash of the
+               point coordinates and every parameter that affects them, so a
+               repeated query for the same dataset is served from the cache.
 
     Returns:
         A dictionary containing the results of the analysis, with the following keys:
@@ -40,49 +331,308 @@ def analyze_k_function(
                                  lower and upper bounds of the confidence envelope
                                  for each distance radius.
         - "pattern": A string summarizing the overall spatial pattern, which can be
-                     "Clustered", "Random", or "Dispersed".
+                     "Clustered", "Random", or "Dispersed", or "Insufficient
+                     data" for fewer than 10 points or when the envelope is
+                     zero at every radius.
+        In adaptive mode, the dictionary also contains "simulations_used", the
+        number of simulations actually run.
     """
     if not isinstance(points_gdf, gpd.GeoDataFrame) or points_gdf.empty:
         raise ValueError("Input must be a non-empty GeoDataFrame.")
     if not all(points_gdf.geom_type == 'Point'):
         raise ValueError("All geometries in the GeoDataFrame must be Points.")
+    if edge_correction not in _EDGE_CORRECTIONS:
+        raise ValueError(f"Unsupported edge_correction: {edge_correction}")
+    if adaptive and not 0 < confidence < 1:
+        raise ValueError("confidence must be between 0 and 1.")
+    if adaptive and batch_size <= 0:
+        raise ValueError("batch_size must be a positive integer.")
 
-    # The k_test function uses the convex hull of the points as the study area.
-    hull = points_gdf.union_all().convex_hull
+    coords = shapely.get_coordinates(points_gdf.geometry.values)
+    # The convex hull of the points is used as the study area.
+    hull = _study_hull(coords)
+    if cache is not None:
+        # n_jobs is left out on purpose: results do not depend on the worker count
+        cache_key = get_cache_key({
+            "function": "analyze_k_function",
+            "points": hash_array(coords),
+            "steps": steps,
+            "permutations": permutations,
+            "edge_correction": edge_correction,
+            "random_seed": random_seed,
+            "adaptive": adaptive,
+            "confidence": confidence,
+            "batch_size": batch_size,
+        })
+        cached = cache.get(cache_key)
+        if cached is not None:
+            return cached
 
-    # Perform Ripley's K-test
-    k_result = k_test(points_gdf.geometry, support=steps, hull=hull, n_simulations=permutations)
+    tree = cKDTree(coords)
+    support = _k_support(coords, tree, steps)
+    enumerate_pairs = edge_correction is not None or _pairs_fit_in_memory(coords, support, hull, tree)
+    observed_k = _ripley_k(coords, support, hull, edge_correction, tree=tree, enumerate_pairs=enumerate_pairs)
 
-    observed_k = k_result.statistic
-    
     # The theoretical K value for a CSR process is pi * r^2
-    theoretical_k = np.pi * np.array(k_result.support)**2
-
-    if k_result.simulations is not None:
-        expected_k = k_result.simulations.mean(axis=0)
-        lower_env = np.percentile(k_result.simulations, 2.5, axis=0)
-        upper_env = np.percentile(k_result.simulations, 97.5, axis=0)
-        
-        # Determine the overall pattern
-        if np.all(observed_k > upper_env):
-            pattern = "Clustered"
-        elif np.all(observed_k < lower_env):
-            pattern = "Dispersed"
+    theoretical_k = np.pi * support**2
+
+    pattern = None
+    if permutations > 0:
+        seed_sequences = np.random.SeedSequence(random_seed).spawn(permutations)
+        if adaptive:
+            batches: List[np.ndarray] = []
+            for start in range(0, permutations, batch_size):
+                batches.append(_simulate_k(
+                    hull, len(coords), support, edge_correction, enumerate_pairs,
+                    seed_sequences[start:start + batch_size], n_jobs,
+                ))
+                pattern = _sequential_decision(observed_k, np.concatenate(batches), confidence)
+                if pattern is not None:
+                    break
+            simulations = np.concatenate(batches)
         else:
-            pattern = "Random" # Or mixed
-            
-        confidence_envelope = list(zip(lower_env, upper_env))
+            simulations = _simulate_k(
+                hull, len(coords), support, edge_correction, enumerate_pairs, seed_sequences, n_jobs
+            )
+
+        expected_k = np.nanmean(simulations, axis=0)
+        lower_env = np.nanpercentile(simulations, 2.5, axis=0)
+        upper_env = np.nanpercentile(simulations, 97.5, axis=0)
+
+        # Determine the overall pattern, unless the adaptive run already settled it
+        if len(coords) < _MIN_CLASSIFIED_POINTS:
+            pattern = "Insufficient data"
+        elif pattern is None:
+            pattern = _classify_pattern(observed_k, lower_env, upper_env)
+
+        confidence_envelope = list(zip(lower_env.tolist(), upper_env.tolist()))
     else:
-        # Fallback if simulations are not returned
+        # Fallback if no simulations were requested
+        simulations = np.empty((0, len(support)))
         expected_k = theoretical_k
         pattern = "Unknown (simulations not available)"
         confidence_envelope = []
 
-
-    return {
-        "r": list(k_result.support),
-        "k_values": list(observed_k),
-        "k_expected": list(expected_k),
+    result = {
+        "r": support.tolist(),
+        "k_values": observed_k.tolist(),
+        "k_expected": expected_k.tolist(),
         "confidence_envelope": confidence_envelope,
         "pattern": pattern,
-    }
\ No newline at end of file
+    }
+    if adaptive:
+        result["simulations_used"] = len(simulations)
+    if cache is not None:
+        cache.put(cache_key, result)
+    return result
+
+
+# Statistics supported by analyze_point_pattern
+_STATISTICS = ("K", "L", "G", "F", "quadrat")
+
+# Number of reference points used to estimate the empty-space function F.
+_NUM_REFERENCE_POINTS = 1000
+
+
+def _ecdf(distances: np.ndarray, support: np.ndarray) -> np.ndarray:
+    """Evaluates the empirical CDF of the distances at every radius."""
+    return np.searchsorted(np.sort(distances), support, side="right") / len(distances)
+
+
+def _quadrat_dispersion(coords: np.ndarray, hull: Polygon, quadrat_shape: Tuple[int, int]) -> float:
+    """Computes the index-of-dispersion (chi-square) statistic of quadrat counts."""
+    min_x, min_y, max_x, max_y = hull.bounds
+    counts, _, _ = np.histogram2d(
+        coords[:, 0], coords[:, 1], bins=quadrat_shape, range=[[min_x, max_x], [min_y, max_y]]
+    )
+    mean = counts.mean()
+    return float(((counts - mean) ** 2).sum() / mean)
+
+
+def _pattern_statistics(
+    coords: np.ndarray,
+    support: np.ndarray,
+    hull: Polygon,
+    statistics: Sequence[str],
+    reference_points: np.ndarray,
+    quadrat_shape: Tuple[int, int],
+    edge_correction: Optional[str] = None,
+    tree: Optional[cKDTree] = None,
+    enumerate_pairs: bool = True,
+) -> Dict[str, np.ndarray]:
+    """
+    Computes all requested statistics of one point set from a single KD-tree.
+
+    K and L share one pair-distance histogram, G reuses the tree's
+    nearest-neighbour query and F queries the same tree from the reference
+    points.
+    """
+    if tree is None:
+        tree = cKDTree(coords)
+    values: Dict[str, np.ndarray] = {}
+
+    if "K" in statistics or "L" in statistics:
+        k_values = _ripley_k(coords, support, hull, edge_correction, tree=tree, enumerate_pairs=enumerate_pairs)
+        if "K" in statistics:
+            values["K"] = k_values
+        if "L" in statistics:
+            values["L"] = np.sqrt(k_values / np.pi)
+    if "G" in statistics:
+        nn_dist, _ = tree.query(coords, k=2)
+        values["G"] = _ecdf(nn_dist[:, 1], support)
+    if "F" in statistics:
+        empty_dist, _ = tree.query(reference_points, k=1)
+        values["F"] = _ecdf(empty_dist, support)
+    if "quadrat" in statistics:
+        values["quadrat"] = np.array([_quadrat_dispersion(coords, hull, quadrat_shape)])
+    return values
+
+
+def _simulate_statistics_batch(
+    args: Tuple[Polygon, int, np.ndarray, Sequence[str], np.ndarray, Tuple[int, int],
+                Optional[str], bool, List[np.random.SeedSequence]]
+) -> Dict[str, np.ndarray]:
+    """Computes every requested statistic for a batch of CSR patterns."""
+    (hull, n, support, statistics, reference_points, quadrat_shape,
+     edge_correction, enumerate_pairs, seed_sequences) = args
+    realizations = [
+        _pattern_statistics(
+            _sample_csr(hull, n, np.random.default_rng(seq)), support, hull,
+            statistics, reference_points, quadrat_shape, edge_correction,
+            enumerate_pairs=enumerate_pairs,
+        )
+        for seq in seed_sequences
+    ]
+    return {name: np.array([r[name] for r in realizations]) for name in statistics}
+
+
+def analyze_point_pattern(
+    points_gdf: gpd.GeoDataFrame,
+    statistics: Sequence[str] = _STATISTICS,
+    steps: int = 100,
+    permutations: int = 99,
+    quadrat_shape: Tuple[int, int] = (10, 10),
+    edge_correction: Optional[str] = None,
+    n_jobs: Optional[int] = None,
+    random_seed: Optional[int] = None,
+    cache: Optional[ResultCache] = None,
+) -> Dict[str, Dict[str, Any]]:
+    """
+    Computes several point pattern statistics and their envelopes in one pass.
+
+    The convex hull, the KD-tree and the pair-distance histogram are built
+    once for the observed points. Each CSR simulation is likewise drawn once
+    and all requested statistics are evaluated on it, instead of running a
+    separate set of simulations per statistic.
+
+    Args:
+        points_gdf: A GeoDataFrame of at least 3 Point geometries, not all on
+                    one line.
+        statistics: Any of "K" (Ripley's K), "L" (Besag's L), "G" (nearest-
+                    neighbour distance function), "F" (empty-space function)
+                    and "quadrat" (index of dispersion of quadrat counts).
+        steps: The number of distance steps, shared by K, L, G and F.
+        permutations: The number of CSR simulations for the envelopes.
+        quadrat_shape: The number of quadrats along x and y, laid over the
+                       bounding box of the hull.
+        edge_correction: Edge correction for K and L, see analyze_k_function.
+        n_jobs: The number of worker processes for the simulations.
+        random_seed: Seed for the reference points and the simulations.
+        cache: An optional result cache, see analyze_k_function.
+
+    Returns:
+        A dictionary keyed by statistic name. Each entry has the keys "r"
+        (empty for "quadrat"), "values", "expected", "confidence_envelope"
+        and "pattern", with the same meaning as in analyze_k_function.
+    """
+    if not isinstance(points_gdf, gpd.GeoDataFrame) or points_gdf.empty:
+        raise ValueError("Input must be a non-empty GeoDataFrame.")
+    if not all(points_gdf.geom_type == 'Point'):
+        raise ValueError("All geometries in the GeoDataFrame must be Points.")
+    unknown = set(statistics) - set(_STATISTICS)
+    if unknown:
+        raise ValueError(f"Unsupported statistics: {sorted(unknown)}")
+    if edge_correction not in _EDGE_CORRECTIONS:
+        raise ValueError(f"Unsupported edge_correction: {edge_correction}")
+    statistics = [name for name in _STATISTICS if name in statistics]
+
+    coords = shapely.get_coordinates(points_gdf.geometry.values)
+    hull = _study_hull(coords)
+    if cache is not None:
+        cache_key = get_cache_key({
+            "function": "analyze_point_pattern",
+            "points": hash_array(coords),
+            "statistics": statistics,
+            "steps": steps,
+            "permutations": permutations,
+            "quadrat_shape": list(quadrat_shape),
+            "edge_correction": edge_correction,
+            "random_seed": random_seed,
+        })
+        cached = cache.get(cache_key)
+        if cached is not None:
+            return cached
+
+    # Shared structures, built once
+    tree = cKDTree(coords)
+    support = _k_support(coords, tree, steps)
+    enumerate_pairs = (
+        edge_correction is not None
+        or not {"K", "L"} & set(statistics)
+        or _pairs_fit_in_memory(coords, support, hull, tree)
+    )
+
+    reference_seq, simulation_seq = np.random.SeedSequence(random_seed).spawn(2)
+    reference_points = _sample_csr(hull, _NUM_REFERENCE_POINTS, np.random.default_rng(reference_seq))
+
+    observed = _pattern_statistics(
+        coords, support, hull, statistics, reference_points, quadrat_shape, edge_correction,
+        tree=tree, enumerate_pairs=enumerate_pairs,
+    )
+
+    simulations: Dict[str, np.ndarray] = {}
+    if permutations > 0:
+        results = _run_simulations(
+            _simulate_statistics_batch,
+            (hull, len(coords), support, statistics, reference_points, quadrat_shape,
+             edge_correction, enumerate_pairs),
+            simulation_seq.spawn(permutations),
+            len(coords),
+            n_jobs,
+        )
+        simulations = {name: np.concatenate([r[name] for r in results]) for name in statistics}
+
+    report: Dict[str, Dict[str, Any]] = {}
+    for name in statistics:
+        values = observed[name]
+        if name in simulations:
+            expected = np.nanmean(simulations[name], axis=0)
+            lower_env = np.nanpercentile(simulations[name], 2.5, axis=0)
+            upper_env = np.nanpercentile(simulations[name], 97.5, axis=0)
+            if len(coords) < _MIN_CLASSIFIED_POINTS:
+                pattern = "Insufficient data"
+            elif name == "quadrat":
+                # A single dispersion value: no radii to exclude
+                pattern = _classify_pattern(values, lower_env, upper_env) if lower_env[0] > 0 else "Random"
+            else:
+                pattern = _classify_pattern(
+                    values, lower_env, upper_env,
+                    upper_limit=1.0 if name in ("G", "F") else np.inf,
+                    reverse=name == "F",
+                )
+            confidence_envelope = list(zip(lower_env.tolist(), upper_env.tolist()))
+        else:
+            expected = np.full_like(values, np.nan)
+            pattern = "Unknown (simulations not available)"
+            confidence_envelope = []
+
+        report[name] = {
+            "r": [] if name == "quadrat" else support.tolist(),
+            "values": values.tolist(),
+            "expected": expected.tolist(),
+            "confidence_envelope": confidence_envelope,
+            "pattern": pattern,
+        }
+    if cache is not None:
+        cache.put(cache_key, report)
+    return report
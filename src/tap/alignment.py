@@ -0,0 +1,1054 @@
+# -*- coding: utf-8 -*-
+"""
+This module implements the multilevel balanced territory partitioner.
+
+In the style of METIS, the unit graph is repeatedly coarsened by merging
+matched neighbours, the coarsest graph is partitioned by growing one region
+per territory, and the partition is projected back level by level with a
+refinement pass at each. Everything works on CSR arrays, so a territory
+graph with 100k+ units is partitioned in seconds without networkx objects
+or native partitioning libraries.
+
+Territories are contiguous by construction: regions are grown along edges,
+coarse vertices are connected sets of units, and a refinement move is only
+made if a local search shows that the territory it leaves stays connected.
+Where lumpy unit weights keep the refinement from reaching the balance
+tolerance, a final pass moves weight along paths of territories.
+
+``realign_incremental`` updates an existing alignment after customer
+changes with local border moves instead of a full re-partitioning.
+"""
+
+import heapq
+import logging
+from collections import deque
+from dataclasses import dataclass
+from typing import List, Optional, Sequence, Tuple
+
+import networkx as nx
+import numpy as np
+import scipy.sparse as sp
+from scipy.sparse.csgraph import connected_components, dijkstra
+
+from src.common.instrumentation import annotate, span
+from src.common.schemas import IncrementalAlignmentConfig, MultilevelPartitionerConfig
+from src.tap.graph_builder import CustomerDelta, TerritoryGraph, apply_customer_delta
+from src.tap.partitioner import TerritoryPartitioner
+
+logger = logging.getLogger(__name__)
+
+# Matching rounds per coarsening level; later rounds only match leftovers.
+_MATCHING_ROUNDS = 4
+
+# Coarsening stops once a level shrinks the graph by less than this factor.
+_MIN_COARSENING_RATIO = 0.95
+
+# Coarse vertices may weigh at most this multiple of total / coarsest size.
+_MAX_VERTEX_WEIGHT_FACTOR = 1.5
+
+# Vertices visited by the local search that proves a move keeps its territory connected.
+_MAX_CONNECTIVITY_VISITS = 64
+
+# Rounds of the rebalancing pass that follows the contiguity repair.
+_REBALANCE_ROUNDS = 20
+
+# Candidate paths a rebalancing transfer tries per territory and round.
+_TRANSFER_PATHS = 8
+
+# Weightless units a rebalancing hop may move to uncover the units behind them.
+_MAX_OPENING_MOVES = 32
+
+# Rebalancing stops once a round reduces the squared deviations by less than this share.
+_MIN_REBALANCE_GAIN = 0.01
+
+# The least weight a rebalancing transfer must move.
+_MIN_TRANSFER = 0.01
+
+
+# --- Coarsening ---
+
+def _match(
+    adjacency: sp.csr_matrix,
+    vertex_weights: np.ndarray,
+    sizes: np.ndarray,
+    max_vertex_weight: float,
+    rng: np.random.Generator,
+) -> np.ndarray:
+    """
+    Computes a heavy-edge matching with vectorized handshakes.
+
+    Every free vertex points at its best free neighbour, and mutual choices
+    are matched. Scores prefer heavy edges between small vertices, which
+    keeps coarse vertices compact and of similar size; the random tie-break
+    is symmetric so that equal edges can still be chosen from both sides.
+
+    Returns:
+        The partner of every vertex, or the vertex itself if unmatched.
+    """
+    n = adjacency.shape[0]
+    indptr, cols = adjacency.indptr, adjacency.indices
+    degree = np.diff(indptr)
+    rows = np.repeat(np.arange(n), degree)
+
+    tie_break = rng.random(n)
+    score = (adjacency.data + 1e-12) / (sizes[rows] * sizes[cols]) * (1 + 0.01 * tie_break[rows] * tie_break[cols])
+    fits = vertex_weights[rows] + vertex_weights[cols] <= max_vertex_weight
+
+    match = np.full(n, -1, dtype=np.int64)
+    has_edges = np.flatnonzero(degree > 0)
+    for _ in range(_MATCHING_ROUNDS):
+        free = match < 0
+        candidate = np.where(fits & free[rows] & free[cols], score, -np.inf)
+        # Within each row the slots are ordered best first
+        best = np.lexsort((-candidate, rows))[indptr[has_edges]]
+        valid = np.isfinite(candidate[best])
+        vertices, choices = has_edges[valid], cols[best[valid]]
+
+        choice_of = np.full(n, -1, dtype=np.int64)
+        choice_of[vertices] = choices
+        mutual = choice_of[choices] == vertices
+        if not mutual.any():
+            break
+        match[vertices[mutual]] = choices[mutual]
+
+    unmatched = match < 0
+    match[unmatched] = np.flatnonzero(unmatched)
+    return match
+
+
+def _contract(
+    adjacency: sp.csr_matrix, match: np.ndarray
+) -> Tuple[np.ndarray, sp.csr_matrix]:
+    """
+    Merges matched vertices.
+
+    Returns:
+        The coarse vertex of every vertex and the coarse adjacency matrix,
+        whose edge weights are the summed weights of the merged edges.
+    """
+    n = len(match)
+    leader = np.minimum(np.arange(n), match)
+    is_leader = leader == np.arange(n)
+    coarse_map = (np.cumsum(is_leader) - 1)[leader]
+    num_coarse = int(is_leader.sum())
+
+    coo = adjacency.tocoo()
+    rows, cols = coarse_map[coo.row], coarse_map[coo.col]
+    keep = rows != cols
+    coarse = sp.csr_matrix((coo.data[keep], (rows[keep], cols[keep])), shape=(num_coarse, num_coarse))
+    return coarse_map, coarse
+
+
+def _coarsen(
+    adjacency: sp.csr_matrix, vertex_weights: np.ndarray, target: int, rng: np.random.Generator
+) -> List[Tuple[sp.csr_matrix, np.ndarray, Optional[np.ndarray]]]:
+    """
+    Builds the level hierarchy, finest first.
+
+    Returns:
+        Per level, its adjacency, its vertex weights and the map of its
+        vertices to the next coarser level (None for the coarsest).
+    """
+    max_vertex_weight = _MAX_VERTEX_WEIGHT_FACTOR * vertex_weights.sum() / target
+    sizes = np.ones(len(vertex_weights))
+    levels = []
+    while adjacency.shape[0] > target:
+        match = _match(adjacency, vertex_weights, sizes, max_vertex_weight, rng)
+        coarse_map, coarse = _contract(adjacency, match)
+        if coarse.shape[0] > _MIN_COARSENING_RATIO * adjacency.shape[0]:
+            break
+        levels.append((adjacency, vertex_weights, coarse_map))
+        adjacency = coarse
+        vertex_weights = np.bincount(coarse_map, weights=vertex_weights)
+        sizes = np.bincount(coarse_map, weights=sizes)
+    levels.append((adjacency, vertex_weights, None))
+    return levels
+
+
+# --- Initial partitioning ---
+
+def _allocate_territories(component_weights: np.ndarray, component_sizes: np.ndarray, num_parts: int) -> np.ndarray:
+    """Gives every connected component one territory and the rest in proportion to its weight."""
+    quotas = np.ones(len(component_weights), dtype=np.int64)
+    shares = component_weights / component_weights.sum() * num_parts
+    for _ in range(num_parts - len(quotas)):
+        deficit = np.where(quotas < component_sizes, shares - quotas, -np.inf)
+        quotas[np.argmax(deficit)] += 1
+    return quotas
+
+
+def _spread_seeds(adjacency: sp.csr_matrix, members: np.ndarray, count: int, rng: np.random.Generator) -> List[int]:
+    """
+    Picks seeds within one component by farthest-point sampling on hop distances.
+
+    Each new seed only needs a search bounded by its own distance to the
+    nearest earlier seed, so later searches stay small.
+    """
+    start = int(members[rng.integers(len(members))])
+    distance = dijkstra(adjacency, indices=start, unweighted=True)
+    seed = int(members[np.argmax(distance[members])])
+
+    nearest_seed = np.full(adjacency.shape[0], np.inf)
+    seeds = []
+    for _ in range(count):
+        seeds.append(seed)
+        limit = nearest_seed[seed]
+        nearest_seed = np.minimum(nearest_seed, dijkstra(adjacency, indices=seed, unweighted=True, limit=limit))
+        seed = int(members[np.argmax(nearest_seed[members])])
+    return seeds
+
+
+def _grow_regions(
+    adjacency: sp.csr_matrix, vertex_weights: np.ndarray, seeds: List[int], rng: np.random.Generator
+) -> np.ndarray:
+    """
+    Grows one region per seed, always extending the lightest region.
+
+    A region claims its unassigned frontier vertices in order of hop distance
+    from its seed, so regions are compact and connected. A region without
+    unassigned neighbours stops growing; every vertex reachable from a seed
+    is eventually claimed.
+    """
+    indptr, indices = adjacency.indptr.tolist(), adjacency.indices.tolist()
+    weights = vertex_weights.tolist()
+    tie_break = rng.random(adjacency.shape[0]).tolist()
+    labels = [-1] * adjacency.shape[0]
+
+    frontiers = []
+    active = []
+    for part, seed in enumerate(seeds):
+        labels[seed] = part
+        frontiers.append([(1, tie_break[u], u) for u in indices[indptr[seed]:indptr[seed + 1]]])
+        heapq.heapify(frontiers[part])
+        active.append((weights[seed], 1, part))
+    heapq.heapify(active)
+
+    while active:
+        weight, count, part = heapq.heappop(active)
+        frontier = frontiers[part]
+        while frontier and labels[frontier[0][2]] >= 0:
+            heapq.heappop(frontier)
+        if not frontier:
+            continue
+        distance, _, vertex = heapq.heappop(frontier)
+        labels[vertex] = part
+        for u in indices[indptr[vertex]:indptr[vertex + 1]]:
+            if labels[u] < 0:
+                heapq.heappush(frontier, (distance + 1, tie_break[u], u))
+        heapq.heappush(active, (weight + weights[vertex], count + 1, part))
+    return np.asarray(labels, dtype=np.int64)
+
+
+def _initial_partition(
+    adjacency: sp.csr_matrix, vertex_weights: np.ndarray, num_parts: int, rng: np.random.Generator
+) -> np.ndarray:
+    """Partitions the coarsest graph into contiguous, roughly balanced regions."""
+    num_components, component = connected_components(adjacency, directed=False)
+    if num_components > num_parts:
+        raise ValueError(
+            f"The graph has {num_components} disconnected components, so it cannot be split into "
+            f"{num_parts} contiguous territories."
+        )
+    sizes = np.bincount(component)
+    quotas = _allocate_territories(np.bincount(component, weights=vertex_weights), sizes, num_parts)
+
+    seeds = []
+    for index, quota in enumerate(quotas.tolist()):
+        seeds.extend(_spread_seeds(adjacency, np.flatnonzero(component == index), quota, rng))
+    return _grow_regions(adjacency, vertex_weights, seeds, rng)
+
+
+# --- Refinement ---
+
+def _leaves_connected(vertex: int, part: int, indptr: Sequence[int], indices: Sequence[int], labels: Sequence[int]) -> bool:
+    """
+    Checks locally that a territory stays connected when the vertex leaves it.
+
+    If the vertex's neighbours in the territory can reach each other without
+    passing through the vertex, any path through it can be rerouted. The
+    search is bounded, so a False answer may be conservative.
+    """
+    targets = {u for u in indices[indptr[vertex]:indptr[vertex + 1]] if labels[u] == part}
+    if len(targets) <= 1:
+        return True
+    start = targets.pop()
+    seen = {vertex, start}
+    queue = deque([start])
+    visits = 0
+    while queue and targets and visits < _MAX_CONNECTIVITY_VISITS:
+        x = queue.popleft()
+        visits += 1
+        for y in indices[indptr[x]:indptr[x + 1]]:
+            if y not in seen and labels[y] == part:
+                seen.add(y)
+                targets.discard(y)
+                queue.append(y)
+    return not targets
+
+
+def _boundary_vertices(adjacency: sp.csr_matrix, rows: np.ndarray, labels: np.ndarray) -> np.ndarray:
+    """Returns the vertices with a neighbour in another territory."""
+    return np.unique(rows[labels[rows] != labels[adjacency.indices]])
+
+
+def _refine(
+    adjacency: sp.csr_matrix,
+    vertex_weights: np.ndarray,
+    labels: np.ndarray,
+    num_parts: int,
+    bounds: Tuple[float, float],
+    max_passes: int,
+    rng: np.random.Generator,
+) -> np.ndarray:
+    """
+    Moves boundary vertices to reduce the weighted edge cut and restore balance.
+
+    While a territory is outside the balance bounds, moves that shrink the
+    weight difference of the two territories are taken even if they increase
+    the cut; this diffuses excess weight across the graph. Otherwise a move
+    must reduce the cut (or keep it and improve balance) without leaving the
+    bounds. No move empties or disconnects a territory.
+    """
+    lower, upper = bounds
+    n = adjacency.shape[0]
+    rows = np.repeat(np.arange(n), np.diff(adjacency.indptr))
+    indptr, indices, data = adjacency.indptr.tolist(), adjacency.indices.tolist(), adjacency.data.tolist()
+    weights = vertex_weights.tolist()
+    part_weight = np.bincount(labels, weights=vertex_weights, minlength=num_parts).tolist()
+    part_size = np.bincount(labels, minlength=num_parts).tolist()
+    lab = labels.tolist()
+
+    candidates = _boundary_vertices(adjacency, rows, labels)
+    for _ in range(max_passes):
+        moved = []
+        for v in rng.permutation(candidates).tolist():
+            a = lab[v]
+            if part_size[a] == 1:
+                continue
+            connection = {}
+            for slot in range(indptr[v], indptr[v + 1]):
+                p = lab[indices[slot]]
+                connection[p] = connection.get(p, 0.0) + data[slot]
+            internal = connection.pop(a, 0.0)
+            if not connection:
+                continue
+
+            wv, wa = weights[v], part_weight[a]
+            best, best_key = -1, None
+            for b, external in connection.items():
+                wb = part_weight[b]
+                gain = external - internal
+                if wa > upper or wb < lower:
+                    allowed = 0 < wv < wa - wb
+                else:
+                    allowed = (
+                        wb + wv <= upper
+                        and wa - wv >= lower
+                        and (gain > 0 or (gain == 0 and wv < wa - wb))
+                    )
+                if allowed and (best_key is None or (gain, -wb) > best_key):
+                    best, best_key = b, (gain, -wb)
+            if best < 0 or not _leaves_connected(v, a, indptr, indices, lab):
+                continue
+
+            lab[v] = best
+            part_weight[a] -= wv
+            part_weight[best] += wv
+            part_size[a] -= 1
+            part_size[best] += 1
+            moved.append(v)
+
+        if not moved:
+            break
+        if max(part_weight) > upper or min(part_weight) < lower:
+            # Diffusion may need any boundary, not just the one around the last moves
+            candidates = _boundary_vertices(adjacency, rows, np.asarray(lab))
+        else:
+            moved = np.asarray(moved)
+            candidates = np.unique(np.concatenate([moved, adjacency[moved].indices]))
+    return np.asarray(lab, dtype=np.int64)
+
+
+def _repair_contiguity(adjacency: sp.csr_matrix, labels: np.ndarray) -> np.ndarray:
+    """
+    Makes every territory contiguous.
+
+    Each territory keeps its largest connected piece. In every round, each
+    other piece that borders the main piece of another territory joins the
+    one it shares the heaviest border with. Main pieces only grow, so the
+    number of stray units falls every round and the loop ends with every
+    territory in one piece. Only pieces in a part of the graph that holds no
+    main piece, i.e. territories spanning disconnected parts of the graph,
+    cannot be repaired; they are left alone with a warning.
+    """
+    labels = labels.copy()
+    num_parts = labels.max() + 1
+    coo = adjacency.tocoo()
+    rounds = 0
+    while True:
+        inside = labels[coo.row] == labels[coo.col]
+        induced = sp.csr_matrix((np.ones(inside.sum()), (coo.row[inside], coo.col[inside])), shape=adjacency.shape)
+        num_pieces, piece = connected_components(induced, directed=False)
+        piece_size = np.bincount(piece)
+        piece_part = np.zeros(num_pieces, dtype=np.int64)
+        piece_part[piece] = labels
+
+        # The largest piece of each territory is its main piece
+        order = np.lexsort((-piece_size, piece_part))
+        first_of_part = np.ones(num_pieces, dtype=bool)
+        first_of_part[1:] = piece_part[order[1:]] != piece_part[order[:-1]]
+        is_main = np.zeros(num_pieces, dtype=bool)
+        is_main[order[first_of_part]] = True
+        if is_main.all():
+            break
+
+        # Border weight between each stray piece and the neighbouring main pieces
+        leaving = ~inside & ~is_main[piece[coo.row]] & is_main[piece[coo.col]]
+        border = sp.csr_matrix(
+            (coo.data[leaving] + 1e-12, (piece[coo.row[leaving]], labels[coo.col[leaving]])),
+            shape=(num_pieces, num_parts),
+        )
+        strays = np.flatnonzero(np.diff(border.indptr) > 0)
+        if len(strays) == 0:
+            logger.warning(
+                "%d pieces of territories lie in parts of the graph without their main piece and stay disconnected.",
+                int((~is_main).sum()),
+            )
+            break
+        target = np.asarray(border[strays].argmax(axis=1)).ravel()
+        new_part = piece_part.copy()
+        new_part[strays] = target
+        labels = new_part[piece]
+        rounds += 1
+    annotate(rounds=rounds)
+    return labels
+
+
+def _transfer_paths(
+    neighbours: List[set], room: np.ndarray, part: int, sending: bool, min_room: float, count: int
+) -> List[List[int]]:
+    """
+    Returns candidate paths of territories to trade weight with a territory.
+
+    The far ends are the nearest territories with at least ``min_room`` room,
+    then the nearest with any room, so that the hops have ranges wide enough
+    to fit whole units into. The paths run in the direction the weight moves.
+    """
+    parent = {part: -1}
+    level, roomy, tight = [part], [], []
+    while level and len(roomy) < count:
+        following = []
+        for a in level:
+            for b in neighbours[a]:
+                if b not in parent:
+                    parent[b] = a
+                    following.append(b)
+        roomy.extend(b for b in following if room[b] >= min_room)
+        tight.extend(b for b in following if 0 < room[b] < min_room)
+        level = following
+
+    paths = []
+    for end in (roomy + tight)[:count]:
+        path = [end]
+        while parent[path[-1]] >= 0:
+            path.append(parent[path[-1]])
+        paths.append(path[::-1] if sending else path)
+    return paths
+
+
+def _closest_subset(weights: Sequence[float], low: float, high: float, target: float) -> Optional[np.ndarray]:
+    """
+    Returns the positions of weights whose total lies in [low, high], closest to the target.
+
+    The totals are tracked in hundredths of the weight unit. Returns None if
+    no subset (including the empty one) lands in the range.
+    """
+    scale = 100.0
+    top = int(np.floor(high * scale + 1e-6))
+    if top < 0:
+        return None
+    steps = np.rint(np.asarray(weights, dtype=np.float64) * scale).astype(np.int64)
+    reachable = np.zeros(top + 1, dtype=bool)
+    reachable[0] = True
+    history = []
+    for step in steps.tolist():
+        history.append(reachable)
+        if step <= top:
+            reachable = reachable.copy()
+            reachable[step:] |= history[-1][:top + 1 - step]
+    bottom = max(int(np.ceil(low * scale - 1e-6)), 0)
+    totals = np.flatnonzero(reachable[bottom:]) + bottom
+    if len(totals) == 0:
+        return None
+    total = int(totals[np.argmin(np.abs(totals - target * scale))])
+    chosen = []
+    for index in range(len(steps) - 1, -1, -1):
+        if not history[index][total]:
+            chosen.append(index)
+            total -= int(steps[index])
+    return np.asarray(chosen[::-1], dtype=np.int64)
+
+
+def _rebalance(
+    adjacency: sp.csr_matrix,
+    vertex_weights: np.ndarray,
+    labels: np.ndarray,
+    num_parts: int,
+    bounds: Tuple[float, float],
+    max_rounds: int,
+) -> np.ndarray:
+    """
+    Moves weight along paths of territories to restore balance.
+
+    The pairwise moves of ``_refine`` cannot shift weight through a region of
+    territories that are all over (or under) the bounds. Here the territories
+    furthest outside the bounds trade weight with the nearest territories
+    that have room, through the territories in between: each hop moves the
+    units along the shared border whose total best fits the amount, so units
+    of very different weights still land within the bounds. The other
+    territories on a path may end up to as far from the average as the
+    territory being balanced, as long as the squared deviations fall; this
+    diffuses a regional excess outwards, and the largest deviation never
+    grows. A path is undone if any hop fails. No move empties or disconnects
+    a territory.
+    """
+    lower, upper = bounds
+    average = vertex_weights.sum() / num_parts
+    unit_weight = np.median(vertex_weights[vertex_weights > 0])
+    indptr, indices = adjacency.indptr.tolist(), adjacency.indices.tolist()
+    weights = vertex_weights.tolist()
+    rows = np.repeat(np.arange(adjacency.shape[0]), np.diff(adjacency.indptr))
+    lab = labels.tolist()
+    part_weight = np.bincount(labels, weights=vertex_weights, minlength=num_parts)
+    part_size = np.bincount(labels, minlength=num_parts).tolist()
+
+    def move(v: int, target: int, log: List[Tuple[int, int]]) -> None:
+        log.append((v, lab[v]))
+        part_weight[lab[v]] -= weights[v]
+        part_size[lab[v]] -= 1
+        lab[v] = target
+        part_weight[target] += weights[v]
+        part_size[target] += 1
+
+    def movable(v: int, a: int, b: int) -> bool:
+        return (
+            part_size[a] > 1
+            and any(lab[u] == b for u in indices[indptr[v]:indptr[v + 1]])
+            and _leaves_connected(v, a, indptr, indices, lab)
+        )
+
+    def hop(a: int, b: int, low: float, high: float, wanted: float, log: List[Tuple[int, int]]) -> float:
+        # Moves the border units whose total best fits the amount; weightless
+        # units are moved only to uncover the units behind them
+        frontier = dict.fromkeys(borders.get((a, b), ()))
+        moved, free_moves = 0.0, 0
+        while part_size[a] > 1:
+            units = [v for v in frontier if lab[v] == a and any(lab[u] == b for u in indices[indptr[v]:indptr[v + 1]])]
+            frontier = dict.fromkeys(units)
+            weighted = [v for v in units if weights[v] > 0]
+            chosen = _closest_subset([weights[v] for v in weighted], low - moved, high - moved, wanted - moved)
+            if chosen is not None and len(chosen) == 0:
+                break
+            progress = False
+            for index in chosen if chosen is not None else ():
+                v = weighted[index]
+                del frontier[v]
+                if movable(v, a, b):
+                    move(v, b, log)
+                    moved += weights[v]
+                    progress = True
+                    frontier.update((u, None) for u in indices[indptr[v]:indptr[v + 1]] if lab[u] == a)
+            if progress:
+                continue
+            openers = [v for v in frontier if weights[v] == 0]
+            if not openers or free_moves >= min(part_size[a] // 2, _MAX_OPENING_MOVES):
+                break
+            v = openers[0]
+            del frontier[v]
+            if movable(v, a, b):
+                move(v, b, log)
+                free_moves += 1
+                frontier.update((u, None) for u in indices[indptr[v]:indptr[v + 1]] if lab[u] == a)
+        return moved if low <= moved <= high else -1.0
+
+    def transfer(part: int, path: List[int]) -> bool:
+        # Every territory on the path must end no further from the average
+        # than the territory being balanced, which itself must improve
+        spread = abs(part_weight[part] - average)
+        start = {c: part_weight[c] for c in path}
+        floor = {c: min(average - spread, start[c]) for c in path}
+        ceiling = {c: max(average + spread, start[c]) for c in path}
+        if start[part] > average:
+            ceiling[part] = start[part] - _MIN_TRANSFER
+        else:
+            floor[part] = start[part] + _MIN_TRANSFER
+
+        log, carried, end = [], 0.0, path[-1]
+        for index, (a, b) in enumerate(zip(path[:-1], path[1:])):
+            if index > 0 and part == path[0] and lower <= part_weight[a] <= upper:
+                break
+            # The sender must end in its range, and the rest of the path must be able to take the amount
+            rest = path[index + 1:-1]
+            low = max(
+                part_weight[a] - ceiling[a], _MIN_TRANSFER,
+                floor[end] - part_weight[end] - sum(part_weight[c] - floor[c] for c in rest),
+            )
+            high = min(
+                part_weight[a] - floor[a],
+                ceiling[end] - part_weight[end] + sum(ceiling[c] - part_weight[c] for c in rest),
+            )
+            wanted = spread if index == 0 else carried
+            carried = hop(a, b, low, high, min(max(wanted, low), high), log) if low <= high else -1.0
+            if carried < 0:
+                break
+        # The transfer must reduce the squared deviation of the territories it touched
+        if carried >= 0 and sum((part_weight[c] - average) ** 2 - (start[c] - average) ** 2 for c in path) < 0:
+            return True
+        for v, previous in reversed(log):
+            move(v, previous, [])
+        return False
+
+    rounds, stuck, touched = 0, set(), set()
+    for rounds in range(1, max_rounds + 1):
+        outside = np.flatnonzero((part_weight > upper) | (part_weight < lower))
+        if len(outside) == 0:
+            break
+        current = np.asarray(lab, dtype=np.int64)
+        cut = current[rows] != current[adjacency.indices]
+        borders = {}
+        for v, u in zip(rows[cut].tolist(), adjacency.indices[cut].tolist()):
+            borders.setdefault((lab[v], lab[u]), []).append(v)
+        neighbours = [set() for _ in range(num_parts)]
+        for a, b in borders:
+            neighbours[a].add(b)
+        # A territory that found no transfer is retried once one near it changed
+        stuck = {part for part in stuck if part not in touched and not neighbours[part] & touched}
+        touched = set()
+
+        squared = ((part_weight - average) ** 2).sum()
+        for part in outside[np.argsort(-np.abs(part_weight[outside] - average))].tolist():
+            if part in stuck or lower <= part_weight[part] <= upper:
+                continue
+            sending = part_weight[part] > upper
+            spread = abs(part_weight[part] - average)
+            if sending:
+                room = average + spread - part_weight
+            else:
+                room = part_weight - average + spread
+            for path in _transfer_paths(neighbours, room, part, sending, unit_weight, _TRANSFER_PATHS):
+                if transfer(part, path):
+                    touched.update(path)
+                    break
+            else:
+                stuck.add(part)
+        if ((part_weight - average) ** 2).sum() > (1 - _MIN_REBALANCE_GAIN) * squared:
+            break
+    annotate(rounds=rounds)
+    return np.asarray(lab, dtype=np.int64)
+
+
+# --- Partitioner ---
+
+class MultilevelPartitioner(TerritoryPartitioner):
+    """
+    A METIS-style multilevel partitioner for balanced, contiguous territories.
+
+    Territories are balanced on the configured metric within the configured
+    tolerance where the unit weights allow it, minimize the total weight of
+    the edges between territories, and are always contiguous.
+    """
+
+    def partition(self, graph: nx.Graph, config: MultilevelPartitionerConfig) -> nx.Graph:
+        """
+        Partitions a networkx territory graph in place (see TerritoryPartitioner).
+
+        Args:
+            graph: The territory graph, with the balance metric as a node
+                   attribute and optional 'weight' edge attributes.
+            config: The partitioner configuration.
+
+        Returns:
+            The same graph, with a 'partition_id' attribute on every node.
+        """
+        nodes = list(graph.nodes)
+        position = {node: index for index, node in enumerate(nodes)}
+        vertex_weights = np.array(
+            [graph.nodes[node].get(config.balance_metric.value, 0.0) for node in nodes], dtype=np.float64
+        )
+        edges = np.array(
+            [(position[u], position[v], data.get("weight", 1.0)) for u, v, data in graph.edges(data=True)],
+            dtype=np.float64,
+        ).reshape(-1, 3)
+        rows, cols, weights = edges[:, 0].astype(np.int64), edges[:, 1].astype(np.int64), edges[:, 2]
+        adjacency = sp.csr_matrix(
+            (np.concatenate([weights, weights]), (np.concatenate([rows, cols]), np.concatenate([cols, rows]))),
+            shape=(len(nodes), len(nodes)),
+        )
+
+        labels = self.partition_arrays(adjacency, vertex_weights, config)
+        for node, label in zip(nodes, labels.tolist()):
+            graph.nodes[node]["partition_id"] = label
+        return graph
+
+    def partition_territory_graph(self, graph: TerritoryGraph, config: MultilevelPartitionerConfig) -> np.ndarray:
+        """
+        Partitions an array-backed territory graph.
+
+        Returns:
+            The territory of every unit position.
+        """
+        return self.partition_arrays(graph.adjacency, getattr(graph, config.balance_metric.value), config)
+
+    def partition_arrays(
+        self, adjacency: sp.spmatrix, vertex_weights: np.ndarray, config: MultilevelPartitionerConfig
+    ) -> np.ndarray:
+        """
+        Partitions a graph given as a symmetric sparse adjacency matrix.
+
+        Args:
+            adjacency: The symmetric adjacency matrix; its values are the edge
+                       weights (connection strengths) used for the cut.
+            vertex_weights: The balance weight of every vertex. If they are
+                            all zero, vertices are balanced by count.
+            config: The partitioner configuration.
+
+        Returns:
+            The territory (0..num_partitions-1) of every vertex.
+        """
+        num_parts = config.num_partitions
+        n = adjacency.shape[0]
+        if num_parts < 1:
+            raise ValueError("num_partitions must be at least 1.")
+        if num_parts > n:
+            raise ValueError(f"Cannot split {n} units into {num_parts} territories.")
+        if config.balance_tolerance < 0:
+            raise ValueError("balance_tolerance must not be negative.")
+
+        # Drop self-loops but keep explicit zeros: a zero-weight edge (e.g. a
+        # corner-only neighbour) is still an adjacency for contiguity
+        coo = sp.coo_matrix(adjacency)
+        off_diagonal = coo.row != coo.col
+        adjacency = sp.csr_matrix(
+            (np.abs(coo.data[off_diagonal]).astype(np.float64), (coo.row[off_diagonal], coo.col[off_diagonal])),
+            shape=(n, n),
+        )
+        adjacency.sort_indices()
+
+        vertex_weights = np.asarray(vertex_weights, dtype=np.float64)
+        if vertex_weights.sum() <= 0:
+            logger.warning("All balance weights are zero; balancing territories by unit count.")
+            vertex_weights = np.ones(n)
+
+        rng = np.random.default_rng(config.seed)
+        average = vertex_weights.sum() / num_parts
+        bounds = ((1 - config.balance_tolerance) * average, (1 + config.balance_tolerance) * average)
+
+        with span("coarsen"):
+            levels = _coarsen(adjacency, vertex_weights, max(config.coarsening_threshold * num_parts, 2 * num_parts), rng)
+            annotate(levels=len(levels), coarsest_vertices=levels[-1][0].shape[0])
+        coarsest, coarsest_weights, _ = levels[-1]
+        with span("initial_partition"):
+            labels = _initial_partition(coarsest, coarsest_weights, num_parts, rng)
+        with span("refine"):
+            labels = _refine(coarsest, coarsest_weights, labels, num_parts, bounds, config.refinement_passes, rng)
+            for level_adjacency, level_weights, coarse_map in reversed(levels[:-1]):
+                labels = _refine(
+                    level_adjacency, level_weights, labels[coarse_map], num_parts, bounds, config.refinement_passes, rng
+                )
+        with span("repair_contiguity"):
+            labels = _repair_contiguity(adjacency, labels)
+
+        part_weight = np.bincount(labels, weights=vertex_weights, minlength=num_parts)
+        deviation = np.abs(part_weight / average - 1).max()
+        if deviation > config.balance_tolerance + 1e-9:
+            with span("rebalance"):
+                labels = _rebalance(adjacency, vertex_weights, labels, num_parts, bounds, _REBALANCE_ROUNDS)
+                labels = _refine(adjacency, vertex_weights, labels, num_parts, bounds, config.refinement_passes, rng)
+            part_weight = np.bincount(labels, weights=vertex_weights, minlength=num_parts)
+            deviation = np.abs(part_weight / average - 1).max()
+        if deviation > config.balance_tolerance + 1e-9:
+            logger.warning(
+                "The largest territory deviates %.1f%% from the mean weight, above the %.1f%% tolerance.",
+                deviation * 100, config.balance_tolerance * 100,
+            )
+        return labels
+
+
+# --- Incremental re-alignment ---
+
+@dataclass
+class IncrementalAlignmentResult:
+    """
+    The outcome of an incremental re-alignment.
+
+    Attributes:
+        labels: The territory of every unit position.
+        moved_units: The positions of the units that changed territory.
+        affected_units: The positions of the units whose aggregates changed.
+        balanced: Whether every territory is within the balance tolerance.
+        max_deviation: The largest relative deviation from the mean territory weight.
+    """
+    labels: np.ndarray
+    moved_units: np.ndarray
+    affected_units: np.ndarray
+    balanced: bool
+    max_deviation: float
+
+
+def _candidate_moves(
+    adjacency: sp.csr_matrix,
+    labels: np.ndarray,
+    part: int,
+    members: np.ndarray,
+    outward: bool,
+    num_parts: int,
+) -> Tuple[np.ndarray, np.ndarray, np.ndarray, np.ndarray]:
+    """
+    Lists the single-unit moves across the border of one territory.
+
+    Only the rows of the territory and of its border units are read, so the
+    cost depends on the territory, not on the whole graph.
+
+    Args:
+        members: The units of the territory, maintained by the caller.
+        outward: Whether units leave the territory (True) or join it (False).
+
+    Returns:
+        The unit, source territory, target territory and cut gain of every move.
+    """
+    rows = adjacency[members]
+    owner = np.repeat(members, np.diff(rows.indptr))
+    crossing = labels[rows.indices] != part
+    units = np.unique(owner[crossing] if outward else rows.indices[crossing])
+
+    # Connection weight of every border unit to every territory it touches
+    border = adjacency[units]
+    slot_unit = np.repeat(np.arange(len(units)), np.diff(border.indptr))
+    codes, inverse = np.unique(slot_unit * num_parts + labels[border.indices], return_inverse=True)
+    connection = np.bincount(inverse, weights=border.data)
+    unit_index, territory = codes // num_parts, codes % num_parts
+
+    sources = labels[units]
+    own = territory == sources[unit_index]
+    internal = np.zeros(len(units))
+    internal[unit_index[own]] = connection[own]
+    keep = ~own if outward else territory == part
+    unit_index = unit_index[keep]
+    return units[unit_index], sources[unit_index], territory[keep], connection[keep] - internal[unit_index]
+
+
+class _LocalBalancer:
+    """
+    Restores balance with single-unit moves across territory borders.
+
+    The territory furthest outside the bounds either hands a border unit to
+    a lighter neighbour or takes one from a heavier neighbour; every such
+    move shrinks the weight difference of the two territories. If no direct
+    move exists (all neighbours are about as heavy), weight is passed along
+    a short chain of territories to the nearest one on the other side of the
+    mean, one unit per hop. Among feasible moves the one adding the least
+    cut is preferred, and no move empties or disconnects a territory.
+    """
+
+    def __init__(
+        self,
+        adjacency: sp.csr_matrix,
+        vertex_weights: np.ndarray,
+        labels: np.ndarray,
+        num_parts: int,
+        bounds: Tuple[float, float],
+    ):
+        self.adjacency = adjacency
+        self.vertex_weights = vertex_weights
+        self.labels = labels
+        self.num_parts = num_parts
+        self.lower, self.upper = bounds
+        self.average = (self.lower + self.upper) / 2
+        self.part_weight = np.bincount(labels, weights=vertex_weights, minlength=num_parts)
+        self.part_size = np.bincount(labels, minlength=num_parts)
+        # Units of every territory, updated on each move so that border queries
+        # never scan all labels
+        order = np.argsort(labels, kind="stable")
+        self.members = [set(units.tolist()) for units in np.split(order, np.cumsum(self.part_size)[:-1])]
+        self.touched = set()
+
+    def _excess(self, parts: List[int]) -> float:
+        """Returns the total weight by which the territories exceed the bounds."""
+        weights = self.part_weight[parts]
+        return float(np.maximum(0, np.maximum(weights - self.upper, self.lower - weights)).sum())
+
+    def _move(self, unit: int, target: int) -> None:
+        source = self.labels[unit]
+        weight = self.vertex_weights[unit]
+        self.labels[unit] = target
+        self.part_weight[source] -= weight
+        self.part_weight[target] += weight
+        self.part_size[source] -= 1
+        self.part_size[target] += 1
+        self.members[source].remove(int(unit))
+        self.members[target].add(int(unit))
+        self.touched.add(int(unit))
+
+    def _candidate_moves(self, part: int, outward: bool) -> Tuple[np.ndarray, np.ndarray, np.ndarray, np.ndarray]:
+        members = np.fromiter(self.members[part], dtype=np.int64, count=len(self.members[part]))
+        return _candidate_moves(self.adjacency, self.labels, part, members, outward, self.num_parts)
+
+    def _feasible_moves(self, part: int, outward: bool) -> Tuple[np.ndarray, np.ndarray, np.ndarray, np.ndarray]:
+        """Lists the moves across the border of a territory that keep their source non-empty."""
+        units, sources, targets, gains = self._candidate_moves(part, outward)
+        keep = (self.vertex_weights[units] > 0) & (self.part_size[sources] > 1)
+        return units[keep], sources[keep], targets[keep], gains[keep]
+
+    def _first_connected(self, units: np.ndarray, sources: np.ndarray, order: np.ndarray) -> int:
+        """Returns the first move in the order whose unit can leave its territory, or -1."""
+        for i in order.tolist():
+            if _leaves_connected(units[i], sources[i], self.adjacency.indptr, self.adjacency.indices, self.labels):
+                return i
+        return -1
+
+    def try_direct_move(self, part: int) -> bool:
+        """Makes the best move that shrinks the weight difference of two neighbouring territories."""
+        outward = self.part_weight[part] > self.upper
+        units, sources, targets, gains = self._feasible_moves(part, outward)
+        weights = self.vertex_weights[units]
+        source_weight, target_weight = self.part_weight[sources], self.part_weight[targets]
+        pair_deviation = np.maximum(
+            np.abs(source_weight - weights - self.average), np.abs(target_weight + weights - self.average)
+        )
+        order = np.lexsort((pair_deviation, -gains))
+        order = order[(weights < source_weight - target_weight)[order]]
+        chosen = self._first_connected(units, sources, order)
+        if chosen < 0:
+            return False
+        self._move(units[chosen], targets[chosen])
+        return True
+
+    def _chain(self, part: int, outward: bool, max_depth: int) -> Optional[List[int]]:
+        """Finds the shortest chain of neighbouring territories to one on the other side of the mean."""
+        parent = {part: -1}
+        frontier = [part]
+        for _ in range(max_depth):
+            next_frontier = []
+            for current in frontier:
+                _, sources, targets, _ = self._candidate_moves(current, outward)
+                for neighbour in np.unique(targets if outward else sources).tolist():
+                    if neighbour in parent:
+                        continue
+                    parent[neighbour] = current
+                    next_frontier.append(neighbour)
+                    weight = self.part_weight[neighbour]
+                    if (outward and weight < self.average) or (not outward and weight > self.average):
+                        chain = [neighbour]
+                        while parent[chain[-1]] >= 0:
+                            chain.append(parent[chain[-1]])
+                        return chain[::-1]
+            frontier = next_frontier
+        return None
+
+    def try_chain_transfer(self, part: int, max_depth: int = 6) -> bool:
+        """
+        Passes weight along a chain of at most max_depth hops, one unit per hop.
+
+        Each hop moves the unit whose weight best matches the previous hop,
+        so intermediate territories stay about as heavy as they were. The
+        transfer is undone unless it reduces the total excess of the chain.
+        """
+        outward = self.part_weight[part] > self.upper
+        chain = self._chain(part, outward, max_depth)
+        if chain is None:
+            return False
+        excess_before = self._excess(chain)
+        touched_before = set(self.touched)
+        amount = self.part_weight[part] - self.upper if outward else self.lower - self.part_weight[part]
+        undo = []
+        for near, far in zip(chain[:-1], chain[1:]):
+            source, target = (near, far) if outward else (far, near)
+            units, sources, targets, gains = self._feasible_moves(source, True)
+            hop = targets == target
+            units, sources, gains = units[hop], sources[hop], gains[hop]
+            order = np.lexsort((-gains, np.abs(self.vertex_weights[units] - amount)))
+            chosen = self._first_connected(units, sources, order)
+            if chosen < 0:
+                break
+            undo.append((units[chosen], source))
+            self._move(units[chosen], target)
+            amount = self.vertex_weights[units[chosen]]
+        else:
+            if self._excess(chain) < excess_before:
+                return True
+
+        for unit, source in reversed(undo):
+            self._move(unit, source)
+        self.touched = touched_before
+        return False
+
+    def run(self, max_moved_units: int) -> np.ndarray:
+        """Repairs the worst territory until all are balanced, all are stuck or the budget is spent."""
+        stuck = set()
+        for _ in range(10 * max_moved_units + 1):
+            if len(self.touched) >= max_moved_units:
+                break
+            outside = (self.part_weight > self.upper) | (self.part_weight < self.lower)
+            outside[list(stuck)] = False
+            if not outside.any():
+                break
+            part = int(np.argmax(np.where(outside, np.abs(self.part_weight - self.average), -1)))
+            budget = max_moved_units - len(self.touched)
+            if self.try_direct_move(part) or self.try_chain_transfer(part, max_depth=min(6, budget)):
+                stuck.clear()
+            else:
+                stuck.add(part)
+        return self.labels
+
+
+def realign_incremental(
+    graph: TerritoryGraph,
+    labels: np.ndarray,
+    delta: CustomerDelta,
+    config: Optional[IncrementalAlignmentConfig] = None,
+) -> IncrementalAlignmentResult:
+    """
+    Updates an existing alignment after customer changes.
+
+    Instead of re-running the pipeline, only the aggregates of the units
+    named in the delta are updated (the graph is modified in place), and the
+    territories that left the balance bounds are repaired with local border
+    moves. The work grows with the number of changes and moves, and at most
+    ``max_moved_units`` units change territory.
+
+    Args:
+        graph: The territory graph of the previous run.
+        labels: The previous territory of every unit position.
+        delta: The customer changes since the previous run.
+        config: The balance settings and the move budget.
+
+    Returns:
+        The new alignment and a summary of the changes.
+    """
+    config = config or IncrementalAlignmentConfig()
+    labels = np.array(labels, dtype=np.int64)
+    if len(labels) != graph.num_units:
+        raise ValueError(f"Expected {graph.num_units} labels, got {len(labels)}.")
+    if config.max_moved_units < 0:
+        raise ValueError("max_moved_units must not be negative.")
+
+    affected = apply_customer_delta(graph, delta)
+    vertex_weights = getattr(graph, config.balance_metric.value)
+    num_parts = int(labels.max()) + 1
+    average = vertex_weights.sum() / num_parts
+    bounds = ((1 - config.balance_tolerance) * average, (1 + config.balance_tolerance) * average)
+
+    previous = labels.copy()
+    labels = _LocalBalancer(graph.adjacency, vertex_weights, labels, num_parts, bounds).run(config.max_moved_units)
+
+    part_weight = np.bincount(labels, weights=vertex_weights, minlength=num_parts)
+    deviation = float(np.abs(part_weight / average - 1).max()) if average > 0 else 0.0
+    moved = np.flatnonzero(labels != previous)
+    logger.info("Applied %d customer changes; %d units changed territory.", delta.num_changes, len(moved))
+    return IncrementalAlignmentResult(
+        labels=labels,
+        moved_units=moved,
+        affected_units=affected,
+        balanced=deviation <= config.balance_tolerance + 1e-9,
+        max_deviation=deviation,
+    )
@@ -0,0 +1,505 @@
+# -*- coding: utf-8 -*-
+"""
+This module evaluates territory alignments (see DDR_05).
+
+All metrics are computed in bulk from the arrays of a ``TerritoryGraph``:
+territory totals with one ``bincount`` per attribute, Polsby-Popper
+compactness from a dissolve done arithmetically (a territory's perimeter is
+the sum of its units' perimeters minus twice their internal shared borders),
+and contiguity from the connected components of the intra-territory edges.
+
+``PartitionEvaluator`` also keeps this state up to date for local search:
+``move_delta`` returns the change of every metric if one unit moved to
+another territory, and ``apply_move`` commits it. Both cost O(degree) for
+balance and compactness. Contiguity is tracked with a union-find over the
+territory pieces; a unit leaving a territory gets a fresh union-find slot,
+and only a move that actually splits a territory relabels the split piece.
+"""
+
+import time
+from collections import deque
+from dataclasses import dataclass
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+
+import networkx as nx
+import numpy as np
+import pandas as pd
+import scipy.sparse as sp
+import shapely
+from scipy.sparse.csgraph import connected_components
+
+from src.common.schemas import BalanceMetric
+from src.tap.graph_builder import TerritoryGraph
+
+AVAILABLE_METRICS = ("balance", "compactness", "contiguity")
+
+_BALANCE_ATTRIBUTES = ("total_sales_potential", "total_workload", "customers")
+
+# Bounded search that usually settles whether a territory stays connected
+# before falling back to an exact search of the whole piece.
+_MAX_LOCAL_VISITS = 64
+
+
+@dataclass
+class MoveDelta:
+    """
+    The change of the evaluation metrics if one unit moved.
+
+    Attributes:
+        unit: The position of the moved unit.
+        source: The territory the unit leaves.
+        target: The territory the unit joins.
+        squared_deviation: The change of the sum over territories of
+                           ``(weight / mean_weight - 1) ** 2``.
+        polsby_popper: The change of the sum of the territories' Polsby-Popper
+                       scores; divide by the number of territories for the mean.
+        pieces: The change of the total number of connected pieces; 0 means
+                contiguity is unaffected, positive values split a territory.
+        source_weight: The source territory's balance weight after the move.
+        target_weight: The target territory's balance weight after the move.
+    """
+    unit: int
+    source: int
+    target: int
+    squared_deviation: float
+    polsby_popper: float
+    pieces: int
+    source_weight: float
+    target_weight: float
+
+
+def _polsby_popper(area: np.ndarray, perimeter: np.ndarray) -> np.ndarray:
+    """Returns 4*pi*area / perimeter**2, or 0 where the perimeter vanishes."""
+    area, perimeter = np.asarray(area, dtype=np.float64), np.asarray(perimeter, dtype=np.float64)
+    scores = np.zeros(np.broadcast(area, perimeter).shape)
+    valid = perimeter > 0
+    np.divide(4 * np.pi * area, perimeter ** 2, out=scores, where=valid)
+    return scores
+
+
+class PartitionEvaluator:
+    """
+    Evaluates an alignment of a territory graph and tracks single-unit moves.
+
+    The evaluator owns a copy of the labels; use ``apply_move`` to change
+    them. Polsby-Popper scores are in the units of the geometry's coordinate
+    system, so project to an equal-area or local metric CRS for meaningful
+    values.
+    """
+
+    def __init__(
+        self,
+        graph: TerritoryGraph,
+        labels: np.ndarray,
+        num_partitions: Optional[int] = None,
+        balance_metric: BalanceMetric = BalanceMetric.WORKLOAD,
+        compactness: bool = True,
+    ):
+        """
+        Args:
+            graph: The territory graph.
+            labels: The territory (0..num_partitions-1) of every unit position.
+            num_partitions: The number of territories. Defaults to the
+                            largest label plus one.
+            balance_metric: The attribute tracked by ``move_delta``.
+            compactness: Whether to compute compactness, which needs the
+                         unit geometries and their shared border lengths.
+        """
+        labels = np.asarray(labels, dtype=np.int64)
+        if len(labels) != graph.num_units:
+            raise ValueError("labels must have one entry per unit.")
+        if len(labels) and labels.min() < 0:
+            raise ValueError("labels must be non-negative territory indices.")
+        num_parts = int(labels.max()) + 1 if len(labels) else 0
+        if num_partitions is not None:
+            if num_partitions < num_parts:
+                raise ValueError("num_partitions is smaller than the number of labelled territories.")
+            num_parts = num_partitions
+
+        self.graph = graph
+        self.num_partitions = num_parts
+        self.labels = labels.copy()
+        self.balance_metric = balance_metric
+        self.compactness = compactness
+
+        adjacency = graph.adjacency
+        self._indptr = adjacency.indptr
+        self._indices = adjacency.indices
+        self._indptr_list = adjacency.indptr.tolist()
+        self._indices_list = adjacency.indices.tolist()
+        self._labels_list = self.labels.tolist()
+
+        self._weights = getattr(graph, balance_metric.value).astype(np.float64)
+        self.part_weights = np.bincount(self.labels, weights=self._weights, minlength=num_parts)
+        self._mean_weight = self.part_weights.sum() / num_parts if num_parts else 0.0
+        self.part_sizes = np.bincount(self.labels, minlength=num_parts)
+
+        if compactness:
+            self._unit_area = shapely.area(graph.geometry)
+            self._unit_perimeter = shapely.length(graph.geometry)
+            self._border = graph.border_lengths()
+            rows = np.repeat(np.arange(graph.num_units), np.diff(self._indptr))
+            internal = self.labels[rows] == self.labels[self._indices]
+            self.part_area = np.bincount(self.labels, weights=self._unit_area, minlength=num_parts)
+            # Each internal border appears once from either side, so it is subtracted twice
+            self.part_perimeter = np.bincount(
+                self.labels, weights=self._unit_perimeter, minlength=num_parts
+            ) - np.bincount(self.labels[rows[internal]], weights=self._border[internal], minlength=num_parts)
+
+        self._init_pieces()
+
+    def _init_pieces(self) -> None:
+        """Labels the connected pieces of all territories and seeds the union-find."""
+        n = self.graph.num_units
+        rows = np.repeat(np.arange(n), np.diff(self._indptr))
+        internal = self.labels[rows] == self.labels[self._indices]
+        induced = sp.csr_matrix(
+            (np.ones(internal.sum()), (rows[internal], self._indices[internal])), shape=(n, n)
+        )
+        _, piece = connected_components(induced, directed=False)
+        # Slot i of the union-find starts as unit i; the first unit of every piece is its root
+        _, first = np.unique(piece, return_index=True)
+        self._parent = first[piece].tolist()
+        self._slot = list(range(n))
+        self.part_pieces = np.zeros(self.num_partitions, dtype=np.int64)
+        np.add.at(self.part_pieces, self.labels[first], 1)
+
+    def _find(self, slot: int) -> int:
+        parent = self._parent
+        while parent[slot] != slot:
+            parent[slot] = parent[parent[slot]]
+            slot = parent[slot]
+        return slot
+
+    def _new_slot(self) -> int:
+        self._parent.append(len(self._parent))
+        return len(self._parent) - 1
+
+    def _neighbours_in(self, unit: int, part: int) -> List[int]:
+        labels = self._labels_list
+        return [u for u in self._indices_list[self._indptr_list[unit]:self._indptr_list[unit + 1]]
+                if labels[u] == part]
+
+    def _reaches(self, neighbours: List[int], excluded: int, part: int) -> bool:
+        """Checks with a bounded search that the neighbours connect without passing excluded."""
+        indptr, indices, labels = self._indptr_list, self._indices_list, self._labels_list
+        targets = set(neighbours[1:])
+        seen = {excluded, neighbours[0]}
+        queue = deque([neighbours[0]])
+        visits = 0
+        while queue and targets and visits < _MAX_LOCAL_VISITS:
+            x = queue.popleft()
+            visits += 1
+            for y in indices[indptr[x]:indptr[x + 1]]:
+                if y not in seen and labels[y] == part:
+                    seen.add(y)
+                    targets.discard(y)
+                    queue.append(y)
+        return not targets
+
+    def _explore(self, start: int, excluded: int, part: int) -> set:
+        """Collects the units of a territory reachable from start without passing excluded."""
+        indptr, indices, labels = self._indptr_list, self._indices_list, self._labels_list
+        seen = {excluded, start}
+        queue = deque([start])
+        while queue:
+            x = queue.popleft()
+            for y in indices[indptr[x]:indptr[x + 1]]:
+                if y not in seen and labels[y] == part:
+                    seen.add(y)
+                    queue.append(y)
+        seen.discard(excluded)
+        return seen
+
+    def _split_groups(self, unit: int) -> List[set]:
+        """
+        Returns the pieces that the unit's territory neighbours fall into once it leaves.
+
+        A bounded search settles the common case of a non-cut unit; only
+        cut units pay for exact searches of the pieces they separate.
+        """
+        part = self._labels_list[unit]
+        neighbours = self._neighbours_in(unit, part)
+        if len(neighbours) <= 1:
+            return [set(neighbours)] if neighbours else []
+        if self._reaches(neighbours, unit, part):
+            return [set(neighbours)]
+
+        groups = []
+        remaining = set(neighbours)
+        while remaining:
+            group = self._explore(remaining.pop(), unit, part)
+            remaining -= group
+            groups.append(group)
+        return groups
+
+    def _squared_deviation(self, weight: float) -> float:
+        if self._mean_weight == 0:
+            return 0.0
+        return (weight / self._mean_weight - 1) ** 2
+
+    def move_delta(self, unit: int, target: int) -> MoveDelta:
+        """
+        Returns the metric changes of moving a unit to another territory.
+
+        Balance and compactness cost O(degree). Contiguity costs a bounded
+        local search, plus an exact search of the territory piece only if
+        the unit turns out to be a cut vertex.
+        """
+        return self._move_delta(unit, target)[0]
+
+    def _move_delta(self, unit: int, target: int) -> Tuple[MoveDelta, List[set], set]:
+        """Returns the move's delta, the pieces its source splits into and the target pieces it joins."""
+        source = self._labels_list[unit]
+        if not 0 <= target < self.num_partitions:
+            raise ValueError(f"Territory {target} does not exist.")
+        if target == source:
+            raise ValueError(f"Unit {unit} is already in territory {target}.")
+
+        weight = float(self._weights[unit])
+        source_before, target_before = float(self.part_weights[source]), float(self.part_weights[target])
+        source_after, target_after = source_before - weight, target_before + weight
+        squared_deviation = (
+            self._squared_deviation(source_after) + self._squared_deviation(target_after)
+            - self._squared_deviation(source_before) - self._squared_deviation(target_before)
+        )
+
+        polsby_popper = float("nan")
+        if self.compactness:
+            start, end = self._indptr[unit], self._indptr[unit + 1]
+            neighbour_labels = self.labels[self._indices[start:end]]
+            border = self._border[start:end]
+            area, perimeter = self._unit_area[unit], self._unit_perimeter[unit]
+            source_area, source_perimeter = self.part_area[source], self.part_perimeter[source]
+            target_area, target_perimeter = self.part_area[target], self.part_perimeter[target]
+            scores = _polsby_popper(
+                [source_area, target_area, source_area - area, target_area + area],
+                [
+                    source_perimeter,
+                    target_perimeter,
+                    source_perimeter - perimeter + 2 * border[neighbour_labels == source].sum(),
+                    target_perimeter + perimeter - 2 * border[neighbour_labels == target].sum(),
+                ],
+            )
+            if self.part_sizes[source] == 1:
+                scores[2] = 0.0
+            polsby_popper = float(scores[2] + scores[3] - scores[0] - scores[1])
+
+        groups = self._split_groups(unit)
+        # Leaving: the unit's piece becomes len(groups) pieces (none if it was alone)
+        pieces = len(groups) - 1
+        # Joining: the unit merges the distinct target pieces it touches, or forms a new one
+        touched = {self._find(self._slot[u]) for u in self._neighbours_in(unit, target)}
+        pieces += 1 - len(touched)
+
+        delta = MoveDelta(
+            unit=unit,
+            source=source,
+            target=target,
+            squared_deviation=squared_deviation,
+            polsby_popper=polsby_popper,
+            pieces=pieces,
+            source_weight=source_after,
+            target_weight=target_after,
+        )
+        return delta, groups, touched
+
+    def apply_move(self, unit: int, target: int) -> MoveDelta:
+        """
+        Moves a unit to another territory and updates all metrics.
+
+        Returns:
+            The change of the metrics, as ``move_delta`` would have reported it.
+        """
+        delta, groups, touched = self._move_delta(unit, target)
+        source = delta.source
+        if len(groups) > 1:
+            # The union-find cannot split sets, so the separated pieces get fresh roots
+            for group in groups:
+                root = self._new_slot()
+                for u in group:
+                    self._slot[u] = root
+
+        slot = self._new_slot()
+        self._slot[unit] = slot
+        for root in touched:
+            self._parent[root] = slot
+
+        self.part_pieces[source] += len(groups) - 1
+        self.part_pieces[target] += 1 - len(touched)
+        if self.compactness:
+            start, end = self._indptr[unit], self._indptr[unit + 1]
+            neighbour_labels = self.labels[self._indices[start:end]]
+            border = self._border[start:end]
+            self.part_area[source] -= self._unit_area[unit]
+            self.part_area[target] += self._unit_area[unit]
+            self.part_perimeter[source] += 2 * border[neighbour_labels == source].sum() - self._unit_perimeter[unit]
+            self.part_perimeter[target] += self._unit_perimeter[unit] - 2 * border[neighbour_labels == target].sum()
+            if self.part_sizes[source] == 1:
+                self.part_area[source] = self.part_perimeter[source] = 0.0
+
+        self.part_weights[source] = delta.source_weight
+        self.part_weights[target] = delta.target_weight
+        self.part_sizes[source] -= 1
+        self.part_sizes[target] += 1
+        self.labels[unit] = target
+        self._labels_list[unit] = target
+        return delta
+
+    @property
+    def polsby_popper(self) -> np.ndarray:
+        """The Polsby-Popper score of every territory."""
+        if not self.compactness:
+            raise ValueError("The evaluator was created without compactness.")
+        return _polsby_popper(self.part_area, self.part_perimeter)
+
+    def enclaves(self) -> np.ndarray:
+        """
+        Returns the units whose neighbours all belong to one other territory.
+
+        Returns:
+            An (m, 2) array of unit positions and the territory surrounding them.
+        """
+        degree = np.diff(self._indptr)
+        has_neighbours = degree > 0
+        neighbour_labels = self.labels[self._indices]
+        starts = self._indptr[:-1][has_neighbours]
+        lowest = np.minimum.reduceat(neighbour_labels, starts) if len(starts) else np.array([], dtype=np.int64)
+        highest = np.maximum.reduceat(neighbour_labels, starts) if len(starts) else np.array([], dtype=np.int64)
+        units = np.flatnonzero(has_neighbours)
+        enclosed = (lowest == highest) & (lowest != self.labels[units])
+        return np.column_stack([units[enclosed], lowest[enclosed]])
+
+    def report(
+        self, metrics_to_include: Optional[List[str]] = None, part_names: Optional[Sequence] = None
+    ) -> Dict[str, Any]:
+        """
+        Builds the DDR_05 evaluation report from the current state.
+
+        Args:
+            metrics_to_include: A subset of ``AVAILABLE_METRICS``; None includes all.
+            part_names: The name of every territory in the report. Defaults
+                        to the territory indices.
+
+        Returns:
+            The evaluation report.
+        """
+        start_time = time.perf_counter()
+        metrics = _validate_metrics(metrics_to_include)
+        names = list(range(self.num_partitions)) if part_names is None else list(part_names)
+        if len(names) != self.num_partitions:
+            raise ValueError("part_names must have one entry per territory.")
+
+        report: Dict[str, Any] = {}
+        summary: Dict[str, Any] = {"num_partitions": self.num_partitions, "total_nodes": self.graph.num_units}
+
+        if "balance" in metrics:
+            balance = {}
+            for attribute in _BALANCE_ATTRIBUTES:
+                totals = np.bincount(
+                    self.labels, weights=getattr(self.graph, attribute), minlength=self.num_partitions
+                )
+                mean = totals.mean() if len(totals) else 0.0
+                balance[attribute] = {
+                    "min": float(totals.min()) if len(totals) else 0.0,
+                    "max": float(totals.max()) if len(totals) else 0.0,
+                    "mean": float(mean),
+                    "std_dev": float(totals.std()) if len(totals) else 0.0,
+                    "imbalance_ratio": float(totals.max() / mean) if mean > 0 else float("nan"),
+                }
+            report["balance_metrics"] = balance
+
+        if "compactness" in metrics:
+            if not self.compactness:
+                raise ValueError("The evaluator was created without compactness.")
+            scores = self.polsby_popper
+            report["compactness_metrics"] = {
+                "polsby_popper": {
+                    "mean": float(scores.mean()) if len(scores) else float("nan"),
+                    "values_per_partition": {name: float(score) for name, score in zip(names, scores)},
+                }
+            }
+
+        if "contiguity" in metrics:
+            disconnected = np.flatnonzero(self.part_pieces > 1)
+            enclaves = self.enclaves()
+            report["contiguity_metrics"] = {
+                "disconnected_partitions": {
+                    names[part]: {"num_subgraphs": int(self.part_pieces[part])} for part in disconnected
+                },
+                "enclaves": [
+                    {
+                        "node_id": _to_python(self.graph.unit_ids[unit]),
+                        "original_partition": names[self.labels[unit]],
+                        "surrounded_by": names[surrounding],
+                    }
+                    for unit, surrounding in enclaves
+                ],
+            }
+            summary["enclaves_detected"] = len(enclaves)
+            summary["disconnected_partitions"] = [names[part] for part in disconnected]
+
+        summary["evaluation_duration_seconds"] = time.perf_counter() - start_time
+        return {"summary": summary, **report}
+
+
+def _validate_metrics(metrics_to_include: Optional[List[str]]) -> List[str]:
+    if metrics_to_include is None:
+        return list(AVAILABLE_METRICS)
+    unknown = [name for name in metrics_to_include if name not in AVAILABLE_METRICS]
+    if unknown:
+        raise ValueError(f"Unknown metrics: {unknown}. Available metrics: {list(AVAILABLE_METRICS)}")
+    return list(metrics_to_include)
+
+
+def _to_python(value: Any) -> Any:
+    """Converts NumPy scalars to Python scalars so that the report serializes to JSON."""
+    return value.item() if isinstance(value, np.generic) else value
+
+
+def evaluate_partitions(graph: nx.Graph, metrics_to_include: Optional[List[str]] = None) -> Dict[str, Any]:
+    """
+    Evaluates a partitioned networkx graph.
+
+    The graph is converted to arrays once and evaluated in bulk; see
+    ``PartitionEvaluator`` to evaluate a ``TerritoryGraph`` directly or to
+    score candidate moves.
+
+    Args:
+        graph: The partitioned graph. Every node needs ``partition_id`` and
+               the balance attributes; compactness also needs ``geometry``.
+        metrics_to_include: A subset of ``AVAILABLE_METRICS``; None includes all.
+
+    Returns:
+        The evaluation report described in DDR_05, keyed by the original
+        partition ids.
+    """
+    start_time = time.perf_counter()
+    metrics = _validate_metrics(metrics_to_include)
+    nodes = list(graph.nodes)
+    data = pd.DataFrame.from_records([graph.nodes[node] for node in nodes])
+    if "partition_id" not in data.columns or data["partition_id"].isna().any():
+        raise ValueError("Every node needs a 'partition_id' attribute.")
+    if "compactness" in metrics and ("geometry" not in data.columns or data["geometry"].isna().any()):
+        raise ValueError("Every node needs a 'geometry' attribute to evaluate compactness.")
+
+    labels, part_names = pd.factorize(data["partition_id"], sort=True)
+    coo = sp.coo_matrix(nx.to_scipy_sparse_array(graph, nodelist=nodes, weight=None))
+    off_diagonal = coo.row != coo.col
+    territory_graph = TerritoryGraph(
+        unit_ids=np.array(nodes, dtype=object),
+        geometry=np.asarray(data["geometry"]) if "geometry" in data.columns else np.array([None] * len(nodes)),
+        adjacency=sp.csr_matrix(
+            (coo.data[off_diagonal], (coo.row[off_diagonal], coo.col[off_diagonal])), shape=coo.shape
+        ),
+        **{
+            attribute: data[attribute].fillna(0).to_numpy(dtype=np.float64)
+            if attribute in data.columns else np.zeros(len(nodes))
+            for attribute in _BALANCE_ATTRIBUTES
+        },
+    )
+
+    evaluator = PartitionEvaluator(territory_graph, labels, compactness="compactness" in metrics)
+    report = evaluator.report(metrics, part_names=[_to_python(name) for name in part_names])
+    report["summary"]["evaluation_duration_seconds"] = time.perf_counter() - start_time
+    return report
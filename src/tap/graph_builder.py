@@ -0,0 +1,480 @@
+# -*- coding: utf-8 -*-
+"""
+This module builds the territory graph used by the alignment algorithms.
+
+Base units become nodes and adjacent units are connected by weighted edges
+(see DDR_03). For 100k+ units, a networkx graph built one row at a time is
+dominated by Python dict overhead, so the graph is held in arrays instead:
+a symmetric ``scipy.sparse`` CSR adjacency matrix plus per-unit NumPy
+columns of customer aggregates. Conversion to networkx is available for
+algorithms and tools that need it.
+"""
+
+import logging
+from dataclasses import dataclass
+from functools import cached_property
+from typing import Optional, Tuple
+
+import geopandas as gpd
+import networkx as nx
+import numpy as np
+import pandas as pd
+import scipy.sparse as sp
+import shapely
+from scipy.sparse.csgraph import connected_components
+
+from src.common.cache import ResultCache, get_cache_key, hash_array
+from src.common.instrumentation import annotate, span, traced
+from src.common.schemas import ContiguityMethod, GraphBuilderConfig, WeightingMethod
+
+logger = logging.getLogger(__name__)
+
+_UNIT_COLUMNS = ("unit_id", "geometry")
+_CUSTOMER_COLUMNS = ("unit_id", "sales_potential", "workload")
+
+
+@dataclass
+class TerritoryGraph:
+    """
+    An array-backed territory graph.
+
+    Units are addressed by their position ``0..num_units-1``; ``unit_ids``
+    maps positions back to the original ``unit_id`` values.
+
+    Attributes:
+        unit_ids: The unit_id of every position.
+        geometry: The unit polygons, as a shapely geometry array.
+        adjacency: The symmetric CSR adjacency matrix; its data are the edge weights.
+        customers: The number of customers per unit.
+        total_sales_potential: The summed sales potential per unit.
+        total_workload: The summed workload per unit.
+    """
+    unit_ids: np.ndarray
+    geometry: np.ndarray
+    adjacency: sp.csr_matrix
+    customers: np.ndarray
+    total_sales_potential: np.ndarray
+    total_workload: np.ndarray
+
+    @property
+    def num_units(self) -> int:
+        return len(self.unit_ids)
+
+    @property
+    def num_edges(self) -> int:
+        return self.adjacency.nnz // 2
+
+    @cached_property
+    def _unit_index(self) -> pd.Index:
+        return pd.Index(self.unit_ids)
+
+    def positions(self, unit_ids: np.ndarray) -> np.ndarray:
+        """Maps unit_id values to positions; unknown ids map to -1."""
+        return self._unit_index.get_indexer(np.asarray(unit_ids))
+
+    def neighbors(self, position: int) -> np.ndarray:
+        """Returns the positions adjacent to a unit position."""
+        start, end = self.adjacency.indptr[position], self.adjacency.indptr[position + 1]
+        return self.adjacency.indices[start:end]
+
+    def edges(self) -> np.ndarray:
+        """Returns each undirected edge once, as an (m, 2) array of positions with u < v."""
+        coo = sp.triu(self.adjacency, k=1).tocoo()
+        return np.column_stack([coo.row, coo.col])
+
+    def border_lengths(self) -> np.ndarray:
+        """
+        Returns the length of the common border of every adjacency entry, in CSR slot order.
+
+        The lengths do not depend on the weighting method the graph was built
+        with; neighbours that only touch at a point have length 0.
+        """
+        n = self.num_units
+        rows = np.repeat(np.arange(n, dtype=np.int64), np.diff(self.adjacency.indptr))
+        cols = self.adjacency.indices.astype(np.int64)
+        pairs, slot_pair = np.unique(np.minimum(rows, cols) * n + np.maximum(rows, cols), return_inverse=True)
+        lengths = _shared_border_lengths(self.geometry, pairs // n, pairs % n, _match_segments(self.geometry))
+        return lengths[slot_pair]
+
+    def num_components(self) -> int:
+        """Returns the number of connected components."""
+        return connected_components(self.adjacency, directed=False)[0]
+
+    def to_networkx(self) -> nx.Graph:
+        """
+        Converts the graph to the networkx form described in DDR_03.
+
+        Nodes are keyed by unit_id and carry ``geometry``, ``customers``,
+        ``total_sales_potential`` and ``total_workload``; edges carry ``weight``.
+        """
+        graph = nx.Graph()
+        graph.add_nodes_from(
+            (unit_id, {
+                "geometry": geometry,
+                "customers": customers,
+                "total_sales_potential": sales,
+                "total_workload": workload,
+            })
+            for unit_id, geometry, customers, sales, workload in zip(
+                self.unit_ids.tolist(),
+                self.geometry,
+                self.customers.tolist(),
+                self.total_sales_potential.tolist(),
+                self.total_workload.tolist(),
+            )
+        )
+        upper = sp.triu(self.adjacency, k=1).tocoo()
+        graph.add_edges_from(
+            (u, v, {"weight": w})
+            for u, v, w in zip(
+                self.unit_ids[upper.row].tolist(),
+                self.unit_ids[upper.col].tolist(),
+                upper.data.tolist(),
+            )
+        )
+        return graph
+
+
+@dataclass
+class CustomerDelta:
+    """
+    Customer changes between two alignment runs.
+
+    Both frames have ``unit_id``, ``sales_potential`` and ``workload``
+    columns. A re-weighted or relocated customer appears in ``removed`` with
+    its previous values and in ``added`` with its current ones.
+
+    Attributes:
+        added: The customers to add to the unit aggregates.
+        removed: The customers to subtract, with the values they were added with.
+    """
+    added: Optional[pd.DataFrame] = None
+    removed: Optional[pd.DataFrame] = None
+
+    @property
+    def num_changes(self) -> int:
+        return sum(len(frame) for frame in (self.added, self.removed) if frame is not None)
+
+    @classmethod
+    def from_snapshots(
+        cls, previous: pd.DataFrame, current: pd.DataFrame, key: str = "customer_id"
+    ) -> "CustomerDelta":
+        """
+        Derives the delta between two customer tables.
+
+        Args:
+            previous: The customers of the last run.
+            current: The customers now, with the same ``key`` for unchanged customers.
+            key: The column identifying a customer.
+        """
+        columns = list(_CUSTOMER_COLUMNS)
+        before = previous.set_index(key)[columns]
+        after = current.set_index(key)[columns]
+        common = before.index.intersection(after.index)
+        changed = common[(before.loc[common] != after.loc[common]).any(axis=1).to_numpy()]
+        return cls(
+            added=after.loc[after.index.difference(before.index).union(changed)].reset_index(),
+            removed=before.loc[before.index.difference(after.index).union(changed)].reset_index(),
+        )
+
+
+def apply_customer_delta(graph: TerritoryGraph, delta: CustomerDelta) -> np.ndarray:
+    """
+    Updates the customer aggregates of the affected units in place.
+
+    Only the rows of the delta are touched, so the cost is proportional to
+    the number of changed customers. Customers of unknown units are
+    reported and ignored.
+
+    Returns:
+        The positions of the units whose aggregates changed.
+    """
+    affected = []
+    for frame, sign in ((delta.added, 1), (delta.removed, -1)):
+        if frame is None or frame.empty:
+            continue
+        missing = [name for name in _CUSTOMER_COLUMNS if name not in frame.columns]
+        if missing:
+            raise ValueError(f"The customer delta is missing required columns: {missing}")
+
+        positions = graph.positions(frame["unit_id"].to_numpy())
+        known = positions >= 0
+        if not known.all():
+            logger.warning("%d changed customers reference unknown unit_ids and are ignored.", int((~known).sum()))
+        positions = positions[known]
+        sales = np.nan_to_num(frame["sales_potential"].to_numpy(dtype=np.float64)[known])
+        workload = np.nan_to_num(frame["workload"].to_numpy(dtype=np.float64)[known])
+        np.add.at(graph.customers, positions, sign)
+        np.add.at(graph.total_sales_potential, positions, sign * sales)
+        np.add.at(graph.total_workload, positions, sign * workload)
+        affected.append(positions)
+    return np.unique(np.concatenate(affected)) if affected else np.array([], dtype=np.int64)
+
+
+def _validate_inputs(base_units_gdf: gpd.GeoDataFrame, customers_gdf: gpd.GeoDataFrame) -> None:
+    missing = [name for name in _UNIT_COLUMNS if name not in base_units_gdf.columns]
+    if missing:
+        raise ValueError(f"base_units_gdf is missing required columns: {missing}")
+    missing = [name for name in _CUSTOMER_COLUMNS if name not in customers_gdf.columns]
+    if missing:
+        raise ValueError(f"customers_gdf is missing required columns: {missing}")
+    if base_units_gdf["unit_id"].duplicated().any():
+        raise ValueError("base_units_gdf contains duplicate unit_id values.")
+
+
+def _aggregate_customers(
+    customers_gdf: gpd.GeoDataFrame, unit_ids: np.ndarray
+) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+    """
+    Sums customers, sales potential and workload per unit with one bincount pass each.
+
+    Customers whose unit_id is not a known unit are reported and dropped.
+    """
+    positions = pd.Index(unit_ids).get_indexer(customers_gdf["unit_id"].to_numpy())
+    unmatched = positions < 0
+    if unmatched.any():
+        logger.warning("%d customers reference unknown unit_ids and are ignored.", int(unmatched.sum()))
+        positions = positions[~unmatched]
+
+    n = len(unit_ids)
+    sales = customers_gdf["sales_potential"].to_numpy(dtype=np.float64)[~unmatched]
+    workload = customers_gdf["workload"].to_numpy(dtype=np.float64)[~unmatched]
+    customers = np.bincount(positions, minlength=n).astype(np.int64)
+    total_sales = np.bincount(positions, weights=np.nan_to_num(sales), minlength=n)
+    total_workload = np.bincount(positions, weights=np.nan_to_num(workload), minlength=n)
+    return customers, total_sales, total_workload
+
+
+@dataclass
+class _SegmentMatches:
+    """
+    The boundary segments that two units have in common.
+
+    Attributes:
+        pairs: The unit pair of every matched segment, encoded as
+               ``left * num_units + right`` with left < right.
+        lengths: The length of every matched segment.
+        unmatched_length: Per unit, the total length of its boundary
+                          segments that no other unit has.
+    """
+    pairs: np.ndarray
+    lengths: np.ndarray
+    unmatched_length: np.ndarray
+
+
+def _match_segments(geometry: np.ndarray) -> _SegmentMatches:
+    """
+    Matches identical boundary segments between units.
+
+    Units of a tessellation (Voronoi cells, OSM boundaries built from shared
+    ways) have bit-identical vertices along common borders, so matching
+    normalized ring segments finds most rook neighbours and their shared
+    border lengths with a single sort instead of one polygon intersection
+    per pair.
+    """
+    n = len(geometry)
+    parts, part_unit = shapely.get_parts(geometry, return_index=True)
+    rings, ring_part = shapely.get_rings(parts, return_index=True)
+    coords, coord_ring = shapely.get_coordinates(rings, return_index=True)
+
+    # Consecutive vertices of the same ring form a segment; orient each segment canonically
+    same_ring = coord_ring[:-1] == coord_ring[1:]
+    start, end = coords[:-1][same_ring], coords[1:][same_ring]
+    unit = part_unit[ring_part[coord_ring[:-1][same_ring]]]
+    swap = (start[:, 0] > end[:, 0]) | ((start[:, 0] == end[:, 0]) & (start[:, 1] > end[:, 1]))
+    start[swap], end[swap] = end[swap], start[swap].copy()
+    segments = np.column_stack([start, end])
+
+    order = np.lexsort(segments.T[::-1])
+    segments, unit = segments[order], unit[order]
+    length = np.hypot(segments[:, 2] - segments[:, 0], segments[:, 3] - segments[:, 1])
+    same_segment = np.all(segments[1:] == segments[:-1], axis=1) & (unit[1:] != unit[:-1])
+
+    matched = np.zeros(len(segments), dtype=bool)
+    matched[1:] |= same_segment
+    matched[:-1] |= same_segment
+    left = np.minimum(unit[1:], unit[:-1])[same_segment]
+    right = np.maximum(unit[1:], unit[:-1])[same_segment]
+    return _SegmentMatches(
+        pairs=left.astype(np.int64) * n + right,
+        lengths=length[1:][same_segment],
+        unmatched_length=np.bincount(unit[~matched], weights=length[~matched], minlength=n),
+    )
+
+
+def _contiguity_pairs(
+    geometry: np.ndarray, method: ContiguityMethod, matches: Optional[_SegmentMatches] = None
+) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    Finds all adjacent unit pairs with a single bulk STRtree query.
+
+    Args:
+        geometry: The unit polygons.
+        method: The contiguity definition.
+        matches: The shared segments of the units; computed if needed and not given.
+
+    Returns:
+        Two arrays of positions (left < right), one entry per adjacent pair.
+    """
+    tree = shapely.STRtree(geometry)
+    left, right = tree.query(geometry, predicate="intersects")
+    keep = left < right
+    left, right = left[keep], right[keep]
+
+    if method == ContiguityMethod.ROOK:
+        # Rook neighbours share more than isolated points. Pairs with an identical
+        # boundary segment qualify directly; only the rest need an exact intersection.
+        matches = matches if matches is not None else _match_segments(geometry)
+        confirmed = np.isin(left.astype(np.int64) * len(geometry) + right, matches.pairs)
+        unresolved = np.flatnonzero(~confirmed)
+        shared = shapely.intersection(geometry[left[unresolved]], geometry[right[unresolved]])
+        confirmed[unresolved] = shapely.get_dimensions(shared) >= 1
+        left, right = left[confirmed], right[confirmed]
+    elif method != ContiguityMethod.QUEEN:
+        raise ValueError(f"Unsupported contiguity method: {method}")
+    return left, right
+
+
+def _shared_border_lengths(
+    geometry: np.ndarray, left: np.ndarray, right: np.ndarray, matches: _SegmentMatches
+) -> np.ndarray:
+    """
+    Computes the length of the common border of every adjacent pair.
+
+    Matched segment lengths are summed per pair with one bincount. A border
+    that is not made of identical segments (e.g. a T-junction, where one unit
+    has an extra vertex) leaves unmatched segments on both sides, so only
+    pairs of units that both have unmatched boundary need an exact, batched
+    boundary intersection.
+    """
+    n = len(geometry)
+    codes = left.astype(np.int64) * n + right
+    order = np.argsort(codes)
+    slot = np.searchsorted(codes, matches.pairs, sorter=order)
+    found = slot < len(codes)
+    found[found] = codes[order[slot[found]]] == matches.pairs[found]
+    lengths = np.bincount(order[slot[found]], weights=matches.lengths[found], minlength=len(codes))
+
+    partial = (matches.unmatched_length[left] > 0) & (matches.unmatched_length[right] > 0)
+    if partial.any():
+        boundary = shapely.boundary(geometry)
+        shared = shapely.intersection(boundary[left[partial]], boundary[right[partial]])
+        lengths[partial] = shapely.length(shared)
+    return lengths
+
+
+def _centroid_distances(geometry: np.ndarray, left: np.ndarray, right: np.ndarray) -> np.ndarray:
+    """Computes the distance between the centroids of every adjacent pair."""
+    centroids = shapely.get_coordinates(shapely.centroid(geometry))
+    delta = centroids[left] - centroids[right]
+    return np.hypot(delta[:, 0], delta[:, 1])
+
+
+def _edge_weights(
+    geometry: np.ndarray,
+    left: np.ndarray,
+    right: np.ndarray,
+    method: WeightingMethod,
+    matches: Optional[_SegmentMatches] = None,
+) -> np.ndarray:
+    """
+    Computes the weight of every adjacent pair.
+
+    Lengths and distances are in the units of the layer's coordinate system;
+    project the base units to a metric CRS first for metres.
+    """
+    if method == WeightingMethod.UNIFORM:
+        return np.ones(len(left), dtype=np.float64)
+    if method == WeightingMethod.SHARED_BORDER_LENGTH:
+        matches = matches if matches is not None else _match_segments(geometry)
+        return _shared_border_lengths(geometry, left, right, matches)
+    if method == WeightingMethod.DISTANCE:
+        return _centroid_distances(geometry, left, right)
+    raise ValueError(f"Unsupported weighting method: {method}")
+
+
+def _adjacency_cache_key(geometry: np.ndarray, config: GraphBuilderConfig) -> str:
+    """Keys the adjacency by the unit geometries, in order, and the graph configuration."""
+    wkb = np.frombuffer(b"".join(shapely.to_wkb(geometry).tolist()), dtype=np.uint8)
+    return get_cache_key({
+        "function": "build_graph",
+        "geometry": hash_array(wkb),
+        "contiguity_method": config.contiguity_method.value,
+        "weighting_method": config.weighting_method.value,
+    })
+
+
+def _build_adjacency(geometry: np.ndarray, config: GraphBuilderConfig) -> sp.csr_matrix:
+    """Builds the symmetric, weighted CSR adjacency matrix of the units."""
+    needs_matches = (
+        config.contiguity_method == ContiguityMethod.ROOK
+        or config.weighting_method == WeightingMethod.SHARED_BORDER_LENGTH
+    )
+    matches = _match_segments(geometry) if needs_matches else None
+
+    left, right = _contiguity_pairs(geometry, config.contiguity_method, matches)
+    weights = _edge_weights(geometry, left, right, config.weighting_method, matches)
+    n = len(geometry)
+    return sp.csr_matrix(
+        (np.concatenate([weights, weights]), (np.concatenate([left, right]), np.concatenate([right, left]))),
+        shape=(n, n),
+    )
+
+
+@traced("build_graph")
+def build_graph(
+    base_units_gdf: gpd.GeoDataFrame,
+    customers_gdf: gpd.GeoDataFrame,
+    config: Optional[GraphBuilderConfig] = None,
+    cache: Optional[ResultCache] = None,
+) -> TerritoryGraph:
+    """
+    Builds the territory graph from base units and their customers.
+
+    Args:
+        base_units_gdf: The base units, with ``unit_id`` and ``geometry``.
+        customers_gdf: The customers, as returned by ``_assign_units_to_points``,
+                       with ``unit_id``, ``sales_potential`` and ``workload``.
+        config: The contiguity and weighting configuration. Defaults to
+                queen contiguity with uniform weights.
+        cache: An optional result cache. The weighted adjacency is keyed by
+               a hash of the unit geometries and the configuration, so
+               repeated builds over the same units skip the geometric work;
+               customer aggregates are always recomputed.
+
+    Returns:
+        The array-backed territory graph. Use ``to_networkx`` for an
+        ``nx.Graph``.
+    """
+    config = config or GraphBuilderConfig()
+    _validate_inputs(base_units_gdf, customers_gdf)
+
+    unit_ids = base_units_gdf["unit_id"].to_numpy()
+    geometry = np.asarray(base_units_gdf.geometry.values)
+    with span("aggregate_customers", rows=len(customers_gdf)):
+        customers, total_sales, total_workload = _aggregate_customers(customers_gdf, unit_ids)
+
+    adjacency = None
+    if cache is not None:
+        cache_key = _adjacency_cache_key(geometry, config)
+        adjacency = cache.get(cache_key)
+    if adjacency is None:
+        with span("build_adjacency", method=config.contiguity_method.value):
+            adjacency = _build_adjacency(geometry, config)
+        if cache is not None:
+            cache.put(cache_key, adjacency)
+
+    n = len(unit_ids)
+
+    graph = TerritoryGraph(
+        unit_ids=unit_ids,
+        geometry=geometry,
+        adjacency=adjacency,
+        customers=customers,
+        total_sales_potential=total_sales,
+        total_workload=total_workload,
+    )
+    annotate(num_units=n, num_edges=int(adjacency.nnz // 2))
+    if n and graph.num_components() > 1:
+        logger.warning("The territory graph is not connected (%d components).", graph.num_components())
+    return graph
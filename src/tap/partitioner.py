@@ -0,0 +1,37 @@
+# -*- coding: utf-8 -*-
+"""
+This module defines the common interface of all territory partitioning
+algorithms (see DDR_04).
+"""
+
+from abc import ABC, abstractmethod
+
+import networkx as nx
+
+from src.common.schemas import PartitionerConfig
+
+
+class TerritoryPartitioner(ABC):
+    """
+    Abstract base class of all territory partitioning algorithms.
+    """
+
+    @abstractmethod
+    def partition(self, graph: nx.Graph, config: PartitionerConfig) -> nx.Graph:
+        """
+        Partitions the input graph.
+
+        Important:
+        1. The graph is modified in place: every node gets a 'partition_id'
+           attribute, and the same graph object is returned.
+        2. Implementations may guarantee that every partition is contiguous.
+           Callers should not assume this for all algorithms and should let
+           the evaluation layer check it.
+
+        Args:
+            graph: A weighted NetworkX graph, as built by the graph builder.
+            config: The partitioning parameters.
+
+        Returns:
+            The same graph, with a 'partition_id' attribute on every node.
+        """
@@ -0,0 +1,267 @@
+# -*- coding: utf-8 -*-
+"""
+This module computes road-network travel times between base units.
+
+Unit centroids are snapped to their nearest road node in one KD-tree query,
+and shortest paths are run from all snapped nodes at once with
+``scipy.sparse.csgraph.dijkstra`` on a CSR copy of the network. Units that
+snap to the same node share one search. Searches run in batches that bound
+the memory of the dense per-batch result, optionally across a process pool,
+and can be truncated at a maximum travel time, which makes them local and
+typically orders of magnitude cheaper than full searches. For a sparse
+result, each batch is reduced to its reachable pairs as soon as it is
+computed, so the full matrix is never held in dense form.
+"""
+
+import os
+from concurrent.futures import ProcessPoolExecutor
+from dataclasses import dataclass
+from typing import Optional, Tuple, Union
+
+import geopandas as gpd
+import networkx as nx
+import numpy as np
+import osmnx as ox
+import scipy.sparse as sp
+import shapely
+from scipy.sparse.csgraph import dijkstra
+from scipy.spatial import cKDTree
+
+from src.common.cache import ResultCache, get_cache_key, hash_array
+from src.common.road_graph_io import RoadGraphCSR
+
+# Speed assumed for edges without a travel_time or speed_kph attribute.
+DEFAULT_SPEED_KPH = 40.0
+
+_EARTH_RADIUS_M = 6_371_008.8
+
+# Upper bound on the cells of one dense Dijkstra result (sources x network nodes).
+_MAX_BATCH_CELLS = 16_000_000
+
+# Below this amount of work (sources x network nodes), spinning up a process
+# pool costs more than it saves, so the searches run in the calling process.
+_MIN_PARALLEL_WORK = 50_000_000
+
+
+@dataclass
+class TravelTimeMatrix:
+    """
+    Travel times in seconds between base units.
+
+    Row ``i`` holds the times from ``unit_ids[i]`` to every unit. In the
+    dense form, pairs that are unreachable or beyond ``max_travel_time`` are
+    ``inf``. In the sparse form they are missing; pairs that are reachable
+    in zero time (e.g. units snapped to the same road node) are stored as
+    explicit zeros.
+
+    Attributes:
+        unit_ids: The unit_id of every row and column.
+        times: The (num_units, num_units) matrix, dense or CSR.
+        snap_distances: The distance in metres from each unit centroid to
+                        the road node it was snapped to.
+        max_travel_time: The truncation limit in seconds, or None.
+    """
+    unit_ids: np.ndarray
+    times: Union[np.ndarray, sp.csr_matrix]
+    snap_distances: np.ndarray
+    max_travel_time: Optional[float] = None
+
+    @property
+    def is_sparse(self) -> bool:
+        return sp.issparse(self.times)
+
+    def to_dense(self) -> np.ndarray:
+        """Returns the times as a dense array with ``inf`` for missing pairs."""
+        if not self.is_sparse:
+            return self.times
+        coo = self.times.tocoo()
+        dense = np.full(self.times.shape, np.inf)
+        dense[coo.row, coo.col] = coo.data
+        return dense
+
+
+def edge_travel_times(network: RoadGraphCSR, default_speed_kph: float = DEFAULT_SPEED_KPH) -> np.ndarray:
+    """
+    Returns the travel time in seconds of every edge, in CSR slot order.
+
+    Uses the ``travel_time`` attribute if present, otherwise ``length``
+    divided by ``speed_kph``, otherwise ``length`` at the default speed.
+    Missing values fall back the same way.
+    """
+    if "length" not in network.edge_columns and "travel_time" not in network.edge_columns:
+        raise ValueError("The road network has neither 'travel_time' nor 'length' edge attributes.")
+
+    times = np.full(network.num_edges, np.nan)
+    if "travel_time" in network.edge_columns:
+        times = network.edge_attribute("travel_time").astype(np.float64)
+    if "length" in network.edge_columns:
+        speeds = np.full(network.num_edges, default_speed_kph, dtype=np.float64)
+        if "speed_kph" in network.edge_columns:
+            speed_kph = network.edge_attribute("speed_kph").astype(np.float64)
+            speeds = np.where(np.isfinite(speed_kph) & (speed_kph > 0), speed_kph, speeds)
+        estimated = network.edge_attribute("length") / (speeds / 3.6)
+        times = np.where(np.isnan(times), estimated, times)
+    if np.isnan(times).any():
+        raise ValueError("Some road network edges have no travel_time or length.")
+    return times
+
+
+def prepare_network(graph: nx.MultiDiGraph, default_speed_kph: float = DEFAULT_SPEED_KPH) -> RoadGraphCSR:
+    """
+    Converts a networkx road network to a CSR view with edge travel times.
+
+    If the edges have no ``travel_time`` yet, osmnx imputes ``speed_kph``
+    from ``maxspeed`` and the highway type and derives ``travel_time``;
+    both attributes are added to ``graph`` in place.
+    """
+    has_times = all("travel_time" in data for _, _, data in graph.edges(data=True))
+    if not has_times and graph.number_of_edges():
+        ox.add_edge_speeds(graph, fallback=default_speed_kph)
+        ox.add_edge_travel_times(graph)
+    return RoadGraphCSR.from_graph(graph)
+
+
+def _local_metres(lon: np.ndarray, lat: np.ndarray, ref_lat: float) -> np.ndarray:
+    """Projects lon/lat degrees to an equirectangular plane in metres around ref_lat."""
+    x = np.radians(lon) * _EARTH_RADIUS_M * np.cos(np.radians(ref_lat))
+    y = np.radians(lat) * _EARTH_RADIUS_M
+    return np.column_stack([x, y])
+
+
+def snap_to_nodes(points: np.ndarray, network: RoadGraphCSR) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    Snaps lon/lat points to their nearest road nodes with a single KD-tree query.
+
+    Args:
+        points: An (n, 2) array of lon/lat coordinates.
+        network: The road network; its nodes need ``x`` and ``y`` attributes.
+
+    Returns:
+        The node position of every point and the snap distance in metres.
+    """
+    node_x = np.asarray(network.node_columns["x"], dtype=np.float64)
+    node_y = np.asarray(network.node_columns["y"], dtype=np.float64)
+    ref_lat = float(np.mean(node_y))
+    tree = cKDTree(_local_metres(node_x, node_y, ref_lat))
+    distances, positions = tree.query(_local_metres(points[:, 0], points[:, 1], ref_lat))
+    return positions, distances
+
+
+def _shortest_path_batch(args: tuple) -> Union[np.ndarray, sp.csr_matrix]:
+    """
+    Runs Dijkstra from a batch of sources and keeps the columns of the targets.
+
+    With ``sparse``, every block of rows keeps only its finite entries, zeros
+    included, before the next block is computed.
+    """
+    matrix, sources, targets, limit, sparse = args
+    batch_size = max(1, _MAX_BATCH_CELLS // max(matrix.shape[0], 1))
+    blocks = []
+    for start in range(0, len(sources), batch_size):
+        block = dijkstra(matrix, directed=True, indices=sources[start:start + batch_size], limit=limit)[:, targets]
+        if sparse:
+            rows, cols = np.nonzero(np.isfinite(block))
+            block = sp.coo_matrix((block[rows, cols], (rows, cols)), shape=block.shape)
+        blocks.append(block)
+    if sparse:
+        return sp.vstack(blocks, format="csr") if blocks else sp.csr_matrix((0, len(targets)))
+    return np.vstack(blocks) if blocks else np.empty((0, len(targets)))
+
+
+def _node_travel_times(
+    matrix: sp.csr_matrix, nodes: np.ndarray, limit: float, sparse: bool, n_jobs: Optional[int]
+) -> Union[np.ndarray, sp.csr_matrix]:
+    """Computes the travel times between the given nodes, optionally across a process pool."""
+    n_workers = n_jobs or os.cpu_count() or 1
+    if n_workers == 1 or len(nodes) * matrix.shape[0] < _MIN_PARALLEL_WORK:
+        return _shortest_path_batch((matrix, nodes, nodes, limit, sparse))
+
+    tasks = [(matrix, batch, nodes, limit, sparse) for batch in np.array_split(nodes, n_workers) if len(batch)]
+    with ProcessPoolExecutor(max_workers=n_workers) as executor:
+        results = list(executor.map(_shortest_path_batch, tasks))
+    return sp.vstack(results, format="csr") if sparse else np.vstack(results)
+
+
+def travel_time_matrix(
+    base_units_gdf: gpd.GeoDataFrame,
+    network: Union[nx.MultiDiGraph, RoadGraphCSR],
+    max_travel_time: Optional[float] = None,
+    sparse: bool = False,
+    default_speed_kph: float = DEFAULT_SPEED_KPH,
+    n_jobs: Optional[int] = None,
+    cache: Optional[ResultCache] = None,
+) -> TravelTimeMatrix:
+    """
+    Computes drive times between all base units over a road network.
+
+    Args:
+        base_units_gdf: The base units, with ``unit_id`` and ``geometry``.
+        network: The road network, as returned by ``get_road_network_from_api``
+                 (networkx or its ``as_csr`` view), in EPSG:4326.
+        max_travel_time: Truncate the searches at this many seconds. Pairs
+                         further apart are reported as missing.
+        sparse: Whether to return a CSR matrix holding only the reachable
+                pairs. Most useful together with ``max_travel_time``.
+        default_speed_kph: The speed for edges without speed information.
+        n_jobs: The number of worker processes for the searches. None uses
+                all CPUs; small workloads always run in the calling process.
+        cache: An optional result cache. Results are keyed by the unit
+               centroids, the network's structure and travel times, and the
+               truncation settings.
+
+    Returns:
+        The travel time matrix in seconds, rows being origins.
+    """
+    if "unit_id" not in base_units_gdf.columns:
+        raise ValueError("base_units_gdf is missing the required 'unit_id' column.")
+    if max_travel_time is not None and max_travel_time <= 0:
+        raise ValueError("max_travel_time must be positive.")
+
+    if base_units_gdf.crs is not None and not base_units_gdf.crs.equals("EPSG:4326"):
+        base_units_gdf = base_units_gdf.to_crs("EPSG:4326")
+    if isinstance(network, nx.MultiDiGraph):
+        network = prepare_network(network, default_speed_kph)
+    if network.num_nodes == 0:
+        raise ValueError("The road network has no nodes.")
+
+    unit_ids = base_units_gdf["unit_id"].to_numpy()
+    centroids = shapely.get_coordinates(shapely.centroid(np.asarray(base_units_gdf.geometry.values)))
+    weights = edge_travel_times(network, default_speed_kph)
+
+    if cache is not None:
+        # n_jobs is left out on purpose: results do not depend on the worker count
+        cache_key = get_cache_key({
+            "function": "travel_time_matrix",
+            "centroids": hash_array(centroids),
+            "unit_ids": hash_array(unit_ids.astype(str)),
+            "network": [hash_array(np.asarray(network.indptr)), hash_array(np.asarray(network.indices)),
+                        hash_array(np.asarray(network.node_columns["x"])),
+                        hash_array(np.asarray(network.node_columns["y"])), hash_array(weights)],
+            "max_travel_time": max_travel_time,
+            "sparse": sparse,
+        })
+        cached = cache.get(cache_key)
+        if cached is not None:
+            return cached
+
+    positions, snap_distances = snap_to_nodes(centroids, network)
+    # Units snapped to the same node share one search
+    nodes, unit_node = np.unique(positions, return_inverse=True)
+    limit = np.inf if max_travel_time is None else max_travel_time
+    node_times = _node_travel_times(network.to_sparse(weights), nodes, limit, sparse, n_jobs)
+
+    if sparse:
+        # Row/column selection keeps explicit zeros
+        times = node_times[unit_node][:, unit_node].tocsr()
+    else:
+        times = node_times[np.ix_(unit_node, unit_node)]
+
+    result = TravelTimeMatrix(
+        unit_ids=unit_ids,
+        times=times,
+        snap_distances=snap_distances,
+        max_travel_time=max_travel_time,
+    )
+    if cache is not None:
+        cache.put(cache_key, result)
+    return result
@@ -0,0 +1,246 @@
+# -*- coding: utf-8 -*-
+"""
+Unit tests for the cache module.
+"""
+
+import threading
+import time
+from pathlib import Path
+
+import numpy as np
+import pytest
+
+from src.common.cache import CacheStore, ResultCache, get_cache_key, hash_array
+
+# --- Tests for the key helpers ---
+
+def test_get_cache_key_is_order_independent():
+    """Tests that parameter order does not change the key."""
+    assert get_cache_key({"a": 1, "b": [1, 2]}) == get_cache_key({"b": [1, 2], "a": 1})
+    assert get_cache_key({"a": 1}) != get_cache_key({"a": 2})
+
+def test_hash_array_depends_on_content_shape_and_dtype():
+    """Tests that the array hash is content-addressed."""
+    coords = np.arange(6, dtype=float).reshape(3, 2)
+    assert hash_array(coords) == hash_array(coords.copy())
+    assert hash_array(coords) != hash_array(coords.reshape(2, 3))
+    assert hash_array(coords) != hash_array(coords.astype(np.float32))
+
+# --- Tests for ResultCache ---
+
+def test_memory_and_disk_tiers(tmp_path):
+    """Tests hits from both tiers and the hit/miss counters."""
+    cache = ResultCache(tmp_path)
+    assert cache.get("k") is None
+
+    cache.put("k", {"values": [1.0, 2.0]})
+    assert cache.get("k") == {"values": [1.0, 2.0]}
+
+    # A fresh instance only has the disk tier
+    reopened = ResultCache(tmp_path)
+    assert reopened.get("k") == {"values": [1.0, 2.0]}
+    assert reopened.get("k") == {"values": [1.0, 2.0]}
+
+    assert cache.stats()["misses"] == 1
+    assert cache.stats()["memory_hits"] == 1
+    assert reopened.stats()["disk_hits"] == 1
+    assert reopened.stats()["memory_hits"] == 1
+
+def test_returned_values_are_independent_copies():
+    """Tests that mutating a returned value does not corrupt the cache."""
+    cache = ResultCache(None)
+    cache.put("k", {"values": [1.0]})
+    cache.get("k")["values"].append(2.0)
+    assert cache.get("k") == {"values": [1.0]}
+
+def test_size_based_lru_eviction(tmp_path):
+    """Tests that both tiers evict the least recently used entries to fit their budget."""
+    payload = np.zeros(1000)
+    cache = ResultCache(tmp_path, max_memory_bytes=20_000, max_disk_bytes=20_000)
+    cache.put("a", payload)
+    cache.put("b", payload)
+    cache.get("a")
+    cache.put("c", payload)
+
+    assert cache.stats()["memory_entries"] == 2
+    assert sorted(path.stem for path in tmp_path.glob("*.pkl")) == ["a", "c"]
+    assert cache.stats()["evictions"] == 2
+    assert cache.get("b") is None
+
+# --- Tests for CacheStore ---
+
+def _write_text(value: str, path: Path) -> None:
+    path.write_text(value)
+
+def _read_text(path: Path) -> str:
+    return path.read_text()
+
+def test_store_fetches_once_and_serves_hits(tmp_path):
+    """Tests that a value is fetched on a miss and read back afterwards."""
+    store = CacheStore(tmp_path)
+    calls = []
+
+    def fetch():
+        calls.append(1)
+        return "payload"
+
+    assert store.get_or_create("k", ".txt", fetch, _write_text, _read_text) == "payload"
+    assert store.get_or_create("k", ".txt", fetch, _write_text, _read_text) == "payload"
+    assert len(calls) == 1
+    assert store.status()["num_entries"] == 1
+
+def test_store_failed_write_leaves_no_entry(tmp_path):
+    """Tests that a writer failing halfway leaves neither a file nor an index entry."""
+    store = CacheStore(tmp_path)
+
+    def broken_save(value, path):
+        path.write_text(value[:3])
+        raise IOError("disk full")
+
+    with pytest.raises(IOError):
+        store.get_or_create("k", ".txt", lambda: "payload", broken_save, _read_text)
+
+    assert store.lookup("k", ".txt") is None
+    assert not store.path_for("k", ".txt").exists()
+    assert not list(tmp_path.glob(".tmp.*"))
+
+def test_store_concurrent_misses_fetch_once(tmp_path):
+    """Tests that concurrent misses on one key are serialized into a single fetch."""
+    store = CacheStore(tmp_path)
+    calls = []
+
+    def slow_fetch():
+        calls.append(1)
+        time.sleep(0.2)
+        return "payload"
+
+    results = []
+    threads = [
+        threading.Thread(
+            target=lambda: results.append(
+                store.get_or_create("k", ".txt", slow_fetch, _write_text, _read_text)
+            )
+        )
+        for _ in range(4)
+    ]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert len(calls) == 1
+    assert results == ["payload"] * 4
+
+def test_store_hits_do_not_rewrite_the_index(tmp_path):
+    """Tests that hits record their access on the entry file instead of rewriting the index."""
+    store = CacheStore(tmp_path)
+    store.put("k", ".txt", "payload", _write_text)
+    index_path = tmp_path / CacheStore.INDEX_FILENAME
+    before = index_path.stat()
+    entry_mtime = store.path_for("k", ".txt").stat().st_mtime_ns
+
+    time.sleep(0.01)
+    assert store.get_or_create("k", ".txt", lambda: "new", _write_text, _read_text) == "payload"
+
+    after = index_path.stat()
+    assert (after.st_ino, after.st_mtime_ns) == (before.st_ino, before.st_mtime_ns)
+    assert store.path_for("k", ".txt").stat().st_mtime_ns > entry_mtime
+
+def test_store_entry_evicted_before_load_is_refetched(tmp_path):
+    """Tests that an entry removed by another process between lookup and load counts as a miss."""
+    store = CacheStore(tmp_path)
+    store.put("k", ".txt", "old", _write_text)
+
+    def evicted_load(path):
+        path.unlink()
+        return _read_text(path)
+
+    assert store.get_or_create("k", ".txt", lambda: "new", _write_text, evicted_load) == "new"
+    assert store.get_or_create("k", ".txt", lambda: "newer", _write_text, _read_text) == "new"
+
+def test_store_ttl_expiry(tmp_path):
+    """Tests that entries older than the TTL are treated as misses."""
+    store = CacheStore(tmp_path, ttl_seconds=0.05)
+    store.put("k", ".txt", "old", _write_text)
+    assert store.lookup("k", ".txt") is not None
+
+    time.sleep(0.1)
+    assert store.lookup("k", ".txt") is None
+    assert store.get_or_create("k", ".txt", lambda: "new", _write_text, _read_text) == "new"
+
+def test_store_lru_eviction_and_clear(tmp_path):
+    """Tests that the least recently used entries are evicted to fit the byte budget."""
+    store = CacheStore(tmp_path, max_bytes=250)
+    store.put("a", ".txt", "x" * 100, _write_text)
+    store.put("b", ".txt", "x" * 100, _write_text)
+    store.lookup("a", ".txt")
+    store.put("c", ".txt", "x" * 100, _write_text)
+
+    assert store.lookup("a", ".txt") is not None
+    assert store.lookup("b", ".txt") is None
+    assert not store.path_for("b", ".txt").exists()
+    assert store.status()["total_bytes"] == 200
+
+    store.clear()
+    assert store.status()["num_entries"] == 0
+    assert not store.path_for("a", ".txt").exists()
+
+def test_store_expired_entries_are_removed(tmp_path):
+    """Tests that expired entries are deleted on the next write instead of using up the budget."""
+    store = CacheStore(tmp_path, max_bytes=250, ttl_seconds=0.05)
+    store.put("old", ".txt", "x" * 100, _write_text)
+    store.put("stale", ".txt", "x" * 100, _write_text)
+    time.sleep(0.1)
+    store.put("a", ".txt", "x" * 100, _write_text)
+    store.put("b", ".txt", "x" * 100, _write_text)
+
+    # Both fresh entries fit once the expired ones are gone
+    assert store.lookup("a", ".txt") is not None and store.lookup("b", ".txt") is not None
+    assert not store.path_for("old", ".txt").exists()
+    assert store.status()["num_entries"] == 2
+
+    time.sleep(0.1)
+    assert store.status()["num_entries"] == 0
+    assert not store.path_for("a", ".txt").exists()
+
+def test_store_under_budget_does_not_scan_entries(tmp_path, monkeypatch):
+    """Tests that a write within the byte budget does not stat the other entries."""
+    store = CacheStore(tmp_path, max_bytes=10_000)
+    store.put("a", ".txt", "x" * 100, _write_text)
+
+    def fail(*args):
+        raise AssertionError("entries scanned under budget")
+
+    monkeypatch.setattr(store, "_last_access", fail)
+    store.put("b", ".txt", "x" * 100, _write_text)
+
+def test_store_lock_files_are_removed_with_entries(tmp_path):
+    """Tests that per-key lock files do not accumulate as entries are evicted or cleared."""
+    store = CacheStore(tmp_path, max_bytes=250)
+    for key in "abcdef":
+        store.get_or_create(key, ".txt", lambda: "x" * 100, _write_text, _read_text)
+
+    locks = sorted(path.name for path in (tmp_path / ".locks").glob("*.txt.lock"))
+    assert locks == ["e.txt.lock", "f.txt.lock"]
+
+    store.clear()
+    assert not list((tmp_path / ".locks").glob("*.txt.lock"))
+    assert store.get_or_create("a", ".txt", lambda: "fresh", _write_text, _read_text) == "fresh"
+
+def test_store_get_or_create_many_fetches_missing_together(tmp_path):
+    """Tests that only missing entries are fetched, in a single call."""
+    store = CacheStore(tmp_path)
+    store.put("a", ".txt", "cached", _write_text)
+    calls = []
+
+    def fetch(names):
+        calls.append(names)
+        return {name: f"fresh {name}" for name in names}
+
+    entries = {"first": ("a", ".txt"), "second": ("b", ".txt"), "third": ("c", ".txt")}
+    result = store.get_or_create_many(entries, fetch, _write_text, _read_text)
+
+    assert result == {"first": "cached", "second": "fresh second", "third": "fresh third"}
+    assert calls == [["second", "third"]]
+    assert store.get_or_create_many(entries, fetch, _write_text, _read_text) == result
+    assert len(calls) == 1
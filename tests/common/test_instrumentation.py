@@ -0,0 +1,142 @@
+# -*- coding: utf-8 -*-
+"""
+Unit tests for the instrumentation module.
+"""
+
+import asyncio
+import json
+
+import numpy as np
+import pytest
+
+from src.common.cache import CacheStore
+from src.common.instrumentation import (
+    annotate,
+    chrome_trace,
+    count,
+    export_chrome_trace,
+    instrument,
+    is_recording,
+    span,
+    traced,
+)
+from src.common.schemas import DataGeneratorConfig, HomogeneousPoissonConfig, VoronoiConfig
+from src.data_processing.synthetic_generator import generate_data
+
+# --- Helpers ---
+
+def _children(span_dict):
+    return {child["name"]: child for child in span_dict["children"]}
+
+# --- Test Cases ---
+
+def test_nothing_is_recorded_outside_instrument():
+    """Tests that the instrumentation calls are no-ops without an active recording."""
+    assert not is_recording()
+    with span("stage", rows=1) as stage:
+        count("cache_hits")
+        annotate(rows=2)
+    assert stage is span("other")
+
+def test_nested_spans_counters_and_attributes():
+    """Tests the span tree, the counter totals and the per-stage aggregates of a report."""
+    @traced()
+    def load():
+        count("cache_hits")
+        annotate(rows=10)
+
+    with instrument("run") as recording:
+        assert is_recording()
+        with span("prepare", mode="test"):
+            load()
+            load()
+            count("cache_misses", 3)
+        with pytest.raises(KeyError):
+            with span("fail"):
+                raise KeyError("missing")
+
+    report = recording.report()
+    assert report["name"] == "run"
+    assert report["counters"] == {"cache_hits": 2, "cache_misses": 3}
+    assert report["stages"]["test_nested_spans_counters_and_attributes.<locals>.load"]["calls"] == 2
+
+    root = report["spans"]
+    prepare = _children(root)["prepare"]
+    assert prepare["attributes"] == {"mode": "test"}
+    assert prepare["counters"] == {"cache_misses": 3}
+    assert [child["attributes"] for child in prepare["children"]] == [{"rows": 10}, {"rows": 10}]
+    assert _children(root)["fail"]["attributes"] == {"error": "KeyError"}
+    assert 0 <= prepare["start_seconds"] <= prepare["start_seconds"] + prepare["duration_seconds"] <= root["duration_seconds"]
+    assert root["max_rss_bytes"] > 0
+    json.dumps(report)
+
+def test_trace_memory_measures_stage_peaks():
+    """Tests that the peak of a stage is measured above its starting point and propagates to its parents."""
+    with instrument("run", trace_memory=True) as recording:
+        with span("outer"):
+            with span("allocate"):
+                block = np.ones(4 * 1024 ** 2 // 8)
+                del block
+            with span("idle"):
+                pass
+
+    outer = _children(recording.report()["spans"])["outer"]
+    allocate, idle = _children(outer)["allocate"], _children(outer)["idle"]
+    assert allocate["peak_memory_bytes"] >= 4 * 1024 ** 2
+    assert abs(allocate["memory_delta_bytes"]) < 1024 ** 2
+    assert idle["peak_memory_bytes"] < 1024 ** 2
+    assert outer["peak_memory_bytes"] >= allocate["peak_memory_bytes"]
+
+def test_asyncio_tasks_nest_under_their_creator():
+    """Tests that spans of concurrent tasks end up under the span that created the tasks."""
+    async def fetch(index):
+        with span("fetch", index=index):
+            await asyncio.sleep(0.01)
+
+    async def main():
+        with span("fetch_many"):
+            await asyncio.gather(*(fetch(index) for index in range(3)))
+
+    with instrument("run") as recording:
+        asyncio.run(main())
+
+    fetch_many = _children(recording.report()["spans"])["fetch_many"]
+    assert sorted(child["attributes"]["index"] for child in fetch_many["children"]) == [0, 1, 2]
+
+def test_chrome_trace_export(tmp_path):
+    """Tests the trace event format of a merged export of two reports."""
+    reports = []
+    for name in ("run-0", "run-1"):
+        with instrument(name) as recording:
+            with span("stage", rows=5):
+                count("cache_hits")
+        reports.append(recording.report())
+
+    path = export_chrome_trace(reports, tmp_path / "trace" / "sweep.json")
+
+    trace = json.loads(path.read_text())
+    assert trace == chrome_trace(reports)
+    spans = [event for event in trace["traceEvents"] if event["ph"] == "X"]
+    assert [event["name"] for event in spans] == ["run-0", "stage", "run-1", "stage"]
+    assert spans[1]["args"]["rows"] == 5 and spans[1]["args"]["cache_hits"] == 1
+    assert spans[0]["ts"] <= spans[1]["ts"] and spans[1]["dur"] <= spans[0]["dur"]
+
+def test_pipeline_stages_are_instrumented(tmp_path):
+    """Tests the stages and row counts of generate_data and the cache hit/miss counters."""
+    config = DataGeneratorConfig(
+        voronoi_config=VoronoiConfig(num_units=50),
+        distribution_config=HomogeneousPoissonConfig(intensity=0.1),
+        random_seed=1,
+    )
+    store = CacheStore(tmp_path)
+    with instrument("scenario") as recording:
+        units, customers = generate_data(config)
+        for _ in range(2):
+            store.get_or_create("key", ".npy", lambda: np.arange(3), lambda value, path: np.save(path, value), np.load)
+
+    report = recording.report()
+    stages = _children(_children(report["spans"])["generate_data"])
+    assert stages["generate_voronoi_units"]["attributes"] == {"rows": 50}
+    assert stages["assign_units_to_points"]["attributes"] == {"rows": len(customers)}
+    assert report["counters"] == {"cache_misses": 1, "cache_hits": 1}
+    assert {"cache.fetch", "cache.save", "cache.load"} <= set(report["stages"])
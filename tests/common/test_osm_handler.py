@@ -3,18 +3,41 @@
 Unit tests for the osm_handler module.
 """
 
+import asyncio
+import json
+import os
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlparse
+
 import geopandas as gpd
 import networkx as nx
+import numpy as np
+import osmnx as ox
 import pandas as pd
+import pyarrow.parquet as pq
 import pytest
-from shapely.geometry import Polygon, Point
+from shapely.geometry import Polygon, Point, box
 from unittest.mock import patch, MagicMock
 
+import pyrosm
+from pyrosm import OSM
+
 from src.common.osm_handler import (
+    LAYER_ROW_GROUP_SIZE,
+    _deduplicate_parts,
+    _read_pbf_header_bbox,
+    _AsyncRateLimiter,
+    get_boundaries_batch,
     get_boundary_from_api,
     get_road_network_from_api,
     extract_from_pbf,
+    extract_layers_from_pbf,
+    extract_layers_from_pbf_windowed,
+    read_layer,
 )
+from src.common.schemas import PBFLayerConfig
 
 # --- Fixtures ---
 
@@ -40,78 +63,251 @@ def mock_graph():
     G.add_edge(1, 2)
     return G
 
+@pytest.fixture
+def osm_world():
+    """Returns an unsimplified 21x21 street grid with 0.01 degree spacing, standing in for OSM."""
+    G = nx.MultiDiGraph(crs="EPSG:4326")
+    size = 21
+    for i in range(size):
+        for j in range(size):
+            G.add_node(i * size + j, x=j * 0.01, y=i * 0.01, street_count=4)
+    osmid = 0
+    for i in range(size):
+        for j in range(size):
+            u = i * size + j
+            for v in ([u + 1] if j + 1 < size else []) + ([u + size] if i + 1 < size else []):
+                osmid += 1
+                for a, b, rev in ((u, v, False), (v, u, True)):
+                    G.add_edge(a, b, osmid=osmid, length=1100.0, oneway=False, reversed=rev, highway="residential")
+    return G
+
+@pytest.fixture
+def fake_overpass(osm_world):
+    """Patches osmnx's download with a lookup into the fake OSM world."""
+    def graph_from_polygon(polygon, **kwargs):
+        return ox.truncate.truncate_graph_polygon(
+            osm_world, polygon, truncate_by_edge=kwargs.get("truncate_by_edge", False)
+        )
+
+    with patch('src.common.osm_handler.ox.graph_from_polygon', side_effect=graph_from_polygon) as mock_fetch:
+        yield mock_fetch
+
+@pytest.fixture
+def cache_dir(tmp_path):
+    """Points the OSM cache at a temporary directory."""
+    cache_dir = tmp_path / "osm_cache"
+    with patch('src.common.osm_handler.DEFAULT_CACHE_DIR', cache_dir):
+        yield cache_dir
+
 # --- Tests for get_boundary_from_api ---
 
 @patch('src.common.osm_handler.ox.geocode_to_gdf')
-@patch('src.common.osm_handler.gpd.read_feather')
-@patch('src.common.osm_handler.Path.exists', return_value=False)
-@patch('src.common.osm_handler.gpd.GeoDataFrame.to_feather')
-def test_get_boundary_from_api_cache_miss(mock_to_feather, mock_exists, mock_read_feather, mock_geocode, mock_gdf):
+def test_get_boundary_from_api_cache_miss(mock_geocode, mock_gdf, cache_dir):
     """Test get_boundary_from_api when cache is missed."""
     mock_geocode.return_value = mock_gdf
     
     query = "Test City"
     tags = {"admin_level": "8"}
     
-    result_gdf = get_boundary_from_api(query, tags)
+    with patch('src.common.osm_handler.gpd.read_parquet') as mock_read_parquet:
+        result_gdf = get_boundary_from_api(query, tags)
     
-    mock_geocode.assert_called_once_with(query, by_osmid=False, by_polygon=False, **tags)
-    mock_to_feather.assert_called_once()
-    assert not mock_read_feather.called
+    mock_geocode.assert_called_once_with(query, by_osmid=False)
+    assert not mock_read_parquet.called
+    assert len(list(cache_dir.glob("*_boundary.parquet"))) == 1
     pd.testing.assert_frame_equal(result_gdf, mock_gdf)
 
 @patch('src.common.osm_handler.ox.geocode_to_gdf')
-@patch('src.common.osm_handler.gpd.read_feather')
-@patch('src.common.osm_handler.Path.exists', return_value=True)
-def test_get_boundary_from_api_cache_hit(mock_exists, mock_read_feather, mock_geocode, mock_gdf):
+def test_get_boundary_from_api_cache_hit(mock_geocode, mock_gdf, cache_dir):
     """Test get_boundary_from_api when cache is hit."""
-    mock_read_feather.return_value = mock_gdf
+    mock_geocode.return_value = mock_gdf
 
     query = "Test City"
     tags = {"admin_level": "8"}
 
+    get_boundary_from_api(query, tags)
     result_gdf = get_boundary_from_api(query, tags)
 
-    mock_read_feather.assert_called_once()
-    assert not mock_geocode.called
+    mock_geocode.assert_called_once()
+    pd.testing.assert_frame_equal(pd.DataFrame(result_gdf), pd.DataFrame(mock_gdf))
+
+@patch('src.common.osm_handler.ox.geocode_to_gdf')
+def test_get_boundary_from_api_ignores_unindexed_file(mock_geocode, mock_gdf, cache_dir):
+    """Test that a file left behind without an index entry is not served as a hit."""
+    mock_geocode.return_value = mock_gdf
+    get_boundary_from_api("Test City", {"admin_level": "8"})
+
+    # Simulate a crash that left a truncated file but no index entry
+    (cache_file,) = cache_dir.glob("*_boundary.parquet")
+    cache_file.write_bytes(b"truncated")
+    (cache_dir / "index.json").unlink()
+
+    result_gdf = get_boundary_from_api("Test City", {"admin_level": "8"})
+
+    assert mock_geocode.call_count == 2
     pd.testing.assert_frame_equal(result_gdf, mock_gdf)
 
 
+# --- Tests for get_boundaries_batch ---
+
+@pytest.fixture
+def fake_geocoder():
+    """Runs a local stand-in for the Nominatim search API and points osmnx at it."""
+    state = {"requests": [], "active": 0, "max_active": 0}
+    lock = threading.Lock()
+
+    class Handler(BaseHTTPRequestHandler):
+        def do_GET(self):
+            query = parse_qs(urlparse(self.path).query)["q"][0]
+            with lock:
+                state["requests"].append(query)
+                state["active"] += 1
+                state["max_active"] = max(state["max_active"], state["active"])
+            time.sleep(0.2)
+
+            if query.startswith("Nowhere"):
+                results = []
+            else:
+                # "City N" is the unit square at x = N
+                offset = int(query.split()[-1])
+                ring = [[offset, 0], [offset + 1, 0], [offset + 1, 1], [offset, 1], [offset, 0]]
+                results = [{
+                    "place_id": offset, "osm_type": "relation", "osm_id": 1000 + offset,
+                    "display_name": query, "class": "boundary", "type": "administrative",
+                    "importance": 0.5, "lat": "0.5", "lon": str(offset + 0.5),
+                    "boundingbox": ["0", "1", str(offset), str(offset + 1)],
+                    "geojson": {"type": "Polygon", "coordinates": [ring]},
+                }]
+            body = json.dumps(results).encode("utf-8")
+            with lock:
+                state["active"] -= 1
+            self.send_response(200)
+            self.send_header("Content-Type", "application/json")
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def log_message(self, *args):
+            pass
+
+    server = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    with patch.object(ox.settings, "nominatim_url", f"http://127.0.0.1:{server.server_port}/"), \
+            patch.object(ox.settings, "use_cache", False):
+        yield state
+    server.shutdown()
+
+def test_get_boundaries_batch_deduplicates_and_fills_cache(fake_geocoder, cache_dir):
+    """Test that duplicate queries share one request and that results land in the cache."""
+    queries = [("City 1", {}), ("City 2", {}), ("City 1", {}), ("City 3", {}), ("City 2", {})]
+
+    results = get_boundaries_batch(queries, max_concurrency=2, requests_per_second=None)
+
+    assert sorted(fake_geocoder["requests"]) == ["City 1", "City 2", "City 3"]
+    assert fake_geocoder["max_active"] <= 2
+    for (query, _), gdf in zip(queries, results):
+        assert gdf["display_name"].iloc[0] == query
+        assert gdf.geometry.iloc[0].bounds[0] == int(query.split()[-1])
+    assert results[0] is not results[2]
+
+    # A second batch is served entirely from the cache
+    again = get_boundaries_batch(queries[:2], requests_per_second=None, columns=["display_name"])
+    assert len(fake_geocoder["requests"]) == 3
+    assert again[1].columns.tolist() == ["display_name", "geometry"]
+
+def test_get_boundaries_batch_return_exceptions(fake_geocoder, cache_dir):
+    """Test that one failing query does not fail the batch when exceptions are returned."""
+    results = get_boundaries_batch(
+        [("City 1", {}), ("Nowhere 1", {})], requests_per_second=None, return_exceptions=True
+    )
+
+    assert isinstance(results[0], gpd.GeoDataFrame)
+    assert isinstance(results[1], Exception)
+
+def test_async_rate_limiter_spaces_requests():
+    """Test that the limiter admits at most the configured rate."""
+    async def acquire_all():
+        limiter = _AsyncRateLimiter(20)
+        start = time.perf_counter()
+        await asyncio.gather(*(limiter.acquire() for _ in range(5)))
+        return time.perf_counter() - start
+
+    # The first acquisition is immediate, the other four wait 50 ms each
+    assert asyncio.run(acquire_all()) >= 0.19
+
+
 # --- Tests for get_road_network_from_api ---
 
 @patch('src.common.osm_handler.ox.graph_from_polygon')
-@patch('src.common.osm_handler.ox.load_graphml')
-@patch('src.common.osm_handler.Path.exists', return_value=False)
-@patch('src.common.osm_handler.ox.save_graphml')
-def test_get_road_network_from_api_cache_miss(mock_save_graphml, mock_exists, mock_load_graphml, mock_graph_from_polygon, mock_polygon, mock_graph):
+@patch('src.common.osm_handler.load_road_graph')
+def test_get_road_network_from_api_cache_miss(mock_load_road_graph, mock_graph_from_polygon, mock_polygon, mock_graph, cache_dir):
     """Test get_road_network_from_api on cache miss."""
     mock_graph_from_polygon.return_value = mock_graph
 
-    result_graph = get_road_network_from_api(mock_polygon)
+    result_graph = get_road_network_from_api(mock_polygon, tile_size=None)
 
     mock_graph_from_polygon.assert_called_once()
-    mock_save_graphml.assert_called_once()
-    assert not mock_load_graphml.called
+    assert not mock_load_road_graph.called
+    assert len(list(cache_dir.glob("*_road_network.npz"))) == 1
     assert result_graph == mock_graph
 
-@patch('src.common.osm_handler.ox.load_graphml')
-@patch('src.common.osm_handler.Path.exists', return_value=True)
-def test_get_road_network_from_api_cache_hit(mock_exists, mock_load_graphml, mock_polygon, mock_graph):
+@patch('src.common.osm_handler.ox.graph_from_polygon')
+def test_get_road_network_from_api_cache_hit(mock_graph_from_polygon, mock_polygon, mock_graph, cache_dir):
     """Test get_road_network_from_api on cache hit."""
-    mock_load_graphml.return_value = mock_graph
+    mock_graph_from_polygon.return_value = mock_graph
 
-    result_graph = get_road_network_from_api(mock_polygon)
+    get_road_network_from_api(mock_polygon, tile_size=None)
+    result_graph = get_road_network_from_api(mock_polygon, tile_size=None)
 
-    mock_load_graphml.assert_called_once()
-    assert result_graph == mock_graph
+    mock_graph_from_polygon.assert_called_once()
+    assert set(result_graph.nodes) == set(mock_graph.nodes)
+    assert result_graph.number_of_edges() == mock_graph.number_of_edges()
+
+@patch('src.common.osm_handler.ox.graph_from_polygon')
+def test_get_road_network_from_api_as_csr(mock_graph_from_polygon, mock_polygon, mock_graph, cache_dir):
+    """Test that the CSR view is returned both on a miss and on a hit."""
+    mock_graph_from_polygon.return_value = mock_graph
+
+    fetched = get_road_network_from_api(mock_polygon, as_csr=True, tile_size=None)
+    cached = get_road_network_from_api(mock_polygon, as_csr=True, tile_size=None)
+
+    mock_graph_from_polygon.assert_called_once()
+    for csr in (fetched, cached):
+        assert list(csr.node_ids) == [1, 2]
+        assert csr.num_edges == 1
+
+
+def test_get_road_network_tiled_matches_direct_fetch(fake_overpass, osm_world, cache_dir):
+    """Test that stitching tiles reproduces the network of a single whole-polygon fetch."""
+    polygon = box(0.025, 0.035, 0.155, 0.125)
+
+    tiled = get_road_network_from_api(polygon, tile_size=0.05)
+    direct = ox.simplify_graph(ox.truncate.truncate_graph_polygon(osm_world, polygon))
+
+    assert set(tiled.nodes) == set(direct.nodes)
+    assert set(tiled.edges(keys=True)) == set(direct.edges(keys=True))
+    # 4 columns by 3 rows of 0.05 degree tiles intersect the polygon
+    assert fake_overpass.call_count == 12
+
+def test_get_road_network_tiled_reuses_overlapping_tiles(fake_overpass, cache_dir):
+    """Test that a shifted polygon only downloads the tiles that are new."""
+    get_road_network_from_api(box(0.01, 0.01, 0.09, 0.09), tile_size=0.05)
+    assert fake_overpass.call_count == 4
+
+    shifted = get_road_network_from_api(box(0.06, 0.01, 0.14, 0.09), tile_size=0.05)
+
+    # Only the two tiles of the new column are fetched
+    assert fake_overpass.call_count == 6
+    # A 9x9 block of grid nodes, minus the four corners merged by simplification
+    assert shifted.number_of_nodes() == 9 * 9 - 4
 
 
 # --- Tests for extract_from_pbf ---
 
 @patch('src.common.osm_handler.OSM')
-@patch('src.common.osm_handler.gpd.read_feather')
-@patch('src.common.osm_handler.gpd.GeoDataFrame.to_feather')
-def test_extract_from_pbf_cache_miss(mock_to_feather, mock_read_feather, mock_osm_class, mock_gdf, tmp_path):
+@patch('src.common.osm_handler.gpd.read_parquet')
+def test_extract_from_pbf_cache_miss(mock_read_parquet, mock_osm_class, mock_gdf, tmp_path, cache_dir):
     """Test extract_from_pbf on cache miss using a temporary cache directory."""
     # Create a fake PBF file
     pbf_path = tmp_path / "fake.pbf"
@@ -122,12 +318,166 @@ def test_extract_from_pbf_cache_miss(mock_to_feather, mock_read_feather, mock_os
     mock_osm_instance.get_boundaries.return_value = mock_gdf
     mock_osm_class.return_value = mock_osm_instance
 
-    # Patch the cache directory to use the temporary one
-    with patch('src.common.osm_handler.DEFAULT_CACHE_DIR', tmp_path):
-        result_gdf = extract_from_pbf(str(pbf_path), "boundaries")
+    result_gdf = extract_from_pbf(str(pbf_path), "boundaries")
 
-    mock_osm_class.assert_called_once_with(str(pbf_path))
+    mock_osm_class.assert_called_once_with(str(pbf_path), bounding_box=None)
     mock_osm_instance.get_boundaries.assert_called_once()
-    mock_to_feather.assert_called_once()
-    assert not mock_read_feather.called
+    assert not mock_read_parquet.called
+    assert len(list(cache_dir.glob("*_boundaries.parquet"))) == 1
     pd.testing.assert_frame_equal(result_gdf, mock_gdf)
+
+@pytest.fixture
+def fake_pbf(tmp_path, mock_gdf):
+    """Creates a fake PBF file and patches pyrosm's reader to return mock layers."""
+    pbf_path = tmp_path / "fake.pbf"
+    pbf_path.touch()
+    roads = gpd.GeoDataFrame({'geometry': [Point(0, 0), Point(1, 1)], 'highway': ['primary', 'residential']}, crs="EPSG:4326")
+
+    with patch('src.common.osm_handler.OSM') as mock_osm_class:
+        mock_osm_instance = MagicMock()
+        mock_osm_instance.get_boundaries.return_value = mock_gdf
+        mock_osm_instance.get_network.return_value = roads
+        mock_osm_instance.get_pois.return_value = mock_gdf
+        mock_osm_class.return_value = mock_osm_instance
+        yield pbf_path, mock_osm_class, mock_osm_instance
+
+def test_extract_layers_from_pbf_parses_once(fake_pbf, cache_dir):
+    """Test that all layers come from one reader and that tag filters and the bbox are applied."""
+    pbf_path, mock_osm_class, mock_osm_instance = fake_pbf
+    layers = [
+        PBFLayerConfig(name="admin", feature_type="boundaries", tags={"admin_level": "8"}),
+        PBFLayerConfig(name="main_roads", feature_type="roads", tags={"highway": ["primary"]}),
+        PBFLayerConfig(name="amenities", feature_type="pois", tags={"amenity": True}),
+    ]
+
+    result = extract_layers_from_pbf(str(pbf_path), layers, bounding_box=(0, 0, 1, 1))
+
+    assert list(result) == ["admin", "main_roads", "amenities"]
+    mock_osm_class.assert_called_once_with(str(pbf_path), bounding_box=[0, 0, 1, 1])
+    mock_osm_instance.get_boundaries.assert_called_once_with(custom_filter={"admin_level": ["8"]})
+    mock_osm_instance.get_network.assert_called_once_with(network_type="driving", custom_filter={"highway": ["primary"]})
+    mock_osm_instance.get_pois.assert_called_once_with(custom_filter={"amenity": True})
+
+def test_extract_layers_from_pbf_only_parses_missing_layers(fake_pbf, cache_dir):
+    """Test that cached layers are reused and only missing ones trigger a parse."""
+    pbf_path, mock_osm_class, mock_osm_instance = fake_pbf
+    boundaries = PBFLayerConfig(name="admin", feature_type="boundaries")
+    roads = PBFLayerConfig(name="roads", feature_type="roads")
+
+    extract_layers_from_pbf(str(pbf_path), [boundaries])
+    result = extract_layers_from_pbf(str(pbf_path), [boundaries, roads])
+    extract_layers_from_pbf(str(pbf_path), [boundaries, roads])
+
+    assert mock_osm_class.call_count == 2
+    mock_osm_instance.get_boundaries.assert_called_once()
+    mock_osm_instance.get_network.assert_called_once()
+    assert len(result["roads"]) == 2
+
+def test_extract_layers_from_pbf_rejects_unknown_type_before_parsing(fake_pbf, cache_dir):
+    """Test that an unsupported feature type fails without reading the file."""
+    pbf_path, mock_osm_class, _ = fake_pbf
+
+    with pytest.raises(ValueError, match="Unsupported feature_type"):
+        extract_layers_from_pbf(str(pbf_path), [PBFLayerConfig(name="x", feature_type="rivers")])
+    assert not mock_osm_class.called
+
+def test_extract_layers_from_pbf_columns_and_bbox(fake_pbf, cache_dir):
+    """Test that projection and bbox filtering give the same result on a miss and on a hit."""
+    pbf_path, mock_osm_class, _ = fake_pbf
+    layer = PBFLayerConfig(name="roads", feature_type="roads")
+
+    fetched = extract_layers_from_pbf(str(pbf_path), [layer], columns=["highway"], bbox=(0.5, 0.5, 2, 2))["roads"]
+    cached = extract_layers_from_pbf(str(pbf_path), [layer], columns=["highway"], bbox=(0.5, 0.5, 2, 2))["roads"]
+
+    assert mock_osm_class.call_count == 1
+    for gdf in (fetched, cached):
+        assert gdf.columns.tolist() == ["highway", "geometry"]
+        assert gdf["highway"].tolist() == ["residential"]
+
+
+# --- Tests for read_layer ---
+
+def test_read_layer_pushes_down_columns_and_bbox(tmp_path):
+    """Test that a large cached layer is filtered by row group and returned in original order."""
+    from src.common.osm_handler import _save_geoparquet
+
+    n = 3 * LAYER_ROW_GROUP_SIZE
+    rng = np.random.default_rng(0)
+    gdf = gpd.GeoDataFrame(
+        {"id": np.arange(n), "name": ["road"] * n, "lanes": rng.integers(1, 4, n)},
+        geometry=gpd.points_from_xy(rng.random(n), rng.random(n)),
+        crs="EPSG:4326",
+    )
+    path = tmp_path / "layer.parquet"
+    _save_geoparquet(gdf, path)
+
+    # Hilbert ordering makes row groups spatially compact: unsorted, each would span the whole unit square
+    metadata = pq.ParquetFile(path).metadata
+    bbox_columns = [metadata.schema.names.index(name) for name in ("xmin", "ymin", "xmax", "ymax")]
+    total_area = 0.0
+    for group in range(metadata.num_row_groups):
+        xmin, ymin, xmax, ymax = (metadata.row_group(group).column(i).statistics for i in bbox_columns)
+        total_area += (xmax.max - xmin.min) * (ymax.max - ymin.min)
+    assert metadata.num_row_groups == 3
+    assert total_area < 2
+
+    window = (0.1, 0.1, 0.3, 0.3)
+    subset = read_layer(path, columns=["id"], bbox=window)
+    expected = gdf.cx[0.1:0.3, 0.1:0.3]
+
+    assert subset.columns.tolist() == ["id", "geometry"]
+    assert subset["id"].tolist() == expected["id"].tolist()
+    pd.testing.assert_frame_equal(read_layer(path), gdf)
+
+
+# --- Tests for extract_layers_from_pbf_windowed ---
+
+# A small extract of Finland shipped with pyrosm
+TEST_PBF = os.path.join(os.path.dirname(pyrosm.__file__), "data", "test.osm.pbf")
+requires_test_pbf = pytest.mark.skipif(not os.path.exists(TEST_PBF), reason="pyrosm test data not available")
+
+@requires_test_pbf
+def test_read_pbf_header_bbox():
+    """Test that the extent is read from the PBF header."""
+    min_x, min_y, max_x, max_y = _read_pbf_header_bbox(TEST_PBF)
+    assert min_x == pytest.approx(26.93) and max_x == pytest.approx(26.97)
+    assert min_y == pytest.approx(60.52) and max_y == pytest.approx(60.54)
+
+@requires_test_pbf
+@pytest.mark.parametrize("max_workers", [1, 2])
+def test_extract_layers_from_pbf_windowed_matches_full_extraction(tmp_path, max_workers):
+    """Test that the windowed dataset holds every feature of a full extraction exactly once."""
+    layers = [
+        PBFLayerConfig(name="roads", feature_type="roads"),
+        PBFLayerConfig(name="buildings", feature_type="buildings"),
+    ]
+
+    summary = extract_layers_from_pbf_windowed(
+        TEST_PBF, layers, tmp_path, window_size=0.01, max_workers=max_workers
+    )
+
+    assert summary["num_windows"] == 8
+    osm = OSM(TEST_PBF)
+    full_layers = {"roads": osm.get_network(network_type="driving"), "buildings": osm.get_buildings()}
+    for name, full in full_layers.items():
+        windowed = gpd.read_parquet(tmp_path / name)
+        keys = list(zip(windowed["osm_type"], windowed["id"]))
+        assert len(keys) == len(set(keys))
+        assert set(keys) == set(zip(full["osm_type"], full["id"]))
+        assert summary["layers"][name]["num_features"] == len(full)
+        assert summary["layers"][name]["num_parts"] > 1
+
+def test_deduplicate_parts_keeps_first_copy(tmp_path):
+    """Test that features repeated across parts are removed from later parts only."""
+    def part(ids):
+        return gpd.GeoDataFrame(
+            {"id": ids, "osm_type": ["way"] * len(ids), "geometry": [Point(i, i) for i in ids]},
+            crs="EPSG:4326",
+        )
+
+    part([1, 2, 3]).to_parquet(tmp_path / "part-00000.parquet")
+    part([3, 4]).to_parquet(tmp_path / "part-00001.parquet")
+
+    assert _deduplicate_parts(tmp_path) == 1
+    assert gpd.read_parquet(tmp_path / "part-00000.parquet")["id"].tolist() == [1, 2, 3]
+    assert gpd.read_parquet(tmp_path / "part-00001.parquet")["id"].tolist() == [4]
@@ -0,0 +1,107 @@
+# -*- coding: utf-8 -*-
+"""
+Unit tests for the road_graph_io module.
+"""
+
+import networkx as nx
+import numpy as np
+import pytest
+from shapely.geometry import LineString
+
+from src.common.road_graph_io import (
+    RoadGraphCSR,
+    load_road_graph,
+    load_road_graph_arrays,
+    load_road_graph_csr,
+    save_road_graph,
+)
+
+# --- Fixtures ---
+
+@pytest.fixture
+def road_graph():
+    """Returns a small osmnx-like graph with mixed and missing attributes."""
+    G = nx.MultiDiGraph(crs="EPSG:4326", simplified=True)
+    G.add_node(101, x=0.0, y=0.0, street_count=2)
+    G.add_node(202, x=1.0, y=0.0, street_count=3, highway="traffic_signals")
+    G.add_node(303, x=1.0, y=1.0, street_count=1)
+    G.add_edge(101, 202, 0, length=5.0, osmid=[1, 2], oneway=True,
+               geometry=LineString([(0, 0), (0.5, 0.1), (1, 0)]))
+    G.add_edge(101, 202, 1, length=3.0, osmid=3, oneway=False)
+    G.add_edge(202, 303, 0, length=2.5, osmid=4, oneway=True, name="Main Street")
+    G.add_edge(303, 101, 0, length=7.0, osmid=5, oneway=True, lanes="2")
+    return G
+
+# --- Test Cases ---
+
+def test_round_trip_preserves_graph(road_graph, tmp_path):
+    """Tests that nodes, edges, keys, attributes and graph attributes survive a round trip."""
+    path = tmp_path / "graph.npz"
+    save_road_graph(road_graph, path)
+    loaded = load_road_graph(path)
+
+    assert loaded.graph == road_graph.graph
+    assert dict(loaded.nodes(data=True)) == dict(road_graph.nodes(data=True))
+    expected_edges = list(road_graph.edges(keys=True, data=True))
+    loaded_edges = list(loaded.edges(keys=True, data=True))
+    assert len(loaded_edges) == len(expected_edges)
+    for (u, v, k, data), (lu, lv, lk, ldata) in zip(expected_edges, loaded_edges):
+        assert (u, v, k) == (lu, lv, lk)
+        assert ldata.keys() == data.keys()
+        for name, value in data.items():
+            if name == "geometry":
+                assert ldata[name].equals(value)
+            else:
+                assert ldata[name] == value
+                assert type(ldata[name]) is type(value)
+
+def test_arrays_are_memory_mapped(road_graph, tmp_path):
+    """Tests that the mmap loader returns memmaps with the same content as a full read."""
+    path = tmp_path / "graph.npz"
+    save_road_graph(road_graph, path)
+
+    mapped = load_road_graph_arrays(path, mmap=True)
+    loaded = load_road_graph_arrays(path, mmap=False)
+
+    assert mapped.keys() == loaded.keys()
+    assert isinstance(mapped["edges/u"], np.memmap)
+    for name in loaded:
+        np.testing.assert_array_equal(np.asarray(mapped[name]), loaded[name])
+
+def test_csr_view(road_graph, tmp_path):
+    """Tests the CSR structure, numeric columns and the collapsed sparse matrix."""
+    path = tmp_path / "graph.npz"
+    save_road_graph(road_graph, path)
+    csr = load_road_graph_csr(path)
+
+    assert list(csr.node_ids) == [101, 202, 303]
+    np.testing.assert_array_equal(csr.indptr, [0, 2, 3, 4])
+    np.testing.assert_array_equal(csr.indices, [1, 1, 2, 0])
+    np.testing.assert_array_equal(csr.edge_attribute("length"), [5.0, 3.0, 2.5, 7.0])
+    assert set(csr.node_columns) == {"x", "y", "street_count"}
+    assert "osmid" not in csr.edge_columns
+
+    # Parallel edges collapse to the shortest one
+    matrix = csr.to_sparse("length")
+    assert matrix.nnz == 3
+    assert matrix[0, 1] == 3.0
+
+def test_csr_from_graph_matches_file(road_graph, tmp_path):
+    """Tests that building the view in memory matches opening it from disk."""
+    path = tmp_path / "graph.npz"
+    save_road_graph(road_graph, path)
+
+    from_file = load_road_graph_csr(path)
+    in_memory = RoadGraphCSR.from_graph(road_graph)
+
+    np.testing.assert_array_equal(from_file.indptr, in_memory.indptr)
+    np.testing.assert_array_equal(from_file.indices, in_memory.indices)
+    assert (from_file.to_sparse() != in_memory.to_sparse()).nnz == 0
+
+def test_empty_graph_round_trip(tmp_path):
+    """Tests that an empty graph can be stored and reopened."""
+    path = tmp_path / "empty.npz"
+    save_road_graph(nx.MultiDiGraph(), path)
+
+    assert load_road_graph(path).number_of_nodes() == 0
+    assert load_road_graph_csr(path).num_edges == 0
@@ -4,6 +4,8 @@ Unit tests for the synthetic_generator module.
 """
 
 import geopandas as gpd
+import numpy as np
+import pandas as pd
 import pytest
 from shapely.geometry import Polygon, Point
 
@@ -14,7 +16,16 @@ from src.common.schemas import (
     InhomogeneousPoissonConfig,
     NeymanScottConfig,
 )
-from src.data_processing.synthetic_generator import generate_data
+from src.data_processing.synthetic_generator import (
+    generate_data,
+    generate_data_batch,
+    generate_data_stream,
+    write_data_stream,
+    _assign_units_to_points,
+    _generate_voronoi_units,
+    _iter_inhomogeneous_poisson,
+    _iter_neyman_scott,
+)
 
 # --- Fixtures ---
 
@@ -66,7 +77,7 @@ def test_inhomogeneous_poisson_generation(base_config):
 
     assert isinstance(base_units, gpd.GeoDataFrame)
     assert isinstance(customers, gpd.GeoDataFrame)
-    assert len(customers) > 40 # Expecting around 50 points
+    assert len(customers) > 40 # Expecting several hundred points
 
 def test_neyman_scott_generation(base_config):
     """Tests data generation with a Neyman-Scott process."""
@@ -86,3 +97,130 @@ def test_no_distribution_config_raises_error(base_config):
     """Tests that an error is raised if no distribution or sampling config is given."""
     with pytest.raises(ValueError):
         generate_data(base_config)
+
+def test_inhomogeneous_poisson_follows_intensity():
+    """Tests that thinning yields the expected count and concentrates points at the peak."""
+    rng = np.random.default_rng(0)
+    peaks = [(25, 25, 5.0, 3.0)]
+    points = np.concatenate(list(_iter_inhomogeneous_poisson(peaks, (0, 0, 100, 100), rng)))
+
+    # The expected count is the integral of the Gaussian surface: peak * 2 * pi * std^2
+    expected = 5.0 * 2 * np.pi * 3.0 ** 2
+    assert abs(len(points) - expected) < 5 * np.sqrt(expected)
+    dist = np.hypot(points[:, 0] - 25, points[:, 1] - 25)
+    assert np.median(dist) < 2 * 3.0
+
+def test_neyman_scott_offspring_are_batched():
+    """Tests that every parent produces exactly offspring_per_parent points within the radius."""
+    rng = np.random.default_rng(0)
+    config = NeymanScottConfig(parent_intensity=0.01, offspring_per_parent=7, offspring_radius=2.0)
+    points = np.concatenate(list(_iter_neyman_scott(config, (0, 0, 100, 100), rng)))
+
+    assert len(points) % 7 == 0
+    parents = points.reshape(-1, 7, 2)
+    spread = np.ptp(parents, axis=1).max()
+    assert spread <= 4.0
+
+def test_stream_chunks_are_bounded_and_ids_unique(base_config):
+    """Tests that streaming yields bounded chunks with globally unique customer ids."""
+    base_config.distribution_config = HomogeneousPoissonConfig(intensity=5.0)
+
+    base_units, chunks = generate_data_stream(base_config, chunk_size=100)
+    chunks = list(chunks)
+
+    assert len(chunks) > 1
+    assert all(len(chunk) <= 100 for chunk in chunks)
+    customer_ids = np.concatenate([chunk["customer_id"].to_numpy() for chunk in chunks])
+    assert len(np.unique(customer_ids)) == len(customer_ids)
+    assert set(np.concatenate([chunk["unit_id"].to_numpy() for chunk in chunks])) <= set(base_units.index)
+
+def test_write_data_stream_partitioned_dataset(base_config, tmp_path):
+    """Tests that the streamed dataset is written as readable GeoParquet parts."""
+    base_config.distribution_config = NeymanScottConfig(
+        parent_intensity=0.5,
+        offspring_per_parent=10,
+        offspring_radius=1.0
+    )
+
+    summary = write_data_stream(base_config, tmp_path, chunk_size=200)
+
+    parts = sorted((tmp_path / "customers").glob("part-*.parquet"))
+    assert len(parts) == summary["num_chunks"] > 1
+    customers = pd.concat([gpd.read_parquet(part) for part in parts], ignore_index=True)
+    assert len(customers) == summary["num_customers"]
+    assert gpd.read_parquet(summary["base_units_path"])["unit_id"].is_unique
+
+def test_voronoi_units_tile_bounding_box():
+    """Tests that the Voronoi units exactly cover the bounding box without overlaps."""
+    config = VoronoiConfig(num_units=500, bounding_box=(10, 20, 60, 50))
+    units = _generate_voronoi_units(config, np.random.default_rng(0))
+
+    assert len(units) == 500
+    assert list(units["unit_id"]) == list(range(500))
+    # Planar areas of the raw geometries, the units live in a synthetic coordinate space
+    assert sum(geom.area for geom in units.geometry) == pytest.approx(50 * 30)
+    assert units.union_all().area == pytest.approx(50 * 30)
+
+def test_kdtree_assignment_matches_sjoin():
+    """Tests that nearest-seed assignment agrees with the polygon join for Voronoi units."""
+    rng = np.random.default_rng(1)
+    units = _generate_voronoi_units(VoronoiConfig(num_units=200, bounding_box=(0, 0, 10, 10)), rng)
+    xy = rng.uniform(0, 10, size=(2000, 2))
+    customers = gpd.GeoDataFrame(geometry=gpd.points_from_xy(xy[:, 0], xy[:, 1]), crs="EPSG:4326")
+
+    by_kdtree = _assign_units_to_points(customers, units, method="kdtree")
+    by_sjoin = _assign_units_to_points(customers, units, method="sjoin")
+
+    assert len(by_kdtree) == len(by_sjoin) == 2000
+    assert (by_kdtree["unit_id"].to_numpy() == by_sjoin["unit_id"].to_numpy()).all()
+
+def test_kdtree_assignment_boundary_and_outside_points():
+    """Tests deterministic handling of equidistant and out-of-extent customers."""
+    units = gpd.GeoDataFrame({
+        "unit_id": [0, 1],
+        "seed_x": [3.0, 1.0],
+        "seed_y": [1.0, 1.0],
+    }, geometry=[Polygon([(2, 0), (4, 0), (4, 2), (2, 2)]), Polygon([(0, 0), (2, 0), (2, 2), (0, 2)])])
+    customers = gpd.GeoDataFrame(geometry=[Point(2, 1), Point(5, 1), Point(0.5, 0.5)])
+
+    assigned = _assign_units_to_points(customers, units)
+
+    assert list(assigned["unit_id"]) == [0, 1]
+    assert list(assigned["customer_id"]) == [0, 1]
+
+def test_kdtree_assignment_requires_seeds():
+    """Tests that the KD-tree method refuses unit layers without seeds."""
+    units = gpd.GeoDataFrame({"unit_id": [0]}, geometry=[Polygon([(0, 0), (1, 0), (1, 1)])])
+    customers = gpd.GeoDataFrame(geometry=[Point(0.5, 0.2)])
+    with pytest.raises(ValueError, match="seed_x"):
+        _assign_units_to_points(customers, units, method="kdtree")
+
+def test_batch_generation_is_independent_of_worker_count(base_config):
+    """Tests that batch results do not depend on the number of worker processes."""
+    configs = []
+    for seed in (1, 2, 3):
+        config = DataGeneratorConfig(
+            voronoi_config=base_config.voronoi_config,
+            random_seed=seed,
+            distribution_config=HomogeneousPoissonConfig(intensity=0.5),
+        )
+        configs.append(config)
+
+    serial = generate_data_batch(configs, max_workers=1)
+    parallel = generate_data_batch(configs, max_workers=2)
+
+    for (units_a, customers_a), (units_b, customers_b) in zip(serial, parallel):
+        assert units_a.equals(units_b)
+        assert customers_a.equals(customers_b)
+    # The default seeding matches a standalone call
+    assert serial[0][1].equals(generate_data(configs[0])[1])
+
+def test_batch_base_seed_gives_independent_streams(base_config):
+    """Tests that a base seed decorrelates scenarios that share a random_seed."""
+    base_config.distribution_config = HomogeneousPoissonConfig(intensity=0.5)
+
+    (_, customers_a), (_, customers_b) = generate_data_batch(
+        [base_config, base_config], max_workers=1, base_seed=7
+    )
+
+    assert not customers_a.equals(customers_b)
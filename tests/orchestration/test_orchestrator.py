@@ -0,0 +1,224 @@
+# -*- coding: utf-8 -*-
+"""
+Unit tests for the orchestrator module.
+"""
+
+import json
+
+import numpy as np
+import pytest
+import shapely
+import yaml
+
+import src.orchestration.orchestrator as orchestrator
+from src.common.schemas import (
+    ContiguityMethod,
+    DataGeneratorConfig,
+    HomogeneousPoissonConfig,
+    NeymanScottConfig,
+    VoronoiConfig,
+)
+from src.data_processing.synthetic_generator import generate_data
+from src.orchestration.orchestrator import (
+    _attach_graph,
+    _share_graph,
+    load_sweep_config,
+    run_sweep,
+    start_sweep,
+)
+from src.orchestration.result_store import ExperimentStore
+from src.tap.graph_builder import build_graph
+
+# --- Fixtures ---
+
+@pytest.fixture
+def sweep():
+    """Returns a small sweep of two scenarios, two algorithms (one invalid for the data) and two seeds."""
+    return {
+        "name": "small",
+        "seeds": [1, 2],
+        "scenarios": [
+            {
+                "name": "uniform",
+                "data_generator_config": {
+                    "voronoi_config": {"num_units": 300},
+                    "distribution_config": {"type": "homogeneous_poisson", "intensity": 3},
+                    "random_seed": 3,
+                },
+                "graph_builder_config": {"contiguity_method": "rook"},
+            },
+            {
+                "name": "clustered",
+                "data_generator_config": {
+                    "voronoi_config": {"num_units": 200},
+                    "distribution_config": {
+                        "type": "neyman_scott",
+                        "parent_intensity": 0.002,
+                        "offspring_per_parent": 50,
+                        "offspring_radius": 5,
+                    },
+                },
+            },
+        ],
+        "algorithms": [
+            {"name": "sales", "type": "multilevel", "params": {"num_partitions": 5, "balance_metric": "total_sales_potential"}},
+            {"name": "too_many", "type": "multilevel", "params": {"num_partitions": 1000}},
+        ],
+    }
+
+@pytest.fixture
+def store(tmp_path):
+    """Returns an empty experiment store."""
+    return ExperimentStore(tmp_path / "experiments")
+
+# --- Test Cases ---
+
+def test_load_sweep_config_from_yaml(sweep, tmp_path):
+    """Tests that a YAML sweep is parsed into the config dataclasses."""
+    path = tmp_path / "sweep.yaml"
+    path.write_text(yaml.safe_dump(sweep), encoding="utf-8")
+
+    config = load_sweep_config(path)
+
+    assert config.seeds == [1, 2]
+    uniform, clustered = config.scenarios
+    assert uniform.graph_builder_config.contiguity_method == ContiguityMethod.ROOK
+    assert uniform.data_generator_config.voronoi_config.num_units == 300
+    assert isinstance(clustered.data_generator_config.distribution_config, NeymanScottConfig)
+    assert config.algorithms[0].params["balance_metric"] == "total_sales_potential"
+
+@pytest.mark.parametrize(
+    "change, message",
+    [
+        (lambda s: s["algorithms"][0].update(type="skater"), "Unknown algorithm type"),
+        (lambda s: s["algorithms"][0]["params"].update(tolerance=0.1), "Unknown MultilevelPartitionerConfig fields"),
+        (lambda s: s["scenarios"][0]["data_generator_config"]["distribution_config"].update(type="grid"), "distribution"),
+        (lambda s: s["scenarios"][1].update(name="uniform"), "Duplicate scenario names"),
+        (lambda s: s.update(seeds=[]), "at least one"),
+    ],
+)
+def test_load_sweep_config_rejects_invalid(sweep, change, message):
+    """Tests that configuration errors are reported before any work starts."""
+    change(sweep)
+    with pytest.raises(ValueError, match=message):
+        load_sweep_config(sweep)
+
+def test_shared_graph_roundtrip(tmp_path):
+    """Tests that workers see the same graph through memory-mapped arrays."""
+    graph = build_graph(*generate_data(DataGeneratorConfig(
+        voronoi_config=VoronoiConfig(num_units=100),
+        distribution_config=HomogeneousPoissonConfig(intensity=2),
+    )))
+    _share_graph(graph, tmp_path / "graph")
+
+    attached = _attach_graph(str(tmp_path / "graph"))
+
+    assert isinstance(attached.total_workload, np.memmap)
+    assert (attached.adjacency != graph.adjacency).nnz == 0
+    np.testing.assert_array_equal(attached.unit_ids, graph.unit_ids)
+    np.testing.assert_array_equal(attached.customers, graph.customers)
+    assert shapely.equals(attached.geometry, graph.geometry).all()
+    assert _attach_graph(str(tmp_path / "graph")) is attached
+
+def test_run_sweep_records_every_run(sweep, store, tmp_path):
+    """Tests a serial sweep: every run is recorded, failures do not stop the sweep."""
+    experiment_id = run_sweep(sweep, store, n_jobs=1, scratch_dir=tmp_path)
+
+    results = store.get_results(experiment_id)
+    assert (results["status"], results["total_runs"], results["failed_runs"]) == ("completed", 8, 4)
+    for record in results["results"]:
+        if record["algorithm"] == "too_many":
+            assert record["status"] == "failed" and "territories" in record["error"]
+            continue
+        assert record["status"] == "completed"
+        assert record["evaluation"]["summary"]["num_partitions"] == 5
+        labels = store.load_labels(experiment_id, record["run_id"])
+        assert sorted(np.unique(labels)) == list(range(5))
+    # The shared arrays are removed with the sweep
+    assert not any(path.name.startswith("tap-sweep-") for path in tmp_path.iterdir())
+
+def test_seeds_regenerate_each_scenario(sweep, store, monkeypatch):
+    """Tests that every seed replicate samples new data, and that a None seed keeps the scenario's own."""
+    generated = []
+    generate_data_batch = orchestrator.generate_data_batch
+
+    def spy(configs, **kwargs):
+        generated.extend((config.voronoi_config.num_units, config.random_seed) for config in configs)
+        return generate_data_batch(configs, **kwargs)
+
+    monkeypatch.setattr(orchestrator, "generate_data_batch", spy)
+    sweep["algorithms"] = sweep["algorithms"][:1]
+    run_sweep(sweep, store, n_jobs=1)
+    assert generated == [(300, 1), (300, 2), (200, 1), (200, 2)]
+
+    generated.clear()
+    sweep["seeds"] = [None]
+    run_sweep(sweep, store, n_jobs=1)
+    assert generated == [(300, 3), (200, 42)]
+
+def test_runs_carry_instrumentation(sweep, store, tmp_path):
+    """Tests that every run record holds its stage report and that the sweep exports as a Chrome trace."""
+    sweep["algorithms"] = sweep["algorithms"][:1]
+    experiment_id = run_sweep(sweep, store, n_jobs=1, trace_memory=True)
+
+    records = store.get_results(experiment_id)["results"]
+    for record in records:
+        report = record["instrumentation"]
+        assert report["name"] == record["run_id"]
+        assert {"attach_graph", "partition", "coarsen", "refine", "evaluate"} <= set(report["stages"])
+        assert report["spans"]["children"][1]["attributes"]["num_units"] in (300, 200)
+        assert report["stages"]["partition"]["max_peak_memory_bytes"] > 0
+
+    trace = json.loads(store.export_chrome_trace(experiment_id, tmp_path / "sweep.trace.json").read_text())
+    spans = [event for event in trace["traceEvents"] if event["ph"] == "X"]
+    assert sum(event["name"] == "partition" for event in spans) == len(records)
+
+def test_parallel_sweep_matches_serial(sweep, store):
+    """Tests that the process pool gives the same labels as a serial sweep."""
+    sweep["algorithms"] = sweep["algorithms"][:1]
+    serial = run_sweep(sweep, store, n_jobs=1)
+    parallel = run_sweep(sweep, store, n_jobs=2)
+
+    for run in store.get_results(serial)["manifest"]["runs"]:
+        np.testing.assert_array_equal(
+            store.load_labels(serial, run["run_id"]), store.load_labels(parallel, run["run_id"])
+        )
+
+def test_start_sweep_is_queryable_immediately(sweep, store):
+    """Tests that a started sweep is listed at once and completes in the background."""
+    sweep["algorithms"] = sweep["algorithms"][:1]
+    experiment_id, thread = start_sweep(sweep, store, n_jobs=1)
+
+    assert store.list_experiments()[0]["experiment_id"] == experiment_id
+    assert store.get_results(experiment_id)["total_runs"] == 4
+    thread.join()
+    assert store.get_results(experiment_id)["status"] == "completed"
+
+def test_background_sweep_uses_forkserver_workers(sweep, store, monkeypatch):
+    """Tests that a sweep running in a background thread does not fork its workers."""
+    contexts = []
+    worker_context = orchestrator._worker_context
+
+    def spy():
+        contexts.append(worker_context())
+        return contexts[-1]
+
+    monkeypatch.setattr(orchestrator, "_worker_context", spy)
+    sweep["algorithms"] = sweep["algorithms"][:1]
+
+    experiment_id, thread = start_sweep(sweep, store, n_jobs=2)
+    thread.join()
+
+    results = store.get_results(experiment_id)
+    assert (results["status"], results["failed_runs"]) == ("completed", 0)
+    assert contexts and {context.get_start_method() for context in contexts} == {"forkserver"}
+
+def test_aborted_sweep_is_closed(sweep, store):
+    """Tests that a sweep failing before its runs records every run as failed."""
+    sweep["scenarios"][0]["data_generator_config"]["sampling_config"] = {"source_filepath": "missing.csv"}
+
+    experiment_id = run_sweep(sweep, store, n_jobs=1)
+
+    results = store.get_results(experiment_id)
+    assert (results["status"], results["failed_runs"]) == ("completed", 8)
+    assert all(record["error"].startswith("Sweep aborted") for record in results["results"])
@@ -0,0 +1,72 @@
+# -*- coding: utf-8 -*-
+"""
+Unit tests for the result_store module.
+"""
+
+import numpy as np
+import pytest
+
+from src.orchestration.result_store import ExperimentStore
+
+# --- Fixtures ---
+
+@pytest.fixture
+def store(tmp_path):
+    """Returns an empty experiment store."""
+    return ExperimentStore(tmp_path / "experiments")
+
+@pytest.fixture
+def runs():
+    """Returns two planned runs."""
+    return [
+        {"run_id": "run-0000", "scenario": "s", "algorithm": "a", "seed": 1},
+        {"run_id": "run-0001", "scenario": "s", "algorithm": "a", "seed": 2},
+    ]
+
+# --- Test Cases ---
+
+def test_results_are_visible_while_running(store, runs):
+    """Tests that records can be queried as they are appended."""
+    experiment_id = store.create_experiment("sweep", {"name": "sweep"}, runs)
+    assert store.get_results(experiment_id)["status"] == "running"
+    assert store.get_results(experiment_id)["results"] == []
+
+    store.append_result(experiment_id, dict(runs[0], status="completed"), labels=np.array([0, 1, 1]))
+    summary = store.list_experiments()[0]
+    assert (summary["experiment_id"], summary["finished_runs"], summary["status"]) == (experiment_id, 1, "running")
+
+    store.append_result(experiment_id, dict(runs[1], status="failed", error="boom"))
+    results = store.get_results(experiment_id)
+    assert (results["status"], results["failed_runs"]) == ("completed", 1)
+    assert [record["run_id"] for record in results["results"]] == ["run-0000", "run-0001"]
+    assert results["manifest"]["runs"] == runs
+    np.testing.assert_array_equal(store.load_labels(experiment_id, "run-0000"), [0, 1, 1])
+    with pytest.raises(KeyError):
+        store.load_labels(experiment_id, "run-0001")
+
+def test_partial_line_is_ignored(store, runs):
+    """Tests that a line still being written is not returned."""
+    experiment_id = store.create_experiment("sweep", {}, runs)
+    store.append_result(experiment_id, dict(runs[0], status="completed"))
+    with open(store.root_dir / experiment_id / "results.jsonl", "a", encoding="utf-8") as f:
+        f.write('{"run_id": "run-00')
+
+    assert len(store.get_results(experiment_id)["results"]) == 1
+
+def test_lists_newest_first(store, runs):
+    """Tests the experiment listing order and an empty store."""
+    assert ExperimentStore(store.root_dir / "missing").list_experiments() == []
+    first = store.create_experiment("first", {}, runs)
+    second = store.create_experiment("second", {}, runs)
+
+    assert [summary["experiment_id"] for summary in store.list_experiments()] == [second, first]
+
+def test_rejects_unknown_and_invalid_ids(store, runs):
+    """Tests that ids from URLs cannot escape the store directory."""
+    with pytest.raises(KeyError):
+        store.get_results("20250101-000000-deadbeef")
+    with pytest.raises(ValueError, match="Invalid experiment id"):
+        store.get_results("../secrets")
+    experiment_id = store.create_experiment("sweep", {}, runs)
+    with pytest.raises(ValueError, match="Invalid run id"):
+        store.append_result(experiment_id, {"run_id": "../x"}, labels=np.zeros(2))
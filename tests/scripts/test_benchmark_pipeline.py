@@ -0,0 +1,87 @@
+# -*- coding: utf-8 -*-
+"""
+Unit tests for the pipeline benchmark suite and its regression gate.
+"""
+
+import osmnx as ox
+import pytest
+from shapely.geometry import box
+
+from scripts.benchmark_pipeline import BENCHMARKS, Benchmark, case_id, find_regressions, main, offline_osm, run_suite
+
+# --- Helpers ---
+
+def _result(params, seconds, peak_memory_bytes, tracked=True):
+    return {
+        "id": case_id("bench", params),
+        "benchmark": "bench",
+        "params": params,
+        "tracked": tracked,
+        "time_threshold": 0.25,
+        "memory_threshold": 0.25,
+        "seconds": seconds,
+        "peak_memory_bytes": peak_memory_bytes,
+    }
+
+# --- Test Cases ---
+
+def test_find_regressions():
+    """Tests that only tracked cases beyond both the relative threshold and the noise margin regress."""
+    mib = 1024 ** 2
+    baseline = {"results": [
+        _result({"n": 1}, 1.0, 100 * mib),
+        _result({"n": 2}, 1.0, 100 * mib),
+        _result({"n": 3}, 0.001, 0.1 * mib),
+        _result({"n": 4}, 1.0, 100 * mib),
+    ]}
+    results = {"results": [
+        _result({"n": 1}, 1.2, 120 * mib),                # Within the thresholds
+        _result({"n": 2}, 1.5, 200 * mib),                # Slower and larger
+        _result({"n": 3}, 0.003, 0.5 * mib),              # Relatively worse, but below the noise margins
+        _result({"n": 4}, 9.0, 900 * mib, tracked=False),
+        _result({"n": 5}, 9.0, 900 * mib),                # Not in the baseline
+    ]}
+
+    regressions = find_regressions(results, baseline)
+
+    assert len(regressions) == 2
+    assert all(message.startswith("bench[n=2]") for message in regressions)
+    assert "seconds" in regressions[0] and "peak_memory_bytes" in regressions[1]
+
+@pytest.mark.parametrize("repeats", ["0", "-1"])
+def test_repeats_below_one_are_rejected(repeats, monkeypatch, capsys):
+    """Tests that the command line rejects a repeat count without timed runs before any setup runs."""
+    monkeypatch.setattr("sys.argv", ["benchmark_pipeline.py", "--repeats", repeats])
+
+    with pytest.raises(SystemExit):
+        main()
+    assert "must be at least 1" in capsys.readouterr().err
+
+def test_offline_osm_refuses_unknown_requests(tmp_path):
+    """Tests that requests without a fixture fail instead of reaching the network."""
+    with offline_osm(tmp_path):
+        with pytest.raises(RuntimeError, match="Offline"):
+            ox.geocode_to_gdf("Berlin")
+        with pytest.raises(RuntimeError, match="Offline"):
+            ox.graph_from_polygon(box(0, 0, 1, 1))
+
+def test_run_suite_offline():
+    """Tests a small run of the OSM cache benchmarks without network access."""
+    small = {
+        "osm_boundary_cache_load": {"num_polygons": 50},
+        "osm_road_network_cache_load": {"grid_size": 5, "as_csr": True},
+        "osm_read_layer": {"num_features": 200, "bbox_fraction": 0.5},
+    }
+    benchmarks = [
+        Benchmark(benchmark.name, benchmark.setup, {"quick": [small[benchmark.name]]}, time_threshold=0.5)
+        for benchmark in BENCHMARKS if benchmark.name in small
+    ]
+
+    results = run_suite(benchmarks, profile="quick", repeats=1)
+
+    assert [result["benchmark"] for result in results["results"]] == list(small)
+    for result in results["results"]:
+        assert result["seconds"] > 0 and result["peak_memory_bytes"] > 0
+    assert results["results"][1]["time_threshold"] == 0.5
+    assert results["results"][0]["memory_threshold"] == 0.25
+    assert find_regressions(results, results) == []
@@ -0,0 +1,266 @@
+# -*- coding: utf-8 -*-
+"""
+Unit tests for the alignment module.
+"""
+
+import copy
+
+import networkx as nx
+import numpy as np
+import pandas as pd
+import pytest
+import scipy.sparse as sp
+from scipy.sparse.csgraph import connected_components
+
+from src.common.instrumentation import instrument
+from src.common.schemas import (
+    BalanceMetric,
+    DataGeneratorConfig,
+    HomogeneousPoissonConfig,
+    IncrementalAlignmentConfig,
+    MultilevelPartitionerConfig,
+    VoronoiConfig,
+)
+from src.data_processing.synthetic_generator import generate_data
+from src.tap.alignment import (
+    MultilevelPartitioner,
+    _LocalBalancer,
+    _rebalance,
+    _repair_contiguity,
+    realign_incremental,
+)
+from src.tap.graph_builder import CustomerDelta, build_graph
+from src.tap.partitioner import TerritoryPartitioner
+
+# --- Helpers ---
+
+def _grid_adjacency(rows: int, cols: int) -> sp.csr_matrix:
+    """Returns the rook adjacency of a rows x cols grid with unit weights."""
+    return nx.to_scipy_sparse_array(nx.grid_2d_graph(rows, cols), format="csr", dtype=np.float64)
+
+def _pieces_per_part(adjacency: sp.spmatrix, labels: np.ndarray) -> np.ndarray:
+    """Returns the number of connected pieces of every territory."""
+    coo = sp.coo_matrix(adjacency)
+    inside = labels[coo.row] == labels[coo.col]
+    induced = sp.csr_matrix((np.ones(inside.sum()), (coo.row[inside], coo.col[inside])), shape=adjacency.shape)
+    _, piece = connected_components(induced, directed=False)
+    return np.array([len(np.unique(piece[labels == part])) for part in range(labels.max() + 1)])
+
+# --- Fixtures ---
+
+@pytest.fixture(scope="module")
+def territory_graph():
+    """Returns the territory graph of a generated 2000-unit Voronoi scenario."""
+    config = DataGeneratorConfig(
+        voronoi_config=VoronoiConfig(num_units=2000),
+        distribution_config=HomogeneousPoissonConfig(intensity=20),
+        random_seed=5,
+    )
+    base_units, customers = generate_data(config)
+    return build_graph(base_units, customers)
+
+@pytest.fixture
+def aligned_graph(territory_graph):
+    """Returns a private copy of the territory graph and a balanced 12-territory alignment of it."""
+    graph = copy.deepcopy(territory_graph)
+    labels = MultilevelPartitioner().partition_territory_graph(
+        graph, MultilevelPartitionerConfig(num_partitions=12, seed=1)
+    )
+    return graph, labels
+
+def _hotspot_delta(graph, labels, part: int, workload: float) -> CustomerDelta:
+    """Returns a delta adding customers with the given total workload to the units of one territory."""
+    units = graph.unit_ids[labels == part][:5]
+    return CustomerDelta(added=pd.DataFrame({
+        "unit_id": np.repeat(units, 10),
+        "sales_potential": 1000.0,
+        "workload": workload / (10 * len(units)),
+    }))
+
+# --- Test Cases ---
+
+def test_implements_partitioner_interface():
+    """Tests that the engine plugs into the common partitioner interface."""
+    assert isinstance(MultilevelPartitioner(), TerritoryPartitioner)
+
+@pytest.mark.parametrize("metric", list(BalanceMetric))
+def test_balanced_and_contiguous(territory_graph, metric):
+    """Tests balance within the tolerance and contiguity on a Voronoi scenario."""
+    config = MultilevelPartitionerConfig(num_partitions=12, balance_metric=metric, seed=1)
+    labels = MultilevelPartitioner().partition_territory_graph(territory_graph, config)
+
+    weights = getattr(territory_graph, metric.value)
+    part_weights = np.bincount(labels, weights=weights, minlength=12)
+    assert sorted(np.unique(labels)) == list(range(12))
+    assert np.abs(part_weights / part_weights.mean() - 1).max() <= config.balance_tolerance
+    assert (_pieces_per_part(territory_graph.adjacency, labels) == 1).all()
+
+def test_cut_is_small_on_grid():
+    """Tests that a grid is split into compact blocks rather than ragged regions."""
+    adjacency = _grid_adjacency(40, 40)
+    config = MultilevelPartitionerConfig(num_partitions=4, seed=0)
+    labels = MultilevelPartitioner().partition_arrays(adjacency, np.ones(1600), config)
+
+    coo = adjacency.tocoo()
+    cut = (labels[coo.row] != labels[coo.col]).sum() // 2
+    # Two straight lines cut 80 edges
+    assert cut <= 120
+    assert (np.bincount(labels) >= 0.95 * 400).all()
+    assert (_pieces_per_part(adjacency, labels) == 1).all()
+
+def test_reproducible_with_seed(territory_graph):
+    """Tests that the same seed gives the same partition."""
+    config = MultilevelPartitionerConfig(num_partitions=8, seed=42)
+    first = MultilevelPartitioner().partition_territory_graph(territory_graph, config)
+    second = MultilevelPartitioner().partition_territory_graph(territory_graph, config)
+    np.testing.assert_array_equal(first, second)
+
+def test_partition_networkx_graph_in_place(territory_graph):
+    """Tests the DDR_04 interface on a networkx graph."""
+    graph = territory_graph.to_networkx()
+    config = MultilevelPartitionerConfig(num_partitions=5, seed=3)
+
+    result = MultilevelPartitioner().partition(graph, config)
+
+    assert result is graph
+    labels = {node: data["partition_id"] for node, data in graph.nodes(data=True)}
+    assert set(labels.values()) == set(range(5))
+    for part in range(5):
+        assert nx.is_connected(graph.subgraph([node for node, label in labels.items() if label == part]))
+
+def test_disconnected_components():
+    """Tests that components get their own territories and too few territories are rejected."""
+    adjacency = sp.block_diag([_grid_adjacency(10, 10), _grid_adjacency(10, 30)]).tocsr()
+    weights = np.ones(400)
+
+    labels = MultilevelPartitioner().partition_arrays(
+        adjacency, weights, MultilevelPartitionerConfig(num_partitions=4, seed=0)
+    )
+    assert len(np.unique(labels[:100])) == 1
+    assert len(np.unique(labels[100:])) == 3
+    assert not set(labels[:100]) & set(labels[100:])
+
+    with pytest.raises(ValueError, match="contiguous"):
+        MultilevelPartitioner().partition_arrays(adjacency, weights, MultilevelPartitionerConfig(num_partitions=1))
+
+def test_zero_weight_edges_keep_adjacency():
+    """Tests that explicit zero-weight edges still connect units."""
+    path = sp.csr_matrix(
+        (np.zeros(6), ([0, 1, 1, 2, 2, 3], [1, 0, 2, 1, 3, 2])), shape=(4, 4)
+    )
+    labels = MultilevelPartitioner().partition_arrays(
+        path, np.ones(4), MultilevelPartitionerConfig(num_partitions=2, balance_tolerance=0.0, seed=0)
+    )
+    assert sorted(labels.tolist()) == [0, 0, 1, 1]
+    assert labels[0] == labels[1] and labels[2] == labels[3]
+
+def test_repair_contiguity():
+    """Tests that stray pieces join their strongest neighbouring territory."""
+    adjacency = _grid_adjacency(1, 6)
+    labels = np.array([0, 0, 1, 0, 1, 1])
+
+    repaired = _repair_contiguity(adjacency, labels)
+
+    # Unit 2 is surrounded by territory 0 and unit 3 by territory 1
+    np.testing.assert_array_equal(repaired, [0, 0, 0, 1, 1, 1])
+
+def test_repair_contiguity_over_several_rounds():
+    """Tests that pieces cut off from their main piece by other strays are repaired in later rounds."""
+    adjacency = _grid_adjacency(20, 20)
+    labels = np.random.default_rng(0).integers(0, 4, 400)
+
+    with instrument() as recording:
+        repaired = _repair_contiguity(adjacency, labels)
+
+    assert recording.report()["spans"]["attributes"]["rounds"] > 1
+    assert sorted(np.unique(repaired)) == [0, 1, 2, 3]
+    assert (_pieces_per_part(adjacency, repaired) == 1).all()
+
+def test_rebalance_moves_weight_through_territories():
+    """Tests that excess weight crosses a territory that is already balanced."""
+    adjacency = _grid_adjacency(1, 30)
+    labels = np.repeat([0, 1, 2], [13, 10, 7])
+
+    rebalanced = _rebalance(adjacency, np.ones(30), labels, 3, (9.5, 10.5), max_rounds=10)
+
+    np.testing.assert_array_equal(rebalanced, np.repeat([0, 1, 2], 10))
+
+def test_lumpy_weights_are_rebalanced():
+    """Tests balance when few customers make unit weights too lumpy for pairwise refinement alone."""
+    config = DataGeneratorConfig(
+        voronoi_config=VoronoiConfig(num_units=2000),
+        distribution_config=HomogeneousPoissonConfig(intensity=0.1),
+        random_seed=1,
+    )
+    graph = build_graph(*generate_data(config))
+    partitioner_config = MultilevelPartitionerConfig(num_partitions=60, seed=0)
+
+    with instrument() as recording:
+        labels = MultilevelPartitioner().partition_territory_graph(graph, partitioner_config)
+
+    assert "rebalance" in recording.report()["stages"]
+    part_weights = np.bincount(labels, weights=graph.total_workload, minlength=60)
+    assert np.abs(part_weights / part_weights.mean() - 1).max() <= partitioner_config.balance_tolerance
+    assert (_pieces_per_part(graph.adjacency, labels) == 1).all()
+
+def test_rejects_invalid_config(territory_graph):
+    """Tests config validation."""
+    partitioner = MultilevelPartitioner()
+    with pytest.raises(ValueError, match="at least 1"):
+        partitioner.partition_territory_graph(territory_graph, MultilevelPartitionerConfig(num_partitions=0))
+    with pytest.raises(ValueError, match="territories"):
+        partitioner.partition_territory_graph(territory_graph, MultilevelPartitionerConfig(num_partitions=5000))
+
+def test_realign_incremental_restores_balance(aligned_graph):
+    """Tests that a local repair rebalances after a hotspot of new customers."""
+    graph, labels = aligned_graph
+    average = graph.total_workload.sum() / 12
+    delta = _hotspot_delta(graph, labels, part=3, workload=0.2 * average)
+
+    result = realign_incremental(graph, labels, delta, IncrementalAlignmentConfig(max_moved_units=500))
+
+    assert result.balanced
+    part_weights = np.bincount(result.labels, weights=graph.total_workload, minlength=12)
+    assert np.abs(part_weights / part_weights.mean() - 1).max() <= 0.05
+    assert (_pieces_per_part(graph.adjacency, result.labels) == 1).all()
+    assert len(result.affected_units) == 5
+    # Only a small part of the 2000 units changed territory
+    assert 0 < len(result.moved_units) < 200
+    np.testing.assert_array_equal(np.flatnonzero(result.labels != labels), result.moved_units)
+
+def test_realign_incremental_respects_move_budget(aligned_graph):
+    """Tests that at most max_moved_units units change territory."""
+    graph, labels = aligned_graph
+    average = graph.total_workload.sum() / 12
+    delta = _hotspot_delta(graph, labels, part=3, workload=0.5 * average)
+
+    result = realign_incremental(graph, labels, delta, IncrementalAlignmentConfig(max_moved_units=3))
+
+    assert len(result.moved_units) <= 3
+    assert not result.balanced
+    assert (_pieces_per_part(graph.adjacency, result.labels) == 1).all()
+
+def test_local_balancer_tracks_territory_members(aligned_graph):
+    """Tests that the per-territory member sets used for border queries follow every move."""
+    graph, labels = aligned_graph
+    weights = graph.total_workload.copy()
+    weights[np.flatnonzero(labels == 3)[:5]] += 0.05 * weights.sum() / 12
+    average = weights.sum() / 12
+    balancer = _LocalBalancer(graph.adjacency, weights, labels.copy(), 12, (0.95 * average, 1.05 * average))
+
+    rebalanced = balancer.run(max_moved_units=200)
+
+    assert balancer.touched
+    for part in range(12):
+        assert balancer.members[part] == set(np.flatnonzero(rebalanced == part).tolist())
+
+def test_realign_incremental_without_imbalance(aligned_graph):
+    """Tests that a small delta that keeps every territory in bounds moves nothing."""
+    graph, labels = aligned_graph
+    removed = pd.DataFrame({"unit_id": [graph.unit_ids[0]], "sales_potential": [0.0], "workload": [0.0]})
+
+    result = realign_incremental(graph, labels, CustomerDelta(removed=removed))
+
+    assert result.balanced
+    assert len(result.moved_units) == 0
+    np.testing.assert_array_equal(result.labels, labels)
@@ -0,0 +1,153 @@
+# -*- coding: utf-8 -*-
+"""
+Unit tests for the evaluator module.
+"""
+
+import geopandas as gpd
+import numpy as np
+import pandas as pd
+import pytest
+import shapely
+from shapely.geometry import box
+
+from src.common.schemas import DataGeneratorConfig, HomogeneousPoissonConfig, MultilevelPartitionerConfig, VoronoiConfig
+from src.data_processing.synthetic_generator import generate_data
+from src.tap.alignment import MultilevelPartitioner
+from src.tap.evaluator import PartitionEvaluator, evaluate_partitions
+from src.tap.graph_builder import build_graph
+
+# --- Fixtures ---
+
+@pytest.fixture
+def grid_graph():
+    """Returns the rook graph of a 4x4 grid of unit squares with one customer per unit in the left half."""
+    cells = [box(col, row, col + 1, row + 1) for row in range(4) for col in range(4)]
+    units = gpd.GeoDataFrame({"unit_id": np.arange(16)}, geometry=cells)
+    left = [unit for unit in range(16) if unit % 4 < 2]
+    customers = pd.DataFrame({"unit_id": left, "sales_potential": 10.0, "workload": 1.0})
+    return build_graph(units, customers)
+
+@pytest.fixture(scope="module")
+def voronoi_alignment():
+    """Returns a 400-unit Voronoi territory graph and an 8-territory alignment of it."""
+    config = DataGeneratorConfig(
+        voronoi_config=VoronoiConfig(num_units=400),
+        distribution_config=HomogeneousPoissonConfig(intensity=20),
+        random_seed=2,
+    )
+    graph = build_graph(*generate_data(config))
+    labels = MultilevelPartitioner().partition_territory_graph(
+        graph, MultilevelPartitionerConfig(num_partitions=8, seed=0)
+    )
+    return graph, labels
+
+# --- Test Cases ---
+
+def test_bulk_metrics_on_grid(grid_graph):
+    """Tests balance, compactness and contiguity of two 2x4 halves of a grid."""
+    labels = np.arange(16) % 4 // 2
+    evaluator = PartitionEvaluator(grid_graph, labels)
+
+    np.testing.assert_allclose(evaluator.part_weights, [8, 0])
+    np.testing.assert_allclose(evaluator.polsby_popper, 4 * np.pi * 8 / 12 ** 2)
+    np.testing.assert_array_equal(evaluator.part_pieces, [1, 1])
+
+    report = evaluator.report()
+    assert report["balance_metrics"]["customers"] == {
+        "min": 0.0, "max": 8.0, "mean": 4.0, "std_dev": 4.0, "imbalance_ratio": 2.0,
+    }
+    assert report["summary"]["disconnected_partitions"] == []
+    assert report["contiguity_metrics"]["enclaves"] == []
+
+def test_contiguity_and_enclaves(grid_graph):
+    """Tests that a split territory and a surrounded unit are reported."""
+    labels = np.zeros(16, dtype=int)
+    labels[[5, 12, 15]] = 1
+
+    report = PartitionEvaluator(grid_graph, labels).report(part_names=["A", "B"])
+
+    assert report["contiguity_metrics"]["disconnected_partitions"] == {"B": {"num_subgraphs": 3}}
+    assert report["summary"]["enclaves_detected"] == 3
+    assert {"node_id": 5, "original_partition": "B", "surrounded_by": "A"} in report["contiguity_metrics"]["enclaves"]
+
+def test_polsby_popper_matches_dissolve(voronoi_alignment):
+    """Tests the arithmetic dissolve against shapely unions of the territories."""
+    graph, labels = voronoi_alignment
+    evaluator = PartitionEvaluator(graph, labels)
+
+    for part in range(8):
+        territory = shapely.union_all(graph.geometry[labels == part])
+        expected = 4 * np.pi * territory.area / territory.length ** 2
+        assert evaluator.polsby_popper[part] == pytest.approx(expected, rel=1e-9)
+
+def test_move_deltas_match_recomputation(voronoi_alignment):
+    """Tests that every delta, including territory splits and merges, matches a fresh evaluation."""
+    graph, labels = voronoi_alignment
+    evaluator = PartitionEvaluator(graph, labels)
+    rng = np.random.default_rng(0)
+    splits = 0
+
+    for _ in range(150):
+        unit = int(rng.integers(graph.num_units))
+        target = int(rng.choice([part for part in range(8) if part != evaluator.labels[unit]]))
+        before = PartitionEvaluator(graph, evaluator.labels)
+        delta = evaluator.apply_move(unit, target)
+        after = PartitionEvaluator(graph, evaluator.labels, num_partitions=8)
+
+        assert delta.pieces == after.part_pieces.sum() - before.part_pieces.sum()
+        assert delta.polsby_popper == pytest.approx(after.polsby_popper.sum() - before.polsby_popper.sum(), abs=1e-9)
+        expected = ((after.part_weights / after.part_weights.mean() - 1) ** 2).sum() \
+            - ((before.part_weights / before.part_weights.mean() - 1) ** 2).sum()
+        assert delta.squared_deviation == pytest.approx(expected, abs=1e-9)
+        splits += delta.pieces > 0
+
+    np.testing.assert_array_equal(evaluator.part_pieces, after.part_pieces)
+    np.testing.assert_allclose(evaluator.part_perimeter, after.part_perimeter)
+    assert splits > 0
+
+def test_move_delta_does_not_change_state(grid_graph):
+    """Tests that scoring a move leaves the evaluator untouched."""
+    labels = np.arange(16) % 4 // 2
+    evaluator = PartitionEvaluator(grid_graph, labels)
+
+    delta = evaluator.move_delta(1, 1)
+
+    assert (delta.source, delta.target, delta.pieces) == (0, 1, 0)
+    assert (delta.source_weight, delta.target_weight) == (7.0, 1.0)
+    np.testing.assert_array_equal(evaluator.labels, labels)
+    with pytest.raises(ValueError, match="already"):
+        evaluator.move_delta(1, 0)
+    with pytest.raises(ValueError, match="does not exist"):
+        evaluator.move_delta(1, 2)
+
+def test_evaluate_partitions_on_networkx(voronoi_alignment):
+    """Tests the DDR_05 entry point on a networkx graph with named partitions."""
+    graph, labels = voronoi_alignment
+    nx_graph = graph.to_networkx()
+    for unit_id, label in zip(graph.unit_ids.tolist(), labels):
+        nx_graph.nodes[unit_id]["partition_id"] = f"T{label}"
+
+    report = evaluate_partitions(nx_graph)
+
+    assert report["summary"]["num_partitions"] == 8
+    assert report["summary"]["total_nodes"] == 400
+    assert set(report["compactness_metrics"]["polsby_popper"]["values_per_partition"]) == {f"T{p}" for p in range(8)}
+    assert report["summary"]["disconnected_partitions"] == []
+    totals = report["balance_metrics"]["total_workload"]
+    assert totals["mean"] == pytest.approx(graph.total_workload.sum() / 8)
+
+def test_evaluate_partitions_metric_selection(voronoi_alignment):
+    """Tests that compactness can be skipped, in which case no geometry is needed."""
+    graph, labels = voronoi_alignment
+    nx_graph = graph.to_networkx()
+    for unit_id, label in zip(graph.unit_ids.tolist(), labels):
+        nx_graph.nodes[unit_id]["partition_id"] = int(label)
+        del nx_graph.nodes[unit_id]["geometry"]
+
+    report = evaluate_partitions(nx_graph, metrics_to_include=["balance", "contiguity"])
+
+    assert set(report) == {"summary", "balance_metrics", "contiguity_metrics"}
+    with pytest.raises(ValueError, match="geometry"):
+        evaluate_partitions(nx_graph)
+    with pytest.raises(ValueError, match="Unknown metrics"):
+        evaluate_partitions(nx_graph, metrics_to_include=["cut"])
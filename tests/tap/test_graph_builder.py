@@ -0,0 +1,228 @@
+# -*- coding: utf-8 -*-
+"""
+Unit tests for the graph_builder module.
+"""
+
+import geopandas as gpd
+import numpy as np
+import pandas as pd
+import pytest
+from shapely.geometry import Point, box
+
+import src.tap.graph_builder as graph_builder
+from src.common.cache import ResultCache
+from src.common.schemas import (
+    ContiguityMethod,
+    DataGeneratorConfig,
+    GraphBuilderConfig,
+    HomogeneousPoissonConfig,
+    VoronoiConfig,
+    WeightingMethod,
+)
+from src.data_processing.synthetic_generator import generate_data
+from src.tap.graph_builder import CustomerDelta, apply_customer_delta, build_graph
+
+# --- Fixtures ---
+
+@pytest.fixture
+def grid_units():
+    """Returns a 3x3 grid of unit squares with non-sequential unit ids."""
+    cells = [box(col, row, col + 1, row + 1) for row in range(3) for col in range(3)]
+    return gpd.GeoDataFrame({"unit_id": np.arange(9) * 10 + 5}, geometry=cells)
+
+@pytest.fixture
+def grid_customers():
+    """Returns customers in units 5 (two), 45 (one) and one with an unknown unit."""
+    return gpd.GeoDataFrame(
+        {
+            "unit_id": [5, 5, 45, 999],
+            "sales_potential": [10.0, 20.0, 5.0, 100.0],
+            "workload": [1.0, 2.0, 3.0, 100.0],
+        },
+        geometry=[Point(0.2, 0.2), Point(0.8, 0.8), Point(1.5, 1.5), Point(9, 9)],
+    )
+
+# --- Test Cases ---
+
+def test_aggregates_customers_per_unit(grid_units, grid_customers):
+    """Tests that customer counts and sums are aggregated per unit and unknown units are dropped."""
+    graph = build_graph(grid_units, grid_customers)
+
+    np.testing.assert_array_equal(graph.customers, [2, 0, 0, 0, 1, 0, 0, 0, 0])
+    np.testing.assert_allclose(graph.total_sales_potential, [30, 0, 0, 0, 5, 0, 0, 0, 0])
+    np.testing.assert_allclose(graph.total_workload, [3, 0, 0, 0, 3, 0, 0, 0, 0])
+
+@pytest.mark.parametrize(
+    "method, expected_edges, centre_degree",
+    [(ContiguityMethod.QUEEN, 20, 8), (ContiguityMethod.ROOK, 12, 4)],
+)
+def test_contiguity(grid_units, grid_customers, method, expected_edges, centre_degree):
+    """Tests queen and rook adjacency on a regular grid."""
+    graph = build_graph(grid_units, grid_customers, GraphBuilderConfig(contiguity_method=method))
+
+    assert graph.num_edges == expected_edges
+    assert len(graph.neighbors(4)) == centre_degree
+    assert (graph.adjacency != graph.adjacency.T).nnz == 0
+    assert graph.num_components() == 1
+
+def test_to_networkx(grid_units, grid_customers):
+    """Tests that the networkx conversion carries the DDR_03 attributes keyed by unit_id."""
+    graph = build_graph(grid_units, grid_customers, GraphBuilderConfig(contiguity_method=ContiguityMethod.ROOK))
+    nx_graph = graph.to_networkx()
+
+    assert sorted(nx_graph.nodes) == sorted(grid_units["unit_id"])
+    assert nx_graph.number_of_edges() == 12
+    assert nx_graph.has_edge(5, 15) and not nx_graph.has_edge(5, 45)
+    assert nx_graph.nodes[5]["customers"] == 2
+    assert nx_graph.nodes[5]["total_sales_potential"] == 30.0
+    assert nx_graph.edges[5, 15]["weight"] == 1.0
+    assert nx_graph.nodes[5]["geometry"].equals(box(0, 0, 1, 1))
+
+def test_positions(grid_units, grid_customers):
+    """Tests the mapping from unit ids to positions."""
+    graph = build_graph(grid_units, grid_customers)
+    np.testing.assert_array_equal(graph.positions([45, 5, 7]), [4, 0, -1])
+
+def test_builds_from_generated_data():
+    """Tests the builder on a generated Voronoi scenario."""
+    config = DataGeneratorConfig(
+        voronoi_config=VoronoiConfig(num_units=200),
+        distribution_config=HomogeneousPoissonConfig(intensity=0.5),
+        random_seed=3,
+    )
+    base_units, customers = generate_data(config)
+
+    graph = build_graph(base_units, customers)
+
+    assert graph.num_units == 200
+    assert graph.customers.sum() == len(customers)
+    assert graph.total_workload.sum() == pytest.approx(customers["workload"].sum())
+    assert graph.num_components() == 1
+    # A planar Voronoi tessellation has on average fewer than 6 neighbours per cell
+    assert 2 * graph.num_edges / graph.num_units < 7
+
+def test_rejects_missing_columns(grid_units, grid_customers):
+    """Tests input validation."""
+    with pytest.raises(ValueError, match="workload"):
+        build_graph(grid_units, grid_customers.drop(columns="workload"))
+    with pytest.raises(ValueError, match="duplicate"):
+        build_graph(grid_units.assign(unit_id=1), grid_customers)
+
+def test_rook_contiguity_without_shared_vertices():
+    """Tests rook adjacency where borders overlap but do not share segment endpoints (T-junctions)."""
+    units = gpd.GeoDataFrame(
+        {"unit_id": [1, 2, 3, 4]},
+        geometry=[box(0, 0, 2, 1), box(0, 1, 1, 2), box(1, 1, 2, 2), box(2, 2, 3, 3)],
+    )
+    customers = gpd.GeoDataFrame({"unit_id": [], "sales_potential": [], "workload": []}, geometry=[])
+
+    rook = build_graph(units, customers, GraphBuilderConfig(contiguity_method=ContiguityMethod.ROOK))
+    queen = build_graph(units, customers, GraphBuilderConfig(contiguity_method=ContiguityMethod.QUEEN))
+
+    assert sorted(map(tuple, rook.edges().tolist())) == [(0, 1), (0, 2), (1, 2)]
+    # Unit 4 only touches unit 3 at a corner
+    assert sorted(map(tuple, queen.edges().tolist())) == [(0, 1), (0, 2), (1, 2), (2, 3)]
+
+def test_shared_border_length_weights(grid_units, grid_customers):
+    """Tests border lengths on a grid: 1.0 across sides and 0.0 for corner-only neighbours."""
+    config = GraphBuilderConfig(
+        contiguity_method=ContiguityMethod.QUEEN, weighting_method=WeightingMethod.SHARED_BORDER_LENGTH
+    )
+    graph = build_graph(grid_units, grid_customers, config)
+
+    assert graph.num_edges == 20
+    assert graph.adjacency[0, 1] == pytest.approx(1.0)
+    assert graph.adjacency[0, 3] == pytest.approx(1.0)
+    assert graph.adjacency[0, 4] == 0.0
+    assert graph.adjacency.sum() == pytest.approx(2 * 12)
+
+def test_shared_border_length_at_t_junction():
+    """Tests a border that is only partly made of identical segments."""
+    units = gpd.GeoDataFrame(
+        {"unit_id": [1, 2, 3]},
+        geometry=[box(0, 0, 3, 1), box(0, 1, 1, 2), box(1, 1, 3, 2)],
+    )
+    customers = gpd.GeoDataFrame({"unit_id": [], "sales_potential": [], "workload": []}, geometry=[])
+    config = GraphBuilderConfig(
+        contiguity_method=ContiguityMethod.ROOK, weighting_method=WeightingMethod.SHARED_BORDER_LENGTH
+    )
+    graph = build_graph(units, customers, config)
+
+    assert graph.adjacency[0, 1] == pytest.approx(1.0)
+    assert graph.adjacency[0, 2] == pytest.approx(2.0)
+    assert graph.adjacency[1, 2] == pytest.approx(1.0)
+
+def test_distance_weights(grid_units, grid_customers):
+    """Tests centroid distance weights on a grid."""
+    config = GraphBuilderConfig(weighting_method=WeightingMethod.DISTANCE)
+    graph = build_graph(grid_units, grid_customers, config)
+
+    assert graph.adjacency[0, 1] == pytest.approx(1.0)
+    assert graph.adjacency[0, 4] == pytest.approx(np.sqrt(2))
+    assert graph.adjacency[4, 0] == graph.adjacency[0, 4]
+
+def test_adjacency_is_cached(grid_units, grid_customers, tmp_path, monkeypatch):
+    """Tests that a repeated build reuses the cached weights and only re-aggregates customers."""
+    cache = ResultCache(cache_dir=tmp_path)
+    config = GraphBuilderConfig(weighting_method=WeightingMethod.SHARED_BORDER_LENGTH)
+    first = build_graph(grid_units, grid_customers, config, cache=cache)
+
+    def fail(*args, **kwargs):
+        raise AssertionError("The adjacency should have been served from the cache.")
+
+    monkeypatch.setattr(graph_builder, "_build_adjacency", fail)
+    second = build_graph(grid_units, grid_customers.iloc[:1], config, cache=ResultCache(cache_dir=tmp_path))
+
+    assert (first.adjacency != second.adjacency).nnz == 0
+    np.testing.assert_array_equal(second.customers, [1, 0, 0, 0, 0, 0, 0, 0, 0])
+
+    # Another weighting method or moved units are different entries
+    with pytest.raises(AssertionError, match="cache"):
+        build_graph(grid_units, grid_customers, GraphBuilderConfig(), cache=cache)
+    with pytest.raises(AssertionError, match="cache"):
+        build_graph(grid_units.set_geometry(grid_units.translate(xoff=1)), grid_customers, config, cache=cache)
+
+def test_apply_customer_delta(grid_units, grid_customers):
+    """Tests that applying a delta matches rebuilding the graph from the changed customers."""
+    graph = build_graph(grid_units, grid_customers)
+    added = pd.DataFrame({"unit_id": [15, 15, 85], "sales_potential": [1.0, 2.0, 3.0], "workload": [0.5, 0.5, 4.0]})
+    removed = grid_customers.iloc[[0]]
+
+    affected = apply_customer_delta(graph, CustomerDelta(added=added, removed=removed))
+
+    current = pd.concat([grid_customers.iloc[1:], added], ignore_index=True)
+    expected = build_graph(grid_units, gpd.GeoDataFrame(current))
+    np.testing.assert_array_equal(affected, [0, 1, 8])
+    np.testing.assert_array_equal(graph.customers, expected.customers)
+    np.testing.assert_allclose(graph.total_sales_potential, expected.total_sales_potential)
+    np.testing.assert_allclose(graph.total_workload, expected.total_workload)
+
+def test_customer_delta_from_snapshots(grid_units, grid_customers):
+    """Tests deriving added, removed and re-weighted customers from two customer tables."""
+    previous = grid_customers.assign(customer_id=[1, 2, 3, 4])
+    current = previous.drop(index=[1]).copy()
+    current.loc[current["customer_id"] == 3, "workload"] = 9.0
+    current = pd.concat([current, pd.DataFrame(
+        {"customer_id": [5], "unit_id": [25], "sales_potential": [7.0], "workload": [1.0]}
+    )], ignore_index=True)
+
+    delta = CustomerDelta.from_snapshots(previous, current)
+
+    assert sorted(delta.added["customer_id"]) == [3, 5]
+    assert sorted(delta.removed["customer_id"]) == [2, 3]
+    assert delta.num_changes == 4
+    graph = build_graph(grid_units, previous)
+    apply_customer_delta(graph, delta)
+    expected = build_graph(grid_units, gpd.GeoDataFrame(current))
+    np.testing.assert_allclose(graph.total_workload, expected.total_workload)
+
+def test_border_lengths(grid_units, grid_customers):
+    """Tests that border lengths follow the CSR slots, with zero for corner neighbours."""
+    graph = build_graph(grid_units, grid_customers, GraphBuilderConfig(contiguity_method=ContiguityMethod.QUEEN))
+
+    lengths = graph.border_lengths()
+
+    rows = np.repeat(np.arange(9), np.diff(graph.adjacency.indptr))
+    cols = graph.adjacency.indices
+    diagonal = (rows // 3 != cols // 3) & (rows % 3 != cols % 3)
+    np.testing.assert_allclose(lengths, np.where(diagonal, 0.0, 1.0))
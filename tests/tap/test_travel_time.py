@@ -0,0 +1,144 @@
+# -*- coding: utf-8 -*-
+"""
+Unit tests for the travel_time module.
+"""
+
+import geopandas as gpd
+import networkx as nx
+import numpy as np
+import pytest
+import scipy.sparse as sp
+from shapely.geometry import box
+
+import src.tap.travel_time as travel_time
+from src.common.cache import ResultCache
+from src.common.road_graph_io import RoadGraphCSR
+from src.tap.travel_time import DEFAULT_SPEED_KPH, travel_time_matrix
+
+SPACING = 0.01
+
+# --- Fixtures ---
+
+@pytest.fixture
+def road_network():
+    """Returns a 6x6 two-way grid network with a one-way shortcut from node 0 to node 35."""
+    G = nx.MultiDiGraph(crs="EPSG:4326")
+    size = 6
+    for i in range(size):
+        for j in range(size):
+            G.add_node(i * size + j, x=j * SPACING, y=50 + i * SPACING, street_count=4)
+    for i in range(size):
+        for j in range(size):
+            u = i * size + j
+            for v in ((u + 1) if j + 1 < size else None, (u + size) if i + 1 < size else None):
+                if v is not None:
+                    G.add_edge(u, v, length=1000.0, highway="residential", oneway=False)
+                    G.add_edge(v, u, length=1000.0, highway="residential", oneway=False)
+    G.add_edge(0, 35, length=1000.0, highway="motorway", maxspeed="100", oneway=True)
+    return G
+
+@pytest.fixture
+def units():
+    """Returns small square units centred near grid nodes 0, 1, 14 and 35, plus one more near node 0."""
+    def cell(node, offset=0.0):
+        x, y = (node % 6) * SPACING + offset, 50 + (node // 6) * SPACING
+        return box(x - 0.001, y - 0.001, x + 0.001, y + 0.001)
+
+    return gpd.GeoDataFrame(
+        {"unit_id": ["a", "b", "c", "d", "e"]},
+        geometry=[cell(0), cell(1), cell(14), cell(35), cell(0, 0.0005)],
+        crs="EPSG:4326",
+    )
+
+# --- Test Cases ---
+
+def test_matches_networkx_shortest_paths(road_network, units):
+    """Tests the dense matrix against networkx shortest paths between the snapped nodes."""
+    result = travel_time_matrix(units, road_network)
+
+    nodes = [0, 1, 14, 35, 0]
+    expected = np.array([
+        [nx.shortest_path_length(road_network, u, v, weight="travel_time") for v in nodes] for u in nodes
+    ])
+    np.testing.assert_allclose(result.times, expected)
+    assert list(result.unit_ids) == ["a", "b", "c", "d", "e"]
+    # The motorway only runs one way
+    assert result.times[0, 3] < result.times[3, 0]
+    # Units on the same node share it, at zero cost
+    assert result.times[0, 4] == 0.0
+    assert result.snap_distances.max() < 50
+
+def test_truncated_and_sparse(road_network, units):
+    """Tests that truncation drops distant pairs and the sparse form holds the same values."""
+    full = travel_time_matrix(units, road_network)
+    limit = float(np.sort(full.times[full.times > 0])[3])
+
+    dense = travel_time_matrix(units, road_network, max_travel_time=limit)
+    sparse = travel_time_matrix(units, road_network, max_travel_time=limit, sparse=True)
+
+    expected = np.where(full.times <= limit, full.times, np.inf)
+    np.testing.assert_allclose(dense.times, expected)
+    assert sparse.is_sparse
+    assert sparse.times.nnz == np.isfinite(expected).sum()
+    np.testing.assert_allclose(sparse.to_dense(), expected)
+    # Zero travel times are kept as explicit entries
+    assert sparse.times[0, 4] == 0.0 and sparse.times.nnz > np.count_nonzero(sparse.times.toarray())
+
+def test_csr_network_uses_length_and_default_speed(road_network, units):
+    """Tests that a CSR view without travel times falls back to length at the default speed."""
+    csr = RoadGraphCSR.from_graph(road_network)
+    result = travel_time_matrix(units, csr)
+
+    assert result.times[0, 1] == pytest.approx(1000 / (DEFAULT_SPEED_KPH / 3.6))
+    assert result.times[0, 3] == pytest.approx(1000 / (DEFAULT_SPEED_KPH / 3.6))
+
+def test_parallel_matches_serial(road_network, units, monkeypatch):
+    """Tests that the process pool and small batches give the same result."""
+    serial = travel_time_matrix(units, road_network)
+
+    monkeypatch.setattr(travel_time, "_MIN_PARALLEL_WORK", 0)
+    monkeypatch.setattr(travel_time, "_MAX_BATCH_CELLS", 1)
+    parallel = travel_time_matrix(units, road_network, n_jobs=2)
+
+    np.testing.assert_array_equal(parallel.times, serial.times)
+
+def test_sparse_blocks_match_dense(road_network, units, monkeypatch):
+    """Tests that the sparse form, assembled from per-block sparse rows, holds the dense values."""
+    dense = travel_time_matrix(units, road_network, max_travel_time=300)
+    node_times = []
+
+    def spy(*args):
+        node_times.append(node_travel_times(*args))
+        return node_times[-1]
+
+    # One source per Dijkstra block, in two worker processes
+    node_travel_times = travel_time._node_travel_times
+    monkeypatch.setattr(travel_time, "_node_travel_times", spy)
+    monkeypatch.setattr(travel_time, "_MIN_PARALLEL_WORK", 0)
+    monkeypatch.setattr(travel_time, "_MAX_BATCH_CELLS", 1)
+    sparse = travel_time_matrix(units, road_network, max_travel_time=300, sparse=True, n_jobs=2)
+
+    assert sp.issparse(node_times[0])
+    np.testing.assert_array_equal(sparse.to_dense(), dense.times)
+    assert sparse.times[0, 4] == 0.0 and sparse.times.nnz == np.isfinite(dense.times).sum()
+
+def test_result_is_cached(road_network, units, tmp_path, monkeypatch):
+    """Tests that a repeated query is served from the cache."""
+    first = travel_time_matrix(units, road_network, max_travel_time=600, cache=ResultCache(cache_dir=tmp_path))
+
+    def fail(*args, **kwargs):
+        raise AssertionError("The travel times should have been served from the cache.")
+
+    monkeypatch.setattr(travel_time, "_node_travel_times", fail)
+    second = travel_time_matrix(units, road_network, max_travel_time=600, cache=ResultCache(cache_dir=tmp_path))
+
+    np.testing.assert_array_equal(first.times, second.times)
+    with pytest.raises(AssertionError, match="cache"):
+        travel_time_matrix(units, road_network, max_travel_time=300, cache=ResultCache(cache_dir=tmp_path))
+
+def test_rejects_invalid_input(road_network, units):
+    """Tests input validation."""
+    with pytest.raises(ValueError, match="unit_id"):
+        travel_time_matrix(units.drop(columns="unit_id"), road_network)
+    with pytest.raises(ValueError, match="max_travel_time"):
+        travel_time_matrix(units, road_network, max_travel_time=0)